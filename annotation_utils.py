@@ -0,0 +1,578 @@
+import os
+import random
+import multiprocessing
+from collections import Counter, namedtuple
+from time import perf_counter
+
+
+AnnotationRef = namedtuple('AnnotationRef', ['sentence_id', 'lu_id', 'start', 'end', 'doc_id'], defaults=(None,))
+AnnotationRef.__doc__ = """
+lightweight reference to a labelled span of an exemplar annotation (doc_id is None)
+or of a full-text annotation, which can be materialized with resolve_annotation
+"""
+
+SOURCES = ('exemplar', 'fulltext')
+# LUs are small and numerous, documents are large and few (107 in FrameNet 1.7)
+SHARD_SIZES = {'exemplar': 50, 'fulltext': 1}
+
+
+class ProgressReporter(object):
+    """
+    print progress of a long-running scan, at most once every 'interval' seconds
+    """
+
+    def __init__(self, total, description='processed', interval=10.0, verbose=0):
+        """
+        :param int total: expected number of items (None if unknown)
+        :param str description: printed in front of the progress
+        :param float interval: minimum number of seconds between two reports
+        :param int verbose: progress is only printed if verbose >= 2
+        """
+        self.total = total
+        self.description = description
+        self.interval = interval
+        self.verbose = verbose
+        self.done = 0
+        self.start = perf_counter()
+        self.last_report = self.start
+
+    def update(self, num_items=1):
+        """
+        :param int num_items: number of items that were processed since the last update
+        """
+        self.done += num_items
+
+        now = perf_counter()
+        if self.verbose >= 2 and now - self.last_report >= self.interval:
+            self.last_report = now
+            print(self.status())
+
+    def status(self):
+        """
+        :rtype: str
+        :return: e.g., 'scanned LUs: 500/13572 (3.7%), 12.3s elapsed, ~321.1s left'
+        """
+        elapsed = perf_counter() - self.start
+        if not self.total:
+            return f'{self.description}: {self.done}, {elapsed:.1f}s elapsed'
+
+        perc = 100 * self.done / self.total
+        status = f'{self.description}: {self.done}/{self.total} ({perc:.1f}%), {elapsed:.1f}s elapsed'
+        if self.done:
+            remaining = elapsed * (self.total - self.done) / self.done
+            status += f', ~{remaining:.1f}s left'
+
+        return status
+
+    def finish(self):
+        if self.verbose >= 2:
+            print(self.status())
+
+
+class Reservoir(object):
+    """
+    bounded, uniformly random sample of a stream of items (reservoir sampling)
+    """
+
+    def __init__(self, size=None, rng=None):
+        """
+        :param int size: maximum number of items, None to keep all items
+        :param random.Random rng: random number generator (for reproducibility)
+        """
+        self.size = size
+        self.rng = rng if rng is not None else random.Random()
+        self.seen = 0
+        self.items = []
+
+    def add(self, item):
+        self.seen += 1
+
+        if self.size is None or len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            index = self.rng.randrange(self.seen)
+            if index < self.size:
+                self.items[index] = item
+
+    def merge(self, other):
+        """
+        merge the sample of another reservoir (over a disjoint stream) into this one,
+        such that the result is a uniform sample of both streams
+
+        :param Reservoir other: reservoir with the same size
+        """
+        if self.size is None:
+            self.items.extend(other.items)
+        else:
+            mine = list(self.items)
+            theirs = list(other.items)
+            self.rng.shuffle(mine)
+            self.rng.shuffle(theirs)
+
+            # draw without replacement from both populations
+            num_mine, num_theirs = self.seen, other.seen
+            merged = []
+            while len(merged) < self.size and (mine or theirs):
+                if self.rng.random() * (num_mine + num_theirs) < num_mine:
+                    merged.append(mine.pop())
+                    num_mine -= 1
+                else:
+                    merged.append(theirs.pop())
+                    num_theirs -= 1
+            self.items = merged
+
+        self.seen += other.seen
+
+
+def get_lu_ids(fn_instance):
+    """
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+
+    :rtype: list
+    :return: sorted LU IDs (read from the LU index, without parsing LU files)
+    """
+    return sorted(fn_instance.lu_ids_and_names())
+
+
+def make_shards(items, shard_size):
+    """
+    :param list items: e.g., LU IDs
+    :param int shard_size: maximum number of items per shard
+
+    :rtype: list
+    :return: list of lists of at most shard_size items
+    """
+    return [items[index:index + shard_size]
+            for index in range(0, len(items), shard_size)]
+
+
+def iter_layer_spans(annotation, layers=('FE', 'GF', 'PT', 'Target')):
+    """
+    yield the labelled spans of the requested layers of an annotation set
+    (exemplar sentences and full-text annotation sets have the same layer attributes)
+
+    :param annotation: NLTK annotation set or exemplar sentence
+    :param tuple layers: any of 'FE', 'GF', 'PT', and 'Target'
+
+    :rtype: generator
+    :return: (layer, label, start, end)
+    """
+    for layer in layers:
+        if layer not in annotation:
+            continue
+
+        spans = annotation[layer]
+        if layer == 'FE':
+            # (overt FEs, null instantiations)
+            spans = spans[0]
+        elif layer == 'Target':
+            spans = [(start, end, 'Target') for start, end in spans]
+
+        for start, end, label in spans:
+            yield layer, label, start, end
+
+
+def iter_exemplar_records(fn_instance, lu_ids, layers=('GF', 'PT')):
+    """
+    yield one lightweight record per label of the requested layers
+    of the exemplar annotations of the LUs
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param list lu_ids: LU IDs whose exemplars are read
+    :param tuple layers: annotation layers, any of 'FE', 'GF', 'PT', and 'Target'
+
+    :rtype: generator
+    :return: (layer, LU POS, label, start, end, sentence ID, LU ID)
+    """
+    for lu_id in lu_ids:
+        lu = fn_instance.lu(lu_id)
+        pos = lu.POS
+
+        for sentence in lu.exemplars:
+            if 'frameAnnotation' not in sentence:
+                continue
+
+            for layer, label, start, end in iter_layer_spans(sentence, layers=layers):
+                yield layer, pos, label, start, end, sentence.ID, lu_id
+
+
+def get_doc_ids(fn_instance):
+    """
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+
+    :rtype: list
+    :return: sorted full-text document IDs (read from the full-text index, without parsing documents)
+    """
+    return sorted(doc.ID for doc in fn_instance.docs_metadata())
+
+
+def iter_fulltext_annotations(fn_instance, doc_ids):
+    """
+    yield the LU annotation sets of full-text documents, one document at a time,
+    such that only the current document is in memory
+    (unlike fn_instance.annotations(full_text=True), which goes through all documents)
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param list doc_ids: document IDs that are read
+
+    :rtype: generator
+    :return: (document ID, sentence, annotation set)
+    """
+    for doc_id in doc_ids:
+        doc = fn_instance.doc(doc_id)
+        for sentence in doc.sentence:
+            # the first annotation set of a sentence contains the POS tags
+            for annotation in sentence.annotationSet[1:]:
+                if 'luID' not in annotation:
+                    continue
+                yield doc_id, sentence, annotation
+
+
+def iter_fulltext_records(fn_instance, doc_ids, layers=('GF', 'PT')):
+    """
+    yield one lightweight record per label of the requested layers
+    of the full-text annotations of the documents
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param list doc_ids: document IDs that are read
+    :param tuple layers: annotation layers, any of 'FE', 'GF', 'PT', and 'Target'
+
+    :rtype: generator
+    :return: (layer, LU POS, label, start, end, sentence ID, LU ID, document ID)
+    """
+    for doc_id, sentence, annotation in iter_fulltext_annotations(fn_instance, doc_ids):
+        pos = annotation.luName.rsplit('.', 1)[1].upper()
+        for layer, label, start, end in iter_layer_spans(annotation, layers=layers):
+            yield layer, pos, label, start, end, sentence.ID, annotation.luID, doc_id
+
+
+def count_records(records, layers=('GF', 'PT'), sample_size=0, rng=None):
+    """
+    count (LU POS, label) pairs per layer
+    and, optionally, sample references to the annotations per (LU POS, label)
+
+    :param records: output of iter_exemplar_records or iter_fulltext_records
+    :param tuple layers: annotation layers of the records
+    :param int sample_size: maximum number of AnnotationRef per (LU POS, label),
+    None to keep all of them, 0 to only count
+    :param random.Random rng: random number generator used for sampling
+
+    :rtype: tuple
+    :return: (layer -> Counter of (LU POS, label) -> frequency,
+              layer -> (LU POS, label) -> Reservoir of AnnotationRef)
+    """
+    layer2counts = {layer: Counter() for layer in layers}
+    layer2reservoirs = {layer: dict() for layer in layers}
+
+    for record in records:
+        layer = record[0]
+        key = (record[1], record[2])
+        layer2counts[layer][key] += 1
+
+        if sample_size != 0:
+            reservoirs = layer2reservoirs[layer]
+            if key not in reservoirs:
+                reservoirs[key] = Reservoir(size=sample_size, rng=rng)
+            # (sentence ID, LU ID, start, end[, document ID])
+            reservoirs[key].add(AnnotationRef(record[5], record[6], record[3], record[4], *record[7:]))
+
+    return layer2counts, layer2reservoirs
+
+
+def scan_exemplar_shard(fn_instance, lu_ids, layers=('GF', 'PT'), sample_size=0, rng=None):
+    """
+    count (LU POS, label) pairs per layer for the exemplars of the LUs
+    and, optionally, sample references to the annotations per (LU POS, label)
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param list lu_ids: LU IDs whose exemplars are read
+    :param tuple layers: annotation layers, e.g., 'GF' and/or 'PT'
+    :param int sample_size: maximum number of AnnotationRef per (LU POS, label),
+    None to keep all of them, 0 to only count
+    :param random.Random rng: random number generator used for sampling
+
+    :rtype: tuple
+    :return: see count_records
+    """
+    return count_records(iter_exemplar_records(fn_instance, lu_ids, layers=layers),
+                         layers=layers,
+                         sample_size=sample_size,
+                         rng=rng)
+
+
+def scan_fulltext_shard(fn_instance, doc_ids, layers=('GF', 'PT'), sample_size=0, rng=None):
+    """
+    count (LU POS, label) pairs per layer for the full-text annotations of the documents
+    and, optionally, sample references to the annotations per (LU POS, label)
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param list doc_ids: document IDs that are read
+    :param tuple layers: annotation layers, e.g., 'GF' and/or 'PT'
+    :param int sample_size: see scan_exemplar_shard
+    :param random.Random rng: random number generator used for sampling
+
+    :rtype: tuple
+    :return: see count_records
+    """
+    return count_records(iter_fulltext_records(fn_instance, doc_ids, layers=layers),
+                         layers=layers,
+                         sample_size=sample_size,
+                         rng=rng)
+
+
+SHARD_SCANNERS = {
+    'exemplar': scan_exemplar_shard,
+    'fulltext': scan_fulltext_shard,
+}
+
+
+def get_shard_rng(seed, shard_index):
+    """
+    :rtype: random.Random
+    :return: generator that only depends on the seed and the shard,
+    so that sampling is reproducible regardless of the number of workers
+    """
+    if seed is None:
+        return random.Random()
+    return random.Random(f'{seed}-{shard_index}')
+
+
+def get_shard_id(source, shard_index):
+    """
+    :return: shard_index for exemplar shards (as before full-text scanning existed),
+    e.g., 'fulltext-3' otherwise, so that the seeds of both sources differ
+    """
+    if source == 'exemplar':
+        return shard_index
+    return f'{source}-{shard_index}'
+
+
+_worker_fn_instance = None
+
+
+def init_worker(version):
+    """
+    load the FrameNet version once per worker process
+    (initializer of the process pools of the scanners)
+    """
+    global _worker_fn_instance
+    from stats_utils import load_framenet
+    _worker_fn_instance = load_framenet(version=version)
+
+
+def get_worker_fn_instance():
+    """
+    :return: the FrameNet instance loaded by init_worker in this process
+    """
+    return _worker_fn_instance
+
+
+def _scan_shard(args):
+    source, shard_index, items, layers, sample_size, seed = args
+    rng = get_shard_rng(seed, get_shard_id(source, shard_index))
+    return source, len(items), SHARD_SCANNERS[source](_worker_fn_instance,
+                                                      items,
+                                                      layers=layers,
+                                                      sample_size=sample_size,
+                                                      rng=rng)
+
+
+def scan_annotations(fn_instance,
+                     sources=('exemplar',),
+                     layers=('GF', 'PT'),
+                     sample_size=0,
+                     seed=None,
+                     num_workers=1,
+                     shard_sizes=None,
+                     verbose=0):
+    """
+    count (LU POS, label) pairs for the exemplar annotations of all LUs
+    and/or the full-text annotations of all documents in one run.
+    LUs and documents are sharded over one process pool, in which each worker only returns counters
+    and (optionally) samples of AnnotationRef, so memory is bounded by the largest shard.
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    (not a snapshot; scanned in this process if it was not loaded with stats_utils.load_framenet)
+    :param tuple sources: any of 'exemplar' and 'fulltext'
+    :param tuple layers: annotation layers, e.g., 'GF' and/or 'PT'
+    :param int sample_size: maximum number of AnnotationRef per (LU POS, label),
+    None to keep all of them, 0 to only count
+    :param seed: seed for sampling, None for a random sample on each call
+    :param int num_workers: number of processes, 1 (default) to scan in this process, None for the number of CPUs
+    :param dict shard_sizes: source -> number of LUs or documents per task, None for SHARD_SIZES
+    :param int verbose: if >= 2, progress is printed
+
+    :rtype: dict
+    :return: source -> (layer -> Counter of (LU POS, label) -> frequency,
+                        layer -> (LU POS, label) -> list of AnnotationRef)
+    """
+    for source in sources:
+        assert source in SOURCES, f'{source} not in {SOURCES}'
+    assert hasattr(fn_instance, 'exemplars'), \
+        'snapshots do not contain annotations, use stats_utils.load_framenet(version, snapshot=False)'
+
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    version = None
+    if num_workers > 1:
+        from stats_utils import registry
+        version = registry.version_of(fn_instance)
+        # workers can only load an instance of the registry
+        if version is None:
+            if verbose:
+                print('fn_instance was not loaded with stats_utils.load_framenet, scanning in this process')
+            num_workers = 1
+    shard_sizes = dict(SHARD_SIZES, **(shard_sizes or {}))
+
+    tasks = []
+    total = 0
+    for source in sources:
+        items = get_lu_ids(fn_instance) if source == 'exemplar' else get_doc_ids(fn_instance)
+        total += len(items)
+        tasks.extend((source, shard_index, shard, layers, sample_size, seed)
+                     for shard_index, shard in enumerate(make_shards(items, shard_sizes[source])))
+    description = 'scanned ' + ' and '.join('LUs' if source == 'exemplar' else 'documents'
+                                            for source in sources)
+    progress = ProgressReporter(total=total, description=description, verbose=verbose)
+
+    source2counts = {source: {layer: Counter() for layer in layers} for source in sources}
+    source2reservoirs = {source: {layer: dict() for layer in layers} for source in sources}
+
+    def merge(source, shard_counts, shard_reservoirs):
+        layer2counts = source2counts[source]
+        layer2reservoirs = source2reservoirs[source]
+        for layer, counts in shard_counts.items():
+            layer2counts[layer].update(counts)
+        for layer, reservoirs in shard_reservoirs.items():
+            for key, reservoir in reservoirs.items():
+                if key in layer2reservoirs[layer]:
+                    layer2reservoirs[layer][key].merge(reservoir)
+                else:
+                    reservoir.rng = get_shard_rng(seed, get_shard_id(source, f'merge-{layer}-{key}'))
+                    layer2reservoirs[layer][key] = reservoir
+
+    if num_workers == 1:
+        for source, shard_index, shard, layers, sample_size, seed in tasks:
+            merge(source, *SHARD_SCANNERS[source](fn_instance,
+                                                  shard,
+                                                  layers=layers,
+                                                  sample_size=sample_size,
+                                                  rng=get_shard_rng(seed, get_shard_id(source, shard_index))))
+            progress.update(len(shard))
+    else:
+        # workers are recycled to release the LU files cached by NLTK.
+        # shards are merged in order, which keeps seeded samples reproducible.
+        with multiprocessing.Pool(processes=num_workers,
+                                  initializer=init_worker,
+                                  initargs=(version,),
+                                  maxtasksperchild=20) as pool:
+            for source, num_items, (shard_counts, shard_reservoirs) in pool.imap(_scan_shard, tasks):
+                merge(source, shard_counts, shard_reservoirs)
+                progress.update(num_items)
+
+    progress.finish()
+
+    source2results = {}
+    for source in sources:
+        layer2samples = {layer: {key: reservoir.items
+                                 for key, reservoir in reservoirs.items()}
+                         for layer, reservoirs in source2reservoirs[source].items()}
+        source2results[source] = (source2counts[source], layer2samples)
+
+    return source2results
+
+
+def scan_exemplars(fn_instance,
+                   layers=('GF', 'PT'),
+                   sample_size=0,
+                   seed=None,
+                   num_workers=1,
+                   shard_size=50,
+                   verbose=0):
+    """
+    count (LU POS, label) pairs for the exemplar annotations of all LUs (see scan_annotations)
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    (not a snapshot; scanned in this process if it was not loaded with stats_utils.load_framenet)
+    :param tuple layers: annotation layers, e.g., 'GF' and/or 'PT'
+    :param int sample_size: maximum number of AnnotationRef per (LU POS, label),
+    None to keep all of them, 0 to only count
+    :param seed: seed for sampling, None for a random sample on each call
+    :param int num_workers: number of processes, 1 (default) to scan in this process, None for the number of CPUs
+    :param int shard_size: number of LUs per task
+    :param int verbose: if >= 2, progress is printed
+
+    :rtype: tuple
+    :return: (layer -> Counter of (LU POS, label) -> frequency,
+              layer -> (LU POS, label) -> list of AnnotationRef)
+    """
+    return scan_annotations(fn_instance,
+                            sources=('exemplar',),
+                            layers=layers,
+                            sample_size=sample_size,
+                            seed=seed,
+                            num_workers=num_workers,
+                            shard_sizes={'exemplar': shard_size},
+                            verbose=verbose)['exemplar']
+
+
+def scan_fulltext(fn_instance,
+                  layers=('GF', 'PT'),
+                  sample_size=0,
+                  seed=None,
+                  num_workers=1,
+                  shard_size=1,
+                  verbose=0):
+    """
+    count (LU POS, label) pairs for the full-text annotations of all documents (see scan_annotations)
+
+    :param int shard_size: number of documents per task
+    (see scan_exemplars for the other parameters)
+
+    :rtype: tuple
+    :return: (layer -> Counter of (LU POS, label) -> frequency,
+              layer -> (LU POS, label) -> list of AnnotationRef)
+    """
+    return scan_annotations(fn_instance,
+                            sources=('fulltext',),
+                            layers=layers,
+                            sample_size=sample_size,
+                            seed=seed,
+                            num_workers=num_workers,
+                            shard_sizes={'fulltext': shard_size},
+                            verbose=verbose)['fulltext']
+
+
+def resolve_annotation(fn_instance, annotation_ref):
+    """
+    materialize the NLTK annotation that an AnnotationRef refers to
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param AnnotationRef annotation_ref: reference to an exemplar or full-text annotation
+
+    :return: the annotation set of the exemplar sentence or of the LU in the full-text sentence
+    (with, e.g., .GF, .PT, and .FE)
+    """
+    if annotation_ref.doc_id is not None:
+        candidates = [annotation
+                      for doc_id, sentence, annotation in iter_fulltext_annotations(fn_instance,
+                                                                                    [annotation_ref.doc_id])
+                      if sentence.ID == annotation_ref.sentence_id and annotation.luID == annotation_ref.lu_id]
+        # a sentence can have several annotation sets of the same LU
+        for annotation in candidates:
+            for layer, label, start, end in iter_layer_spans(annotation):
+                if (start, end) == (annotation_ref.start, annotation_ref.end):
+                    return annotation
+        if candidates:
+            return candidates[0]
+
+        raise KeyError(f'no annotation of LU {annotation_ref.lu_id} found in sentence {annotation_ref.sentence_id} '
+                       f'of document {annotation_ref.doc_id}')
+
+    lu = fn_instance.lu(annotation_ref.lu_id)
+    for sentence in lu.exemplars:
+        if sentence.ID == annotation_ref.sentence_id:
+            return sentence.frameAnnotation
+
+    raise KeyError(f'sentence {annotation_ref.sentence_id} not found among the exemplars of LU {annotation_ref.lu_id}')
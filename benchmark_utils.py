@@ -0,0 +1,719 @@
+import os
+import sys
+import json
+import random
+import subprocess
+import tempfile
+import statistics
+from time import perf_counter
+from collections import defaultdict
+import pandas
+
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def export_revision(revision, target_dir):
+    """
+    export the tracked files of a git revision to a folder
+
+    :param str revision: git revision, e.g., 'HEAD~1'
+    :param str target_dir: folder to which the files are exported
+    """
+    archive = subprocess.run(['git', 'archive', revision],
+                             cwd=REPO_DIR,
+                             check=True,
+                             stdout=subprocess.PIPE).stdout
+    subprocess.run(['tar', '-x', '-C', target_dir],
+                   input=archive,
+                   check=True)
+
+
+def time_import(module, cwd, repeats=5):
+    """
+    time 'import module' in fresh Python processes
+
+    :param str module: name of the module, e.g., 'stats_utils'
+    :param str cwd: folder from which the module is imported
+    :param int repeats: number of fresh processes
+
+    :rtype: list
+    :return: wall time in seconds of each import
+    """
+    code = ('from time import perf_counter; start = perf_counter(); '
+            f'import {module}; print(perf_counter() - start)')
+    timings = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', code],
+                                cwd=cwd,
+                                check=True,
+                                stdout=subprocess.PIPE,
+                                universal_newlines=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+
+    return timings
+
+
+def benchmark_import_time(module='stats_utils',
+                          revisions=('HEAD', None),
+                          repeats=5,
+                          verbose=0):
+    """
+    compare the import time of a module across git revisions
+
+    :param str module: name of the module, e.g., 'stats_utils'
+    :param tuple revisions: git revisions, None for the working tree
+    :param int repeats: number of fresh processes per revision
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: df with the import time per revision
+    """
+    headers = ['revision', 'min (s)', 'median (s)', 'max (s)']
+    list_of_lists = []
+
+    for revision in revisions:
+        if revision is None:
+            timings = time_import(module, REPO_DIR, repeats=repeats)
+        else:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                export_revision(revision, temp_dir)
+                timings = time_import(module, temp_dir, repeats=repeats)
+
+        one_row = [revision or 'working tree',
+                   min(timings),
+                   statistics.median(timings),
+                   max(timings)]
+        list_of_lists.append(one_row)
+
+        if verbose:
+            print(one_row)
+
+    df = pandas.DataFrame(list_of_lists, columns=headers)
+
+    return df
+
+
+def time_function(function, repeats=3, **kwargs):
+    """
+    time a function call
+
+    :param function: callable to time
+    :param int repeats: number of calls
+
+    :rtype: list
+    :return: wall time in seconds of each call
+    """
+    timings = []
+    for _ in range(repeats):
+        start = perf_counter()
+        function(**kwargs)
+        timings.append(perf_counter() - start)
+
+    return timings
+
+
+def benchmark_full_report(fn_instance, repeats=3, verbose=0):
+    """
+    compare computing all lexicon tables with the individual functions
+    (one traversal per function) against stats_utils.get_full_report (one traversal)
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param int repeats: number of runs per approach
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: df with the wall time per approach
+    """
+    import stats_utils
+    import tool_utils
+
+    def sequential_report(fn_instance):
+        stats_utils.get_mapping_id2frame_label(fn_instance)
+        stats_utils.get_mapping_lemmapos2frames(fn_instance)
+        stats_utils.get_dfs_frame_lu_name_relation(fn_instance)
+        stats_utils.df_frame2num_of_fe_types(fn_instance)
+        stats_utils.df_fe2num_frames(fn_instance)
+        tool_utils.load_lu_to_frames(fn_instance)
+        tool_utils.load_frame_to_info(fn_instance)
+
+    # make sure that lazily loaded frames are parsed before timing
+    fn_instance.frames()
+
+    headers = ['approach', 'min (s)', 'median (s)', 'max (s)']
+    list_of_lists = []
+    for approach, function in [('sequential calls', sequential_report),
+                               ('get_full_report', stats_utils.get_full_report)]:
+        timings = time_function(function, repeats=repeats, fn_instance=fn_instance)
+        one_row = [approach, min(timings), statistics.median(timings), max(timings)]
+        list_of_lists.append(one_row)
+
+        if verbose:
+            print(one_row)
+
+    df = pandas.DataFrame(list_of_lists, columns=headers)
+
+    return df
+
+
+def benchmark_relation_hierarchy(fn_instance, relation='Inheritance', verbose=0):
+    """
+    compare computing the descendants of all frames with a BFS per call
+    (stats_utils.get_all_successors_of_all_successors) against graph_utils.RelationHierarchyIndex
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param str relation: relation type, which should be acyclic for the per-call BFS to terminate
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: df with the wall time per approach
+    """
+    import stats_utils
+    from graph_utils import RelationHierarchyIndex
+
+    frame_names = [frame.name for frame in fn_instance.frames()]
+    graph = stats_utils.load_frame_relations_as_directed_graph(fn_instance, subset_of_relations={relation})
+
+    timings = {}
+
+    start = perf_counter()
+    for frame_name in frame_names:
+        stats_utils.get_all_successors_of_all_successors(graph, frame_name)
+    timings['per-call BFS'] = perf_counter() - start
+
+    start = perf_counter()
+    index = RelationHierarchyIndex.from_fn_instance(fn_instance, subset_of_relations={relation})
+    timings['index: build'] = perf_counter() - start
+
+    start = perf_counter()
+    for frame_name in frame_names:
+        index.descendants_by_depth(frame_name, relation=relation)
+    timings['index: queries'] = perf_counter() - start
+
+    headers = ['approach', f'time for {len(frame_names)} frames (s)']
+    list_of_lists = [[approach, timing] for approach, timing in timings.items()]
+
+    if verbose:
+        print(list_of_lists)
+
+    df = pandas.DataFrame(list_of_lists, columns=headers)
+
+    return df
+
+
+def make_synthetic_event_types(frame_labels,
+                               num_event_types=10000,
+                               num_main_frames=2,
+                               num_subframes=9,
+                               seed=0):
+    """
+    create an event_type_to_dominant_frame input (see fn_tool_input/event_type_to_dominant_frame.json)
+    with randomly chosen frame labels
+
+    :param list frame_labels: frame labels to choose from
+    :param int num_event_types: number of event types
+
+    :rtype: dict
+    :return: event type -> {'main_frame_labels': [...], 'subframe_labels': [...]}
+    """
+    rng = random.Random(seed)
+    event_types = {}
+    for index in range(num_event_types):
+        labels = rng.sample(frame_labels, min(len(frame_labels), num_main_frames + num_subframes))
+        event_types[f'Q{index}'] = {
+            'main_frame_labels': labels[:num_main_frames],
+            'subframe_labels': labels[num_main_frames:],
+        }
+    return event_types
+
+
+def _get_dominant_frame_info_per_label(fn_instance, event_type_to_dominant_frame, pos_in_lu=False, pos_mapping=dict()):
+    """
+    the algorithm of tool_utils.get_dominant_frame_info before resolve_dominant_frames,
+    kept as the baseline of benchmark_dominant_frames: a frame_by_name call per frame label,
+    and the LU -> dominant frame mapping is updated after every frame label (quadratic in the labels)
+    """
+    from tool_utils import get_lu
+
+    for event_type, info in event_type_to_dominant_frame.items():
+
+        info['lu_to_dominant_frame'] = {lang: dict() for lang in {'en', 'it', 'nl'}}
+        lu_to_frames = defaultdict(set)
+
+        for label_key, id_key in [('main_frame_labels', 'main_frame_ids'),
+                                  ('subframe_labels', 'subframe_ids')]:
+
+            info[id_key] = []
+            for frame_label in info[label_key]:
+
+                frame = fn_instance.frame_by_name(frame_label)
+                info[id_key].append(frame.ID)
+
+                for lu in frame.lexUnit:
+                    lu_to_frames[get_lu(lu, pos_in_lu=pos_in_lu, pos_mapping=pos_mapping)].add(frame.ID)
+
+                for lu, frames in lu_to_frames.items():
+                    if len(frames) == 1:
+                        info['lu_to_dominant_frame']['en'][lu] = frames.pop()
+
+    return event_type_to_dominant_frame
+
+
+def benchmark_dominant_frames(fn_instance, num_event_types=10000, num_workers=None, verbose=0):
+    """
+    compare the original per-label algorithm (frame_by_name per frame label,
+    quadratic update of the dominant frames) against tool_utils.resolve_dominant_frames
+    on a synthetic event-type input
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param int num_event_types: number of synthetic event types
+    :param int num_workers: number of processes for the parallel batch run, None for the number of CPUs
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: df with the wall time per approach
+    """
+    import copy
+    import tool_utils
+
+    frame_labels = [frame.name for frame in fn_instance.frames()]
+    event_types = make_synthetic_event_types(frame_labels, num_event_types=num_event_types)
+
+    approaches = [
+        ('per-label lookups (original)', lambda event_types: _get_dominant_frame_info_per_label(fn_instance,
+                                                                                              event_types)),
+        ('batch', lambda event_types: tool_utils.resolve_dominant_frames(fn_instance,
+                                                                         event_types,
+                                                                         num_workers=1)),
+        ('batch, parallel', lambda event_types: tool_utils.resolve_dominant_frames(fn_instance,
+                                                                                   event_types,
+                                                                                   num_workers=num_workers)),
+    ]
+
+    headers = ['approach', f'time for {num_event_types} event types (s)']
+    list_of_lists = []
+    for approach, function in approaches:
+        timings = time_function(function, repeats=1, event_types=copy.deepcopy(event_types))
+        list_of_lists.append([approach, timings[0]])
+
+        if verbose:
+            print(list_of_lists[-1])
+
+    df = pandas.DataFrame(list_of_lists, columns=headers)
+
+    return df
+
+
+def benchmark_lu_lookup(fn_instance,
+                        num_lookups=100000,
+                        batch_size=1000,
+                        pos_in_lu=False,
+                        seed=0,
+                        verbose=0):
+    """
+    measure the throughput of lookup_utils.LUIndex in process (single and batched lookups)
+    and through a local server (HTTP and Unix socket)
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param int num_lookups: number of lookups per approach
+    :param int batch_size: number of lus per batched lookup
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: df with lookups per second per approach
+    """
+    import lookup_utils
+
+    index = lookup_utils.LUIndex.from_fn_instance(fn_instance, pos_in_lu=pos_in_lu)
+    rng = random.Random(seed)
+    known_lus = index.lus()
+    if pos_in_lu:
+        unknown_lus = [(f'unknown{i}', 'n') for i in range(100)]
+    else:
+        unknown_lus = [f'unknown{i}' for i in range(100)]
+    lus = [rng.choice(known_lus) if rng.random() < 0.9 else rng.choice(unknown_lus)
+           for _ in range(num_lookups)]
+    batches = [lus[i:i + batch_size] for i in range(0, len(lus), batch_size)]
+
+    def single(index):
+        for lu in lus:
+            index.lookup(lu)
+
+    def batched(index):
+        for batch in batches:
+            index.lookup_many(batch)
+
+    approaches = [('single', single, None), ('batched', batched, None)]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        http_server = lookup_utils.serve(index, port=0, background=True)
+        unix_socket = os.path.join(temp_dir, 'lookup.sock')
+        unix_server = lookup_utils.serve(index, unix_socket=unix_socket, background=True)
+
+        approaches.append(('batched, HTTP', batched,
+                           lookup_utils.LookupClient(port=http_server.server_address[1])))
+        approaches.append(('batched, Unix socket', batched,
+                           lookup_utils.LookupClient(unix_socket=unix_socket)))
+
+        headers = ['approach', 'lookups/s']
+        list_of_lists = []
+        for approach, function, client in approaches:
+            timings = time_function(function, repeats=1, index=client if client is not None else index)
+            list_of_lists.append([approach, int(num_lookups / timings[0])])
+
+            if verbose:
+                print(list_of_lists[-1])
+
+        for server in [http_server, unix_server]:
+            server.shutdown()
+            server.server_close()
+
+    df = pandas.DataFrame(list_of_lists, columns=headers)
+
+    return df
+
+
+BENCHMARK_RESULTS_DIR = os.path.join(REPO_DIR, 'benchmark_results')
+
+
+def time_loader(version='1.7', snapshot=False, repeats=3):
+    """
+    time loading FrameNet and reading all frames in fresh Python processes (cold start)
+
+    :param str version: supported: '1.5' | '1.7'
+    :param bool snapshot: if True, load from a compiled snapshot (see snapshot_utils)
+    :param int repeats: number of fresh processes
+
+    :rtype: list
+    :return: wall time in seconds of each load
+    """
+    code = ('from time import perf_counter; start = perf_counter(); '
+            'import stats_utils; '
+            f'fn = stats_utils.load_framenet(version={version!r}, snapshot={snapshot}); '
+            'fn.frames()[-1]; print(perf_counter() - start)')
+    timings = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', code],
+                                cwd=REPO_DIR,
+                                check=True,
+                                stdout=subprocess.PIPE,
+                                universal_newlines=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+
+    return timings
+
+
+class SkipBenchmark(Exception):
+    """
+    raised by the setup of a benchmark whose preconditions are not met, e.g., missing input files
+    """
+
+
+def get_lexicon_benchmarks(fn_instance, include_annotations=False):
+    """
+    benchmarks of the entry points of stats_utils, tool_utils, and utils that work on the lexicon.
+    Caches of the modules are cleared in the setup, so that each call does the full computation.
+    A setup raises SkipBenchmark if the benchmark can not run.
+
+    :param fn_instance: instance of fn version (or a synthetic_utils lexicon)
+    :param bool include_annotations: if True, the exemplar scans (which need the NLTK corpus) are included
+
+    :rtype: list
+    :return: list of (name, setup, function), where setup and function take no arguments
+    """
+    import stats_utils
+    import tool_utils
+    import lookup_utils
+    import diff_utils
+    import utils
+
+    frame_names = [frame.name for frame in fn_instance.frames()]
+    starting_node = frame_names[0]
+    event_types = make_synthetic_event_types(frame_names, num_event_types=1000)
+
+    def no_setup():
+        pass
+
+    def clear(cache):
+        return lambda: cache.pop(fn_instance, None)
+
+    readme_path = os.path.join(REPO_DIR, 'fn_tool_input', 'FrameNet input to tool.md')
+
+    def create_tool_input_setup():
+        if not os.path.exists(readme_path):
+            raise SkipBenchmark(f'cannot find {readme_path}')
+
+    def create_tool_input():
+        with tempfile.TemporaryDirectory() as temp_dir:
+            event_types_path = os.path.join(temp_dir, 'event_types.json')
+            tool_utils.write_json(event_types_path, event_types)
+            tool_utils.create_tool_input(os.path.join(temp_dir, 'output'),
+                                         fn_instance,
+                                         readme_path=readme_path,
+                                         event_type_to_dominant_frame_path=event_types_path,
+                                         force=True)
+
+    settings = {}
+
+    def terminology_setup():
+        try:
+            settings.update(utils.load_paths(category='frame-to-frame-relations'))
+        except AssertionError as error:
+            raise SkipBenchmark(str(error))
+
+    benchmarks = [
+        ('stats_utils.get_mapping_id2frame_label', no_setup,
+         lambda: stats_utils.get_mapping_id2frame_label(fn_instance)),
+        ('stats_utils.get_mapping_lemmapos2frames', no_setup,
+         lambda: stats_utils.get_mapping_lemmapos2frames(fn_instance)),
+        ('stats_utils.df_frame_lu_edges', no_setup,
+         lambda: stats_utils.df_frame_lu_edges(fn_instance)),
+        ('stats_utils.df_frame_fe_edges', no_setup,
+         lambda: stats_utils.df_frame_fe_edges(fn_instance)),
+        ('stats_utils.get_dfs_frame_lu_name_relation', no_setup,
+         lambda: stats_utils.get_dfs_frame_lu_name_relation(fn_instance)),
+        ('stats_utils.df_frame2num_of_fe_types', no_setup,
+         lambda: stats_utils.df_frame2num_of_fe_types(fn_instance)),
+        ('stats_utils.df_fe2num_frames', no_setup,
+         lambda: stats_utils.df_fe2num_frames(fn_instance)),
+        ('stats_utils.df_fe2coreness_types', clear(stats_utils._frame_fe_edges),
+         lambda: stats_utils.df_fe2coreness_types(fn_instance)),
+        ('stats_utils.get_full_report', no_setup,
+         lambda: stats_utils.get_full_report(fn_instance)),
+        ('stats_utils.load_frame_relations_as_directed_graph', no_setup,
+         lambda: stats_utils.load_frame_relations_as_directed_graph(fn_instance)),
+        ('stats_utils.load_frame_relations_as_compact_graph', no_setup,
+         lambda: stats_utils.load_frame_relations_as_compact_graph(fn_instance)),
+        ('stats_utils.get_successors_by_depth', clear(stats_utils._frame_relation_graphs),
+         lambda: stats_utils.get_successors_by_depth(fn_instance, starting_node, relations='Inheritance')),
+        ('stats_utils.get_relation_hierarchy_index', clear(stats_utils._relation_indices),
+         lambda: stats_utils.get_relation_hierarchy_index(fn_instance)),
+        ('stats_utils.get_frame_similarity', clear(stats_utils._frame_similarities),
+         lambda: stats_utils.get_frame_similarity(fn_instance, feature='FE', metric='jaccard')),
+        ('tool_utils.load_lu_to_frames', no_setup,
+         lambda: tool_utils.load_lu_to_frames(fn_instance)),
+        ('tool_utils.load_frame_to_info', no_setup,
+         lambda: tool_utils.load_frame_to_info(fn_instance)),
+        ('tool_utils.resolve_dominant_frames', no_setup,
+         lambda: tool_utils.resolve_dominant_frames(fn_instance, json.loads(json.dumps(event_types)))),
+        ('tool_utils.create_tool_input', create_tool_input_setup, create_tool_input),
+        ('lookup_utils.LUIndex.from_fn_instance', no_setup,
+         lambda: lookup_utils.LUIndex.from_fn_instance(fn_instance)),
+        ('lookup_utils.CandidateIndex.from_fn_instance', no_setup,
+         lambda: lookup_utils.CandidateIndex.from_fn_instance(fn_instance)),
+        ('diff_utils.get_fingerprints', clear(diff_utils._fingerprints),
+         lambda: diff_utils.get_fingerprints(fn_instance)),
+        ('utils.load_definitions_in_df', terminology_setup,
+         lambda: utils.load_definitions_in_df(settings)),
+    ]
+
+    if include_annotations:
+        benchmarks.extend([
+            ('stats_utils.count_gf_and_pos', no_setup,
+             lambda: stats_utils.count_gf_and_pos(fn_instance)),
+            ('stats_utils.count_pt_and_pos', no_setup,
+             lambda: stats_utils.count_pt_and_pos(fn_instance)),
+        ])
+
+    return benchmarks
+
+
+def run_benchmark_suite(lexicons, repeats=3, include_annotations=False, loader_versions=(), verbose=0):
+    """
+    time every benchmark of get_lexicon_benchmarks on each lexicon,
+    plus cold (fresh process) and warm (memoized) loading of FrameNet
+
+    :param dict lexicons: name -> lexicon, e.g., {'framenet-1.7': load_framenet('1.7'),
+    'synthetic-10x': synthetic_utils.make_synthetic_lexicon(scale=10)}
+    :param int repeats: number of calls per benchmark
+    :param bool include_annotations: see get_lexicon_benchmarks (only for NLTK instances)
+    :param tuple loader_versions: FrameNet versions of which loading is timed, e.g., ('1.7',)
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: df with min and median wall time per (lexicon, benchmark),
+    NaN if a benchmark was skipped by its setup (see SkipBenchmark).
+    Errors of the benchmarked functions are raised.
+    """
+    import stats_utils
+
+    headers = ['lexicon', 'benchmark', 'min (s)', 'median (s)', 'repeats']
+    list_of_lists = []
+
+    def add(lexicon, benchmark, timings):
+        if timings:
+            one_row = [lexicon, benchmark, min(timings), statistics.median(timings), len(timings)]
+        else:
+            one_row = [lexicon, benchmark, float('nan'), float('nan'), 0]
+        list_of_lists.append(one_row)
+
+        if verbose:
+            print(one_row)
+
+    for version in loader_versions:
+        lexicon = f'framenet-{version}'
+        add(lexicon, 'load_framenet (cold)', time_loader(version, repeats=repeats))
+        add(lexicon, 'load_framenet snapshot (cold)', time_loader(version, snapshot=True, repeats=repeats))
+        stats_utils.load_framenet(version=version)
+        add(lexicon, 'load_framenet (warm)',
+            time_function(stats_utils.load_framenet, repeats=repeats, version=version))
+
+    for lexicon, fn_instance in lexicons.items():
+        is_nltk = not hasattr(fn_instance, 'cache_key')
+        benchmarks = get_lexicon_benchmarks(fn_instance, include_annotations=include_annotations and is_nltk)
+
+        for name, setup, function in benchmarks:
+            timings = []
+            for _ in range(repeats):
+                try:
+                    setup()
+                except SkipBenchmark as error:
+                    if verbose:
+                        print(f'skipped {name} on {lexicon}: {error}')
+                    timings = []
+                    break
+                timings.extend(time_function(function, repeats=1))
+            add(lexicon, name, timings)
+
+    df = pandas.DataFrame(list_of_lists, columns=headers)
+
+    return df
+
+
+def get_revision():
+    """
+    :rtype: str
+    :return: short hash of HEAD, with '-dirty' if the working tree has uncommitted changes
+    """
+    revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              cwd=REPO_DIR,
+                              check=True,
+                              stdout=subprocess.PIPE,
+                              universal_newlines=True).stdout.strip()
+    status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                            cwd=REPO_DIR,
+                            check=True,
+                            stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout.strip()
+    if status:
+        revision += '-dirty'
+    return revision
+
+
+def save_results(df, revision=None, results_dir=BENCHMARK_RESULTS_DIR):
+    """
+    store the results of run_benchmark_suite per commit
+
+    :param pandas.core.frame.DataFrame df: output of run_benchmark_suite
+    :param str revision: name of the results, None for the current commit (see get_revision)
+    :param str results_dir: folder in which the results are stored
+
+    :rtype: str
+    :return: path of the results
+    """
+    import platform
+    from datetime import datetime, timezone
+    from tool_utils import write_json
+
+    if revision is None:
+        revision = get_revision()
+
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f'{revision}.json')
+    write_json(path, {
+        'revision': revision,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'results': json.loads(df.to_json(orient='records')),
+    })
+
+    return path
+
+
+def load_results(revision, results_dir=BENCHMARK_RESULTS_DIR):
+    """
+    :param str revision: e.g., a short commit hash (see save_results)
+    :param str results_dir: folder in which the results are stored
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: the results of run_benchmark_suite of that revision
+    """
+    with open(os.path.join(results_dir, f'{revision}.json')) as infile:
+        results = json.load(infile)['results']
+    return pandas.DataFrame(results)
+
+
+def compare_results(baseline_df, current_df, threshold=1.25):
+    """
+    detect regressions between two runs of run_benchmark_suite (on the same machine)
+
+    :param pandas.core.frame.DataFrame baseline_df: results of the baseline, e.g., the previous commit
+    :param pandas.core.frame.DataFrame current_df: results of the current code
+    :param float threshold: ratio of the median times above which a benchmark is a regression
+    (and below 1 / threshold an improvement)
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: df with the median times, their ratio, and 'regression' | 'improvement' | 'unchanged'
+    """
+    keys = ['lexicon', 'benchmark']
+    df = baseline_df[keys + ['median (s)']].merge(current_df[keys + ['median (s)']],
+                                                  on=keys,
+                                                  suffixes=(' baseline', ' current'))
+    df['ratio'] = df['median (s) current'] / df['median (s) baseline']
+    df['status'] = 'unchanged'
+    df.loc[df['ratio'] > threshold, 'status'] = 'regression'
+    df.loc[df['ratio'] < 1 / threshold, 'status'] = 'improvement'
+
+    return df.sort_values('ratio', ascending=False).reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='benchmarks of FN_Reader')
+    parser.add_argument('revisions', nargs='*',
+                        help='git revisions to compare the import time with, e.g., HEAD~1')
+    parser.add_argument('--suite', action='store_true',
+                        help='run the benchmark suite and store the results per commit')
+    parser.add_argument('--scales', nargs='*', type=float, default=[10],
+                        help='sizes of the synthetic lexicons relative to FrameNet 1.7, e.g., 10 100')
+    parser.add_argument('--annotations', action='store_true',
+                        help='include the exemplar scans in the suite')
+    parser.add_argument('--compare', default=None,
+                        help='revision of stored results to compare the suite with')
+    args = parser.parse_args()
+
+    import stats_utils
+
+    if args.suite:
+        import synthetic_utils
+
+        lexicons = {'framenet-1.7': stats_utils.load_framenet(version='1.7')}
+        for scale in args.scales:
+            lexicons[f'synthetic-{scale:g}x'] = synthetic_utils.make_synthetic_lexicon(scale=scale)
+
+        suite_df = run_benchmark_suite(lexicons,
+                                       include_annotations=args.annotations,
+                                       loader_versions=('1.7',),
+                                       verbose=1)
+        print(suite_df.to_string(index=False))
+        print(f'written {save_results(suite_df)}')
+
+        if args.compare:
+            comparison_df = compare_results(load_results(args.compare), suite_df)
+            print(comparison_df.to_string(index=False))
+    else:
+        revisions = args.revisions + [None]
+
+        import_df = benchmark_import_time(module='stats_utils',
+                                          revisions=revisions,
+                                          verbose=1)
+        print(import_df.to_string(index=False))
+
+        fn = stats_utils.load_framenet(version='1.7')
+        report_df = benchmark_full_report(fn, verbose=1)
+        print(report_df.to_string(index=False))
+
+        hierarchy_df = benchmark_relation_hierarchy(fn, verbose=1)
+        print(hierarchy_df.to_string(index=False))
+
+        dominant_frames_df = benchmark_dominant_frames(fn, verbose=1)
+        print(dominant_frames_df.to_string(index=False))
+
+        lookup_df = benchmark_lu_lookup(fn, verbose=1)
+        print(lookup_df.to_string(index=False))
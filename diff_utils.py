@@ -0,0 +1,288 @@
+import json
+import hashlib
+import weakref
+from collections import defaultdict
+
+import pandas
+
+from traversal_utils import LexiconAggregator, traverse_lexicon
+
+
+KINDS = ['frame', 'FE', 'LU', 'relation']
+STATUSES = ['added', 'removed', 'renamed', 'changed', 'moved']
+COLUMNS = ['kind', 'status', 'old_id', 'new_id', 'old_name', 'new_name', 'changed_fields']
+
+
+def get_field_hash(value):
+    """
+    :rtype: str
+    :return: short hash of a field value (lists and tuples are hashed in order)
+    """
+    return hashlib.blake2b(repr(value).encode('utf-8'), digest_size=8).hexdigest()
+
+
+class EntityFingerprint(object):
+    """
+    fingerprint of a frame, FE, LU, or relation: a hash per field and one over all fields
+    """
+    __slots__ = ('id', 'name', 'field2hash', 'fingerprint')
+
+    def __init__(self, id_, name, fields):
+        """
+        :param int id_: FrameNet ID of the entity
+        :param str name: name of the entity, e.g., a frame label or LU name
+        :param dict fields: field name -> value, e.g., 'definition' -> definition
+        """
+        self.id = id_
+        self.name = name
+        self.field2hash = {field: get_field_hash(value) for field, value in sorted(fields.items())}
+        self.fingerprint = get_field_hash(tuple(self.field2hash.items()))
+
+    def changed_fields(self, other):
+        """
+        :param EntityFingerprint other: fingerprint of the same entity in another version
+
+        :rtype: list
+        :return: sorted fields of which the value differs
+        """
+        fields = set(self.field2hash) | set(other.field2hash)
+        return sorted(field for field in fields
+                      if self.field2hash.get(field) != other.field2hash.get(field))
+
+
+class FingerprintAggregator(LexiconAggregator):
+    """
+    kind -> ID -> EntityFingerprint of all frames, FEs, and LUs (see get_fingerprints)
+    """
+
+    def __init__(self):
+        self.kind2fingerprints = {kind: dict() for kind in KINDS}
+
+    def visit_frame(self, frame):
+        fields = {
+            'name': frame.name,
+            'definition': frame.definition,
+            'semTypes': sorted(semtype.name for semtype in frame.semTypes),
+            'FEs': sorted(frame.FE),
+            'LUs': sorted(frame.lexUnit),
+        }
+        self.kind2fingerprints['frame'][frame.ID] = EntityFingerprint(frame.ID, frame.name, fields)
+
+    def visit_fe(self, frame, fe_name, fe):
+        fields = {
+            'name': fe.name,
+            'frame': frame.name,
+            'abbrev': fe.abbrev,
+            'coreType': fe.coreType,
+            'definition': fe.definition,
+            'semType': fe.semType.name if fe.semType else None,
+        }
+        name = f'{frame.name}.{fe.name}'
+        self.kind2fingerprints['FE'][fe.ID] = EntityFingerprint(fe.ID, name, fields)
+
+    def visit_lu(self, frame, lu_name, lu):
+        fields = {
+            'name': lu.name,
+            'frame': frame.name,
+            'POS': lu.POS,
+            'definition': lu.definition,
+            'status': lu.get('status'),
+        }
+        # LU names are only unique within a frame, e.g., 'run.v' is an LU of several frames
+        name = f'{frame.name}.{lu.name}'
+        self.kind2fingerprints['LU'][lu.ID] = EntityFingerprint(lu.ID, name, fields)
+
+    def result(self):
+        return self.kind2fingerprints
+
+
+_fingerprints = weakref.WeakKeyDictionary()
+
+
+def get_fingerprints(fn_instance):
+    """
+    fingerprint all frames, FEs, LUs, and frame-to-frame relations in one traversal
+    (memoized per FrameNet instance)
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+
+    :rtype: dict
+    :return: kind ('frame' | 'FE' | 'LU' | 'relation') -> ID -> EntityFingerprint
+    """
+    if fn_instance in _fingerprints:
+        return _fingerprints[fn_instance]
+
+    kind2fingerprints = traverse_lexicon(fn_instance, {'fingerprints': FingerprintAggregator()})['fingerprints']
+
+    for frame_relation in fn_instance.frame_relations():
+        rel_type = frame_relation['type'].name
+        fields = {
+            'type': rel_type,
+            'super': frame_relation.superFrameName,
+            'sub': frame_relation.subFrameName,
+        }
+        name = f'{rel_type}: {frame_relation.superFrameName} -> {frame_relation.subFrameName}'
+        kind2fingerprints['relation'][frame_relation.ID] = EntityFingerprint(frame_relation.ID, name, fields)
+
+    _fingerprints[fn_instance] = kind2fingerprints
+    return kind2fingerprints
+
+
+def _group_by_name(id2fingerprint, exclude):
+    """
+    :param dict id2fingerprint: ID -> EntityFingerprint
+    :param dict exclude: entities with these IDs are left out
+
+    :rtype: dict
+    :return: name -> list of EntityFingerprint, sorted by ID (names are not necessarily unique)
+    """
+    name2fingerprints = defaultdict(list)
+    for id_ in sorted(id2fingerprint.keys() - exclude.keys()):
+        fingerprint = id2fingerprint[id_]
+        name2fingerprints[fingerprint.name].append(fingerprint)
+    return name2fingerprints
+
+
+def diff_entities(kind, old_id2fingerprint, new_id2fingerprint):
+    """
+    align the entities of two versions, first by ID, then, for the remaining ones, by name
+
+    - entities with the same ID:
+        'renamed' if the name differs, else 'changed' if any other field differs
+    - entities with the same name, but a different ID: 'moved' (e.g., an FE whose ID changed);
+        if several entities have the same name, they are paired in order of ID
+    - remaining entities: 'added' or 'removed'
+
+    LUs are named '<frame>.<LU name>', since LU names are only unique within a frame:
+
+    >>> old = {1: EntityFingerprint(1, 'Self_motion.run.v', {'frame': 'Self_motion'})}
+    >>> new = {id_: EntityFingerprint(id_, f'{frame}.run.v', {'frame': frame})
+    ...        for id_, frame in [(2, 'Fleeing'), (3, 'Self_motion'), (4, 'Operating_a_system')]}
+    >>> sorted((row[1], row[2], row[3]) for row in diff_entities('LU', old, new))
+    [('added', None, 2), ('added', None, 4), ('moved', 1, 3)]
+
+    :param str kind: e.g., 'frame'
+    :param dict old_id2fingerprint: ID -> EntityFingerprint of the old version
+    :param dict new_id2fingerprint: ID -> EntityFingerprint of the new version
+
+    :rtype: list
+    :return: list of rows (see COLUMNS), unchanged entities are left out
+    """
+    rows = []
+
+    for id_ in old_id2fingerprint.keys() & new_id2fingerprint.keys():
+        old = old_id2fingerprint[id_]
+        new = new_id2fingerprint[id_]
+        if old.fingerprint == new.fingerprint:
+            continue
+
+        changed_fields = old.changed_fields(new)
+        status = 'renamed' if 'name' in changed_fields else 'changed'
+        rows.append([kind, status, id_, id_, old.name, new.name, changed_fields])
+
+    old_name2fingerprints = _group_by_name(old_id2fingerprint, exclude=new_id2fingerprint)
+    new_name2fingerprints = _group_by_name(new_id2fingerprint, exclude=old_id2fingerprint)
+
+    for name in sorted(old_name2fingerprints.keys() | new_name2fingerprints.keys()):
+        olds = old_name2fingerprints.get(name, [])
+        news = new_name2fingerprints.get(name, [])
+
+        # entities with the same name are paired in order of ID, the remaining ones are added or removed
+        for old, new in zip(olds, news):
+            rows.append([kind, 'moved', old.id, new.id, name, name, old.changed_fields(new)])
+        for old in olds[len(news):]:
+            rows.append([kind, 'removed', old.id, None, name, None, []])
+        for new in news[len(olds):]:
+            rows.append([kind, 'added', None, new.id, None, name, []])
+
+    return rows
+
+
+def diff_framenet(old_fn_instance, new_fn_instance, kinds=KINDS):
+    """
+    compare two FrameNet instances, e.g., version 1.5 and version 1.7
+
+    :param old_fn_instance: instance of the old version (see stats_utils.load_framenet)
+    :param new_fn_instance: instance of the new version
+    :param list kinds: any of 'frame', 'FE', 'LU', and 'relation'
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: df with one row per added, removed, renamed, changed, or moved entity (see COLUMNS)
+    """
+    old_fingerprints = get_fingerprints(old_fn_instance)
+    new_fingerprints = get_fingerprints(new_fn_instance)
+
+    rows = []
+    for kind in kinds:
+        assert kind in KINDS, f'{kind} not in {KINDS}'
+        rows.extend(diff_entities(kind, old_fingerprints[kind], new_fingerprints[kind]))
+
+    df = pandas.DataFrame(rows, columns=COLUMNS)
+    df['kind'] = pandas.Categorical(df['kind'], categories=KINDS)
+    df['status'] = pandas.Categorical(df['status'], categories=STATUSES)
+    for column in ['old_id', 'new_id']:
+        df[column] = df[column].astype('Int64')
+
+    return df.sort_values(['kind', 'status', 'old_name', 'new_name']).reset_index(drop=True)
+
+
+def diff_versions(old_version='1.5', new_version='1.7', kinds=KINDS):
+    """
+    :param str old_version: supported: '1.5' | '1.7'
+    :param str new_version: supported: '1.5' | '1.7'
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: see diff_framenet
+    """
+    from stats_utils import load_framenet
+
+    return diff_framenet(load_framenet(version=old_version),
+                         load_framenet(version=new_version),
+                         kinds=kinds)
+
+
+def summarize_diff(df_diff):
+    """
+    :param pandas.core.frame.DataFrame df_diff: output of diff_framenet
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: number of entities per kind (rows) and status (columns)
+    """
+    return pandas.crosstab(df_diff['kind'], df_diff['status'], dropna=False)
+
+
+def diff_to_dict(df_diff):
+    """
+    :param pandas.core.frame.DataFrame df_diff: output of diff_framenet
+
+    :rtype: dict
+    :return: kind -> status -> list of {'old_id', 'new_id', 'old_name', 'new_name', 'changed_fields'}
+    """
+    kind2status2rows = {kind: {status: [] for status in STATUSES} for kind in KINDS}
+
+    for row in df_diff.itertuples(index=False):
+        kind2status2rows[row.kind][row.status].append({
+            'old_id': None if pandas.isna(row.old_id) else int(row.old_id),
+            'new_id': None if pandas.isna(row.new_id) else int(row.new_id),
+            'old_name': None if pandas.isna(row.old_name) else row.old_name,
+            'new_name': None if pandas.isna(row.new_name) else row.new_name,
+            'changed_fields': list(row.changed_fields),
+        })
+
+    return kind2status2rows
+
+
+def write_diff_json(df_diff, path):
+    """
+    :param pandas.core.frame.DataFrame df_diff: output of diff_framenet
+    :param str path: output path (see diff_to_dict for the structure)
+    """
+    from tool_utils import write_atomically
+
+    write_atomically(path, lambda outfile: json.dump(diff_to_dict(df_diff), outfile, indent=4))
+
+
+if __name__ == '__main__':
+    df = diff_versions(old_version='1.5', new_version='1.7')
+    print(summarize_diff(df))
+    write_diff_json(df, 'framenet_1.5_1.7_diff.json')
@@ -0,0 +1,159 @@
+import json
+
+
+OUTPUT_FORMATS = {
+    'json': '.json',
+    'compact_json': '.json',
+    'jsonl': '.jsonl',
+    'msgpack': '.msgpack',
+}
+
+
+def get_extension(output_format):
+    """
+    :param str output_format: one of OUTPUT_FORMATS
+
+    :rtype: str
+    :return: file extension, e.g., '.jsonl'
+    """
+    assert output_format in OUTPUT_FORMATS, f'{output_format} not in {set(OUTPUT_FORMATS)}'
+    return OUTPUT_FORMATS[output_format]
+
+
+def serialize_key(key):
+    """
+    keys are written as strings in all formats, e.g.,
+    ('run', 'v') -> 'run.v' (lu with pos, see tool_utils.get_lu)
+    256 -> '256' (frame ID)
+
+    :rtype: str
+    """
+    if isinstance(key, tuple):
+        return '.'.join(key)
+    return str(key)
+
+
+def _to_builtin(value):
+    """
+    convert sets and tuples to lists (JSON and msgpack only know lists)
+    """
+    if isinstance(value, dict):
+        return {serialize_key(key): _to_builtin(sub_value) for key, sub_value in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_to_builtin(sub_value) for sub_value in value]
+    return value
+
+
+def write_records(outfile, records, output_format='compact_json'):
+    """
+    write (key, value) records to an open file, one record at a time,
+    such that the whole mapping never has to be in memory:
+    - json: indented and sorted json object (the records are collected first)
+    - compact_json: json object without whitespace
+    - jsonl: one json object {"key": ..., "value": ...} per line
+    - msgpack: stream of [key, value] arrays
+
+    :param outfile: text file for the json formats, binary file for msgpack
+    :param records: iterable of (key, value), e.g., dict.items() or a generator
+    :param str output_format: one of OUTPUT_FORMATS
+
+    :rtype: int
+    :return: number of records written
+    """
+    get_extension(output_format)
+    num_records = 0
+
+    if output_format == 'json':
+        # non-tuple keys are kept, so that, e.g., frame IDs are sorted numerically
+        a_dict = {serialize_key(key) if isinstance(key, tuple) else key: _to_builtin(value)
+                  for key, value in records}
+        json.dump(a_dict, outfile, indent=4, sort_keys=True)
+        return len(a_dict)
+
+    if output_format == 'compact_json':
+        outfile.write('{')
+        for key, value in records:
+            if num_records:
+                outfile.write(',')
+            outfile.write(json.dumps(serialize_key(key)))
+            outfile.write(':')
+            outfile.write(json.dumps(_to_builtin(value), separators=(',', ':')))
+            num_records += 1
+        outfile.write('}')
+
+    elif output_format == 'jsonl':
+        for key, value in records:
+            record = {'key': serialize_key(key), 'value': _to_builtin(value)}
+            outfile.write(json.dumps(record, separators=(',', ':')))
+            outfile.write('\n')
+            num_records += 1
+
+    elif output_format == 'msgpack':
+        import msgpack
+
+        packer = msgpack.Packer()
+        for key, value in records:
+            outfile.write(packer.pack([serialize_key(key), _to_builtin(value)]))
+            num_records += 1
+
+    return num_records
+
+
+def get_open_mode(output_format, mode='r'):
+    """
+    :rtype: str
+    :return: mode to open a file of the output format with, e.g., 'rb' for msgpack
+    """
+    if output_format == 'msgpack':
+        return mode + 'b'
+    return mode
+
+
+def iter_records(path, output_format=None):
+    """
+    read the (key, value) records of a file written with write_records.
+    jsonl and msgpack files are read lazily, one record at a time.
+
+    :param str path: path to the file
+    :param str output_format: one of OUTPUT_FORMATS, None to derive it from the extension
+    ('.json' files are read as a whole)
+
+    :rtype: generator
+    :return: (key, value)
+    """
+    if output_format is None:
+        extension2format = {extension: output_format
+                            for output_format, extension in OUTPUT_FORMATS.items()
+                            if output_format != 'compact_json'}
+        extension = '.' + path.rsplit('.', 1)[-1]
+        assert extension in extension2format, f'unknown extension {extension} of {path}'
+        output_format = extension2format[extension]
+
+    get_extension(output_format)
+
+    with open(path, get_open_mode(output_format)) as infile:
+        if output_format in {'json', 'compact_json'}:
+            yield from json.load(infile).items()
+
+        elif output_format == 'jsonl':
+            for line in infile:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record['key'], record['value']
+
+        elif output_format == 'msgpack':
+            import msgpack
+
+            for key, value in msgpack.Unpacker(infile, raw=False):
+                yield key, value
+
+
+def read_records(path, output_format=None):
+    """
+    :param str path: path to a file written with write_records
+    :param str output_format: see iter_records
+
+    :rtype: dict
+    :return: key -> value
+    """
+    return dict(iter_records(path, output_format=output_format))
@@ -0,0 +1,640 @@
+import pickle
+from collections import defaultdict
+import numpy
+import networkx as nx
+
+
+def bfs_depths(adjacency, starting_node):
+    """
+    breadth-first search that visits each node once, which makes it safe for cycles
+
+    :param dict adjacency: node -> iterable of neighbouring nodes
+    :param starting_node: node from which the search starts
+
+    :rtype: dict
+    :return: reachable node -> length of the shortest path (the starting node itself is excluded)
+    """
+    node2depth = {}
+    visited = {starting_node}
+    frontier = [starting_node]
+    depth = 0
+
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for node in frontier:
+            for neighbour in adjacency.get(node, ()):
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    node2depth[neighbour] = depth
+                    next_frontier.append(neighbour)
+        frontier = next_frontier
+
+    return node2depth
+
+
+def group_by_depth(node2depth):
+    """
+    :param dict node2depth: node -> depth
+
+    :rtype: dict
+    :return: {depth -> nodes at that depth}
+    """
+    depth2nodes = defaultdict(set)
+    for node, depth in node2depth.items():
+        depth2nodes[depth].add(node)
+    return dict(sorted(depth2nodes.items()))
+
+
+class RelationHierarchyIndex(object):
+    """
+    precomputed transitive closure of frame-to-frame relations, per relation type.
+
+    For every relation type and every frame, the descendants (sub frames) and
+    ancestors (super frames) are stored with the length of the shortest path to them.
+    Cycles (e.g., in 'See_also' or 'Precedes') are handled by visiting each frame once.
+    """
+
+    def __init__(self, relation2edges):
+        """
+        :param dict relation2edges: relation type -> list of (super frame name, sub frame name)
+        """
+        self.relation2edges = {relation: list(edges)
+                               for relation, edges in relation2edges.items()}
+        self.relation2descendants = {}
+        self.relation2ancestors = {}
+
+        for relation, edges in self.relation2edges.items():
+            children = defaultdict(set)
+            parents = defaultdict(set)
+            for super_node, sub_node in edges:
+                children[super_node].add(sub_node)
+                parents[sub_node].add(super_node)
+
+            nodes = set(children) | set(parents)
+            self.relation2descendants[relation] = {node: bfs_depths(children, node)
+                                                   for node in nodes}
+            self.relation2ancestors[relation] = {node: bfs_depths(parents, node)
+                                                 for node in nodes}
+
+    @classmethod
+    def from_fn_instance(cls, fn_instance, subset_of_relations=set()):
+        """
+        :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+        :param set subset_of_relations: if empty, all relations are considered
+        if not empty, only that subset is considered
+
+        :rtype: RelationHierarchyIndex
+        """
+        relation2edges = defaultdict(list)
+        for frame_relation in fn_instance.frame_relations():
+            rel_type = frame_relation['type'].name
+            if subset_of_relations and rel_type not in subset_of_relations:
+                continue
+            relation2edges[rel_type].append((frame_relation.superFrameName, frame_relation.subFrameName))
+
+        return cls(relation2edges)
+
+    @property
+    def relations(self):
+        return sorted(self.relation2edges)
+
+    def descendants(self, frame, relation='Inheritance'):
+        """
+        :param str frame: frame name
+        :param str relation: relation type
+
+        :rtype: dict
+        :return: descendant frame -> depth (1 being the direct sub frames),
+        empty if the relation type has no edges in the index (see relations)
+        """
+        return self.relation2descendants.get(relation, {}).get(frame, {})
+
+    def ancestors(self, frame, relation='Inheritance'):
+        """
+        :param str frame: frame name
+        :param str relation: relation type
+
+        :rtype: dict
+        :return: ancestor frame -> depth (1 being the direct super frames),
+        empty if the relation type has no edges in the index (see relations)
+        """
+        return self.relation2ancestors.get(relation, {}).get(frame, {})
+
+    def descendants_by_depth(self, frame, relation='Inheritance'):
+        """
+        same output as stats_utils.get_all_successors_of_all_successors,
+        except that each frame is only listed at its smallest depth
+
+        :rtype: dict
+        :return: {depth -> frames at that level}
+        """
+        return group_by_depth(self.descendants(frame, relation=relation))
+
+    def ancestors_by_depth(self, frame, relation='Inheritance'):
+        """
+        :rtype: dict
+        :return: {depth -> frames at that level}
+        """
+        return group_by_depth(self.ancestors(frame, relation=relation))
+
+    def is_descendant(self, frame, other_frame, relation='Inheritance'):
+        """
+        :rtype: bool
+        :return: True if other_frame is (transitively) a sub frame of frame
+        """
+        return other_frame in self.descendants(frame, relation=relation)
+
+    def depth(self, frame, relation='Inheritance'):
+        """
+        :rtype: int
+        :return: distance from the frame to its most distant ancestor
+        (0 for frames without ancestors)
+        """
+        return max(self.ancestors(frame, relation=relation).values(), default=0)
+
+    def lowest_common_ancestors(self, frame, other_frame, relation='Inheritance'):
+        """
+        common ancestors (a frame counts as its own ancestor) that have no descendant
+        among the common ancestors, filtered with the precomputed descendant closures.
+        There is no traversal, but every pair of common ancestors is compared,
+        so a query takes O(c^2) dict lookups for c common ancestors.
+        With multiple inheritance, there can be several lowest common ancestors.
+        Frames on a cycle (e.g., in 'Precedes') are each other's descendants; they only exclude
+        each other if one of them has a common-ancestor descendant outside the cycle.
+
+        :param str frame: frame name
+        :param str other_frame: frame name
+        :param str relation: relation type
+
+        :rtype: set
+        :return: the lowest common ancestors, empty if the frames have no common ancestor
+        (e.g., if the relation type has no edges in the index)
+        """
+        ancestors = set(self.ancestors(frame, relation=relation)) | {frame}
+        other_ancestors = set(self.ancestors(other_frame, relation=relation)) | {other_frame}
+        common = ancestors & other_ancestors
+
+        lowest = set()
+        for node in common:
+            descendants = self.descendants(node, relation=relation)
+            # common ancestors below node that are not also above it (i.e., not on a cycle with node)
+            if not any(other in descendants and node not in self.descendants(other, relation=relation)
+                       for other in common):
+                lowest.add(node)
+
+        return lowest
+
+    def to_payload(self):
+        """
+        :rtype: dict
+        :return: edges and precomputed closures, e.g., to store in a snapshot (see snapshot_utils)
+        """
+        return {
+            'relation2edges': self.relation2edges,
+            'relation2descendants': self.relation2descendants,
+            'relation2ancestors': self.relation2ancestors,
+        }
+
+    @classmethod
+    def from_payload(cls, payload):
+        """
+        restore an index from to_payload without recomputing the closures
+
+        :rtype: RelationHierarchyIndex
+        """
+        index = cls.__new__(cls)
+        index.relation2edges = payload['relation2edges']
+        index.relation2descendants = payload['relation2descendants']
+        index.relation2ancestors = payload['relation2ancestors']
+        return index
+
+    def save(self, path):
+        with open(path, 'wb') as outfile:
+            pickle.dump(self.to_payload(), outfile, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as infile:
+            return cls.from_payload(pickle.load(infile))
+
+
+def _to_csr(num_nodes, sources, targets, masks):
+    """
+    :rtype: tuple
+    :return: (indptr, indices, masks) of the edges sorted by source node
+    """
+    order = numpy.lexsort((targets, sources))
+    indptr = numpy.zeros(num_nodes + 1, dtype=numpy.int32)
+    numpy.cumsum(numpy.bincount(sources, minlength=num_nodes), out=indptr[1:])
+    return indptr, targets[order].astype(numpy.int32), masks[order]
+
+
+class CompactFrameGraph(object):
+    """
+    frame-to-frame relations as CSR adjacency arrays over integer node indices.
+
+    Each edge (super frame -> sub frame) carries a bitmask with one bit per relation type,
+    so that all parallel relations between two frames are kept.
+    Both the outgoing (super -> sub) and incoming (sub -> super) adjacency are stored.
+
+    The graph contains all relation types: traversals take the relation types
+    and direction per query, and the filtered matrices are cached.
+    """
+
+    def __init__(self, frame_ids, frame_names, relation_types, edges):
+        """
+        :param list frame_ids: FrameNet frame IDs, the position in the list is the node index
+        :param list frame_names: frame names in the same order as frame_ids
+        :param list relation_types: relation types, the position in the list is the bit in the masks
+        :param dict edges: (super node index, sub node index) -> bitmask of relation types
+        """
+        assert len(relation_types) <= 16, 'at most 16 relation types are supported'
+
+        self.frame_ids = numpy.asarray(frame_ids, dtype=numpy.int32)
+        self.frame_names = list(frame_names)
+        self.relation_types = list(relation_types)
+        self.name2index = {name: index for index, name in enumerate(self.frame_names)}
+        self.id2index = {frame_id: index for index, frame_id in enumerate(frame_ids)}
+        self.relation2bit = {relation: 1 << bit for bit, relation in enumerate(self.relation_types)}
+
+        pairs = numpy.array(list(edges.keys()), dtype=numpy.int32).reshape(-1, 2)
+        masks = numpy.array(list(edges.values()), dtype=numpy.uint16)
+        sources, targets = pairs[:, 0], pairs[:, 1]
+
+        self.indptr, self.indices, self.masks = _to_csr(self.num_nodes, sources, targets, masks)
+        self.in_indptr, self.in_indices, self.in_masks = _to_csr(self.num_nodes, targets, sources, masks)
+
+        # (relation mask, direction) -> transposed adjacency matrix used for traversals
+        self._traversal_matrices = {}
+
+    @classmethod
+    def from_fn_instance(cls, fn_instance):
+        """
+        :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+
+        :rtype: CompactFrameGraph
+        :return: graph of all frames (also those without relations) and all relation types
+        """
+        id2name = dict(fn_instance.frame_ids_and_names())
+        relation_types = []
+        relation2bit = {}
+        edges = defaultdict(int)
+
+        frame_relations = fn_instance.frame_relations()
+        for frame_relation in frame_relations:
+            id2name.setdefault(frame_relation.supID, frame_relation.superFrameName)
+            id2name.setdefault(frame_relation.subID, frame_relation.subFrameName)
+
+        frame_ids = sorted(id2name)
+        id2index = {frame_id: index for index, frame_id in enumerate(frame_ids)}
+
+        for frame_relation in frame_relations:
+            rel_type = frame_relation['type'].name
+            if rel_type not in relation2bit:
+                relation2bit[rel_type] = 1 << len(relation_types)
+                relation_types.append(rel_type)
+
+            key = (id2index[frame_relation.supID], id2index[frame_relation.subID])
+            edges[key] |= relation2bit[rel_type]
+
+        return cls(frame_ids,
+                   [id2name[frame_id] for frame_id in frame_ids],
+                   relation_types,
+                   edges)
+
+    @property
+    def num_nodes(self):
+        return len(self.frame_ids)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    def nbytes(self):
+        """
+        :rtype: int
+        :return: memory used by the adjacency arrays
+        """
+        arrays = [self.frame_ids, self.indptr, self.indices, self.masks,
+                  self.in_indptr, self.in_indices, self.in_masks]
+        return sum(array.nbytes for array in arrays)
+
+    def relation_mask(self, relations=None):
+        """
+        :param relations: relation type, iterable of relation types, or None for all types
+
+        :rtype: int
+        :return: bitmask of the relation types
+        """
+        if relations is None:
+            return (1 << len(self.relation_types)) - 1
+        if isinstance(relations, str):
+            relations = [relations]
+        mask = 0
+        for relation in relations:
+            assert relation in self.relation2bit, f'unknown relation type {relation}, choose from {self.relation_types}'
+            mask |= self.relation2bit[relation]
+        return mask
+
+    def node_index(self, frame):
+        """
+        :param frame: frame name or FrameNet frame ID
+
+        :rtype: int
+        :return: node index
+        """
+        if isinstance(frame, str):
+            return self.name2index[frame]
+        return self.id2index[frame]
+
+    def adjacency_matrix(self, relations=None, direction='out'):
+        """
+        :param relations: relation type(s), None for all types
+        :param str direction: 'out' (super -> sub) | 'in' (sub -> super) | 'both'
+
+        :rtype: scipy.sparse.csr_matrix
+        :return: boolean adjacency matrix restricted to the relation types
+        """
+        assert direction in {'out', 'in', 'both'}, f'direction {direction} not supported'
+        from scipy import sparse
+
+        if direction == 'both':
+            matrix = self.adjacency_matrix(relations, 'out')
+            return (matrix + matrix.T).astype(bool).tocsr()
+
+        if direction == 'out':
+            indptr, indices, masks = self.indptr, self.indices, self.masks
+        else:
+            indptr, indices, masks = self.in_indptr, self.in_indices, self.in_masks
+
+        keep = (masks & self.relation_mask(relations)) != 0
+        rows = numpy.repeat(numpy.arange(self.num_nodes, dtype=numpy.int32), numpy.diff(indptr))
+        data = numpy.ones(int(keep.sum()), dtype=bool)
+
+        return sparse.csr_matrix((data, (rows[keep], indices[keep])),
+                                 shape=(self.num_nodes, self.num_nodes))
+
+    def _traversal_matrix(self, relations, direction):
+        """
+        :rtype: scipy.sparse.csr_matrix
+        :return: transposed adjacency matrix, cached per relation mask and direction
+        """
+        key = (self.relation_mask(relations), direction)
+        if key not in self._traversal_matrices:
+            self._traversal_matrices[key] = self.adjacency_matrix(relations, direction).T.tocsr()
+        return self._traversal_matrices[key]
+
+    def bfs_depths(self, sources, relations=None, direction='out', max_depth=None):
+        """
+        vectorized breadth-first search from one or more frames
+
+        :param sources: frame name/ID or list of them
+        :param relations: relation type(s), None for all types
+        :param str direction: 'out' (super -> sub) | 'in' (sub -> super) | 'both'
+        :param int max_depth: stop after this depth, None to traverse everything
+
+        :rtype: numpy.ndarray
+        :return: depth per node index (0 for the sources, -1 if not reachable)
+        """
+        if isinstance(sources, (str, int, numpy.integer)):
+            sources = [sources]
+        matrix = self._traversal_matrix(relations, direction)
+
+        depths = numpy.full(self.num_nodes, -1, dtype=numpy.int32)
+        frontier = numpy.zeros(self.num_nodes, dtype=bool)
+        frontier[[self.node_index(source) for source in sources]] = True
+        depth = 0
+
+        while frontier.any():
+            depths[frontier] = depth
+            if max_depth is not None and depth >= max_depth:
+                break
+            depth += 1
+            frontier = (matrix @ frontier) & (depths == -1)
+
+        return depths
+
+    def successors_by_depth(self, frame, relations=None, direction='out', max_depth=None):
+        """
+        same output as stats_utils.get_all_successors_of_all_successors,
+        but with the relation types and direction chosen per query.
+        Each frame is only listed at its smallest depth.
+
+        :param str frame: frame name
+        :param relations: relation type(s), None for all types
+        :param str direction: 'out' (super -> sub) | 'in' (sub -> super) | 'both'
+        :param int max_depth: maximum depth, None for no maximum
+
+        :rtype: dict
+        :return: {depth -> frame names at that level} (1 being the direct neighbours),
+        {0: {frame}} if the frame is not in the graph or has no edge of the relation types
+        (as stats_utils.get_all_successors_of_all_successors on a graph of only those relation types)
+        """
+        if frame not in self.name2index:
+            return {0: {frame}}
+
+        index = self.name2index[frame]
+        edges = self._traversal_matrix(relations, 'both')
+        if edges.indptr[index] == edges.indptr[index + 1]:
+            return {0: {frame}}
+
+        depths = self.bfs_depths(frame, relations=relations, direction=direction, max_depth=max_depth)
+
+        depth2frames = defaultdict(set)
+        for index in numpy.flatnonzero(depths > 0):
+            depth2frames[int(depths[index])].add(self.frame_names[index])
+
+        return dict(sorted(depth2frames.items()))
+
+    def neighbourhood(self, frame, radius=1, relations=None, direction='both'):
+        """
+        :param str frame: frame name
+        :param int radius: maximum depth
+        :param relations: relation type(s), None for all types
+        :param str direction: 'out' (super -> sub) | 'in' (sub -> super) | 'both'
+
+        :rtype: dict
+        :return: {depth -> frame names at that level} up to the radius
+        """
+        return self.successors_by_depth(frame,
+                                        relations=relations,
+                                        direction=direction,
+                                        max_depth=radius)
+
+    def neighbours(self, node_index, relations=None, direction='out'):
+        """
+        :param int node_index: node index
+        :param relations: relation type(s), None for all types
+        :param str direction: 'out' (super -> sub) | 'in' (sub -> super) | 'both'
+
+        :rtype: numpy.ndarray
+        :return: node indices of the neighbours
+        """
+        mask = self.relation_mask(relations)
+        neighbours = []
+        if direction in {'out', 'both'}:
+            start, end = self.indptr[node_index], self.indptr[node_index + 1]
+            neighbours.append(self.indices[start:end][(self.masks[start:end] & mask) != 0])
+        if direction in {'in', 'both'}:
+            start, end = self.in_indptr[node_index], self.in_indptr[node_index + 1]
+            neighbours.append(self.in_indices[start:end][(self.in_masks[start:end] & mask) != 0])
+        return numpy.unique(numpy.concatenate(neighbours))
+
+    def shortest_path(self, source, target, relations=None, direction='out'):
+        """
+        :param str source: frame name
+        :param str target: frame name
+        :param relations: relation type(s), None for all types
+        :param str direction: 'out' (super -> sub) | 'in' (sub -> super) | 'both'
+
+        :rtype: list
+        :return: frame names from source to target, None if there is no path
+        """
+        source_index = self.node_index(source)
+        target_index = self.node_index(target)
+
+        parents = {source_index: None}
+        frontier = [source_index]
+        while frontier and target_index not in parents:
+            next_frontier = []
+            for node_index in frontier:
+                for neighbour in self.neighbours(node_index, relations=relations, direction=direction):
+                    neighbour = int(neighbour)
+                    if neighbour not in parents:
+                        parents[neighbour] = node_index
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+
+        if target_index not in parents:
+            return None
+
+        path = []
+        node_index = target_index
+        while node_index is not None:
+            path.append(self.frame_names[node_index])
+            node_index = parents[node_index]
+
+        return path[::-1]
+
+    def all_paths(self, source, target, relations=None, direction='out', cutoff=None):
+        """
+        :param str source: frame name
+        :param str target: frame name
+        :param relations: relation type(s), None for all types
+        :param str direction: 'out' (super -> sub) | 'in' (sub -> super) | 'both'
+        :param int cutoff: maximum number of edges per path, None for no maximum
+
+        :rtype: generator
+        :return: simple paths (lists of frame names) from source to target
+        """
+        target_index = self.node_index(target)
+        stack = [(self.node_index(source), [self.node_index(source)])]
+
+        while stack:
+            node_index, path = stack.pop()
+            if node_index == target_index:
+                yield [self.frame_names[index] for index in path]
+                continue
+            if cutoff is not None and len(path) > cutoff:
+                continue
+            for neighbour in self.neighbours(node_index, relations=relations, direction=direction):
+                neighbour = int(neighbour)
+                if neighbour not in path:
+                    stack.append((neighbour, path + [neighbour]))
+
+    def reachable(self, frame, relations=None, direction='out'):
+        """
+        :rtype: set
+        :return: names of the frames reachable from frame (excluding the frame itself)
+        """
+        depths = self.bfs_depths(frame, relations=relations, direction=direction)
+        return {self.frame_names[index] for index in numpy.flatnonzero(depths > 0)}
+
+    def connected_components(self, relations=None, connection='weak'):
+        """
+        :param relations: relation type(s), None for all types
+        :param str connection: 'weak' | 'strong'
+
+        :rtype: tuple
+        :return: (number of components, component label per node index)
+        """
+        from scipy.sparse import csgraph
+        return csgraph.connected_components(self.adjacency_matrix(relations),
+                                            directed=True,
+                                            connection=connection)
+
+    def roots(self, relations=None):
+        """
+        :rtype: numpy.ndarray
+        :return: node indices without incoming edges of the relation types
+        """
+        matrix = self.adjacency_matrix(relations)
+        in_degree = numpy.asarray(matrix.sum(axis=0)).ravel()
+        return numpy.flatnonzero(in_degree == 0)
+
+    def depth_stats(self, relations='Inheritance'):
+        """
+        depth of each frame, i.e., its distance from the closest root (frame without super frames)
+
+        :param relations: relation type(s), None for all types
+
+        :rtype: pandas.core.series.Series
+        :return: summary statistics of the depths of all reachable frames
+        """
+        import pandas
+
+        roots = self.roots(relations)
+        if not len(roots):
+            return pandas.Series(dtype=float).describe()
+
+        depths = self.bfs_depths([int(self.frame_ids[root]) for root in roots], relations=relations)
+        return pandas.Series(depths[depths >= 0]).describe()
+
+    def edges_between(self, frames, relations=None):
+        """
+        :param iterable frames: frame names
+        :param relations: relation type(s), None for all types
+
+        :rtype: list
+        :return: sorted (super frame, sub frame, relation type) among the frames
+        """
+        mask = self.relation_mask(relations)
+        nodes = {self.name2index[frame] for frame in frames if frame in self.name2index}
+
+        edges = []
+        for source in nodes:
+            for position in range(self.indptr[source], self.indptr[source + 1]):
+                target = int(self.indices[position])
+                edge_mask = int(self.masks[position]) & mask
+                if target not in nodes or not edge_mask:
+                    continue
+                for relation in self.relation_types:
+                    if edge_mask & self.relation2bit[relation]:
+                        edges.append((self.frame_names[source], self.frame_names[target], relation))
+
+        return sorted(edges)
+
+    def to_networkx(self, relations=None):
+        """
+        :param relations: relation type(s), None for all types
+
+        :rtype: networkx.classes.multidigraph.MultiDiGraph
+        :return: graph keyed by frame names, with one edge per relation type (key=relation type)
+        """
+        mask = self.relation_mask(relations)
+        G = nx.MultiDiGraph()
+        G.add_nodes_from(self.frame_names)
+
+        edges = []
+        for source in range(self.num_nodes):
+            for position in range(self.indptr[source], self.indptr[source + 1]):
+                edge_mask = int(self.masks[position]) & mask
+                for relation in self.relation_types:
+                    if edge_mask & self.relation2bit[relation]:
+                        edges.append((self.frame_names[source],
+                                      self.frame_names[self.indices[position]],
+                                      relation))
+        G.add_edges_from(edges)
+
+        return G
@@ -0,0 +1,272 @@
+import os
+import tempfile
+import multiprocessing
+import pandas
+
+from annotation_utils import (AnnotationRef,
+                              ProgressReporter,
+                              SHARD_SIZES,
+                              get_lu_ids,
+                              get_doc_ids,
+                              make_shards,
+                              iter_layer_spans,
+                              iter_fulltext_annotations,
+                              init_worker,
+                              get_worker_fn_instance)
+
+
+LAYERS = ('FE', 'GF', 'PT', 'Target')
+COLUMNS = ['source', 'doc_id', 'sentence_id', 'lu_id', 'frame', 'pos', 'layer', 'label', 'start', 'end']
+CATEGORICAL_COLUMNS = ['source', 'frame', 'pos', 'layer', 'label']
+INTEGER_COLUMNS = ['doc_id', 'sentence_id', 'lu_id', 'start', 'end']
+INDEX_FILENAME = 'annotations.parquet'
+
+
+def _new_columns():
+    return {column: [] for column in COLUMNS}
+
+
+def _add_row(columns, *values):
+    for column, value in zip(COLUMNS, values):
+        columns[column].append(value)
+
+
+def exemplar_columns(fn_instance, lu_ids, layers=LAYERS):
+    """
+    flatten the exemplar annotations of LUs into columns
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param list lu_ids: LU IDs whose exemplars are read
+    :param tuple layers: any of 'FE', 'GF', 'PT', and 'Target'
+
+    :rtype: dict
+    :return: column name -> list of values (see COLUMNS)
+    """
+    columns = _new_columns()
+
+    for lu_id in lu_ids:
+        lu = fn_instance.lu(lu_id)
+        for sentence in lu.exemplars:
+            if 'frameAnnotation' not in sentence:
+                continue
+            for layer, label, start, end in iter_layer_spans(sentence, layers=layers):
+                _add_row(columns, 'exemplar', -1, sentence.ID, lu_id, lu.frame.name, lu.POS,
+                         layer, label, start, end)
+
+    return columns
+
+
+def fulltext_columns(fn_instance, doc_ids=None, layers=LAYERS):
+    """
+    flatten the full-text annotations of documents into columns,
+    reading one document at a time (see annotation_utils.iter_fulltext_annotations)
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param list doc_ids: document IDs that are read, None for all documents
+    :param tuple layers: any of 'FE', 'GF', 'PT', and 'Target'
+
+    :rtype: dict
+    :return: column name -> list of values (see COLUMNS)
+    """
+    if doc_ids is None:
+        doc_ids = get_doc_ids(fn_instance)
+
+    columns = _new_columns()
+
+    for doc_id, sentence, annotation in iter_fulltext_annotations(fn_instance, doc_ids):
+        pos = annotation.luName.rsplit('.', 1)[1].upper()
+        for layer, label, start, end in iter_layer_spans(annotation, layers=layers):
+            _add_row(columns, 'fulltext', doc_id, sentence.ID, annotation.luID, annotation.frameName, pos,
+                     layer, label, start, end)
+
+    return columns
+
+
+def columns_to_df(list_of_columns):
+    """
+    concatenate columns into one compact dataframe
+
+    :param list list_of_columns: list of dicts of column name -> list of values
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: df with categorical and int32 columns
+    """
+    data = {}
+    for column in COLUMNS:
+        values = [value
+                  for columns in list_of_columns
+                  for value in columns[column]]
+        if column in CATEGORICAL_COLUMNS:
+            data[column] = pandas.Categorical(values)
+        else:
+            data[column] = pandas.array(values, dtype='int32')
+
+    return pandas.DataFrame(data, columns=COLUMNS)
+
+
+SOURCE_COLUMNS = {
+    'exemplar': exemplar_columns,
+    'fulltext': fulltext_columns,
+}
+
+
+def _index_shard(task):
+    source, items = task
+    return len(items), SOURCE_COLUMNS[source](get_worker_fn_instance(), items)
+
+
+def build_annotation_index(fn_instance,
+                           index_dir,
+                           num_workers=None,
+                           shard_size=50,
+                           verbose=0):
+    """
+    flatten all exemplar and full-text annotation layers (FE, GF, PT, Target)
+    into one columnar table and write it to disk as Parquet
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    (has to be loaded with stats_utils.load_framenet if num_workers > 1)
+    :param str index_dir: folder in which the index is stored
+    :param int num_workers: number of processes, None for the number of CPUs
+    :param int shard_size: number of LUs per task (full-text documents are one task each)
+    :param int verbose: if >= 2, progress is printed
+
+    :rtype: AnnotationIndex
+    :return: the index
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    lu_ids = get_lu_ids(fn_instance)
+    doc_ids = get_doc_ids(fn_instance)
+    # exemplar shards first, so that the rows are in the same order as before
+    tasks = [('exemplar', shard) for shard in make_shards(lu_ids, shard_size)]
+    tasks.extend(('fulltext', shard) for shard in make_shards(doc_ids, SHARD_SIZES['fulltext']))
+    progress = ProgressReporter(total=len(lu_ids) + len(doc_ids),
+                                description='indexed LUs and documents',
+                                verbose=verbose)
+
+    list_of_columns = []
+    if num_workers == 1:
+        for source, items in tasks:
+            list_of_columns.append(SOURCE_COLUMNS[source](fn_instance, items))
+            progress.update(len(items))
+    else:
+        from stats_utils import registry
+        version = registry.version_of(fn_instance)
+        assert version is not None, 'fn_instance has to be loaded with stats_utils.load_framenet'
+
+        with multiprocessing.Pool(processes=num_workers,
+                                  initializer=init_worker,
+                                  initargs=(version,),
+                                  maxtasksperchild=20) as pool:
+            for num_items, columns in pool.imap(_index_shard, tasks):
+                list_of_columns.append(columns)
+                progress.update(num_items)
+    progress.finish()
+
+    df = columns_to_df(list_of_columns)
+
+    os.makedirs(index_dir, exist_ok=True)
+    index_path = os.path.join(index_dir, INDEX_FILENAME)
+    # a unique temporary file, so that concurrent builds do not write to the same file
+    fd, temp_path = tempfile.mkstemp(dir=index_dir, suffix='.tmp')
+    try:
+        # the mode of a file created with open instead of the 0600 of mkstemp
+        umask = os.umask(0)
+        os.umask(umask)
+        os.fchmod(fd, 0o666 & ~umask)
+        with os.fdopen(fd, 'wb') as outfile:
+            df.to_parquet(outfile, index=False)
+        os.replace(temp_path, index_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    if verbose:
+        print(f'written annotation index with {len(df)} rows to {index_path}')
+
+    return AnnotationIndex(df)
+
+
+class AnnotationIndex(object):
+    """
+    columnar index of annotation layers with vectorized filters
+
+    every row is one labelled span:
+    source ('exemplar' | 'fulltext'), doc_id (-1 for exemplars), sentence_id, lu_id,
+    frame, pos, layer ('FE' | 'GF' | 'PT' | 'Target'), label, start, end
+    """
+
+    def __init__(self, df):
+        self.df = df
+
+    @classmethod
+    def load(cls, index_dir):
+        """
+        :param str index_dir: folder of an index created with build_annotation_index
+
+        :rtype: AnnotationIndex
+        """
+        df = pandas.read_parquet(os.path.join(index_dir, INDEX_FILENAME))
+        return cls(df)
+
+    @staticmethod
+    def exists(index_dir):
+        return os.path.exists(os.path.join(index_dir, INDEX_FILENAME))
+
+    def __len__(self):
+        return len(self.df)
+
+    def select(self, **filters):
+        """
+        :param filters: column -> value or list/set of values, e.g., layer='GF', pos=['N', 'V']
+
+        :rtype: pandas.core.frame.DataFrame
+        :return: rows that match all filters
+        """
+        mask = pandas.Series(True, index=self.df.index)
+        for column, value in filters.items():
+            if isinstance(value, (list, set, tuple)):
+                mask &= self.df[column].isin(value)
+            else:
+                mask &= self.df[column] == value
+
+        return self.df[mask]
+
+    def count(self, by=('pos', 'label'), **filters):
+        """
+        :param tuple by: columns to group by, e.g., ('pos', 'label') or ('frame', 'label')
+        :param filters: see select, e.g., layer='GF'
+
+        :rtype: pandas.core.series.Series
+        :return: frequency per group, sorted from most to least frequent
+        """
+        rows = self.select(**filters)
+        return rows.groupby(list(by), observed=True).size().sort_values(ascending=False)
+
+    def sample(self, n=1, seed=None, **filters):
+        """
+        :param int n: number of rows (at most the number of matching rows)
+        :param seed: seed for sampling
+        :param filters: see select, e.g., layer='PT', pos='V', label='VPed'
+
+        :rtype: pandas.core.frame.DataFrame
+        :return: randomly sampled rows
+        """
+        rows = self.select(**filters)
+        return rows.sample(n=min(n, len(rows)), random_state=seed)
+
+    @staticmethod
+    def to_refs(rows):
+        """
+        :param pandas.core.frame.DataFrame rows: exemplar rows, e.g., from sample
+
+        :rtype: list
+        :return: annotation_utils.AnnotationRef per row (see stats_utils.resolve_annotation)
+        """
+        return [AnnotationRef(int(sentence_id), int(lu_id), int(start), int(end))
+                for sentence_id, lu_id, start, end in zip(rows['sentence_id'],
+                                                          rows['lu_id'],
+                                                          rows['start'],
+                                                          rows['end'])]
@@ -0,0 +1,567 @@
+import os
+import sys
+import json
+import stat
+import errno
+import socket
+import threading
+import http.client
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import MappingProxyType
+from collections import defaultdict, namedtuple
+
+from traversal_utils import LexiconAggregator, traverse_lexicon
+
+
+class LUIndex(object):
+    """
+    frozen lu -> frame IDs index for fast in-process lookups
+
+    keys are lemmas (pos_in_lu=False) or (lemma, pos) pairs (pos_in_lu=True), see tool_utils.get_lu.
+    Strings are interned and identical lists of frame IDs are stored once as a tuple.
+    """
+
+    __slots__ = ('pos_in_lu', 'pos_mapping', '_lu_to_frames')
+
+    def __init__(self, lu_to_frames, pos_in_lu=False, pos_mapping=dict()):
+        """
+        :param dict lu_to_frames: lu -> candidate frame IDs (see tool_utils.load_lu_to_frames)
+        :param bool pos_in_lu: True if the keys are (lemma, pos) pairs
+        :param dict pos_mapping: the pos_mapping that was used to create lu_to_frames
+        """
+        frames2shared = {}
+        index = {}
+
+        for lu, frame_ids in lu_to_frames.items():
+            if pos_in_lu:
+                lemma, pos = lu
+                key = (sys.intern(lemma), sys.intern(pos))
+            else:
+                key = sys.intern(lu)
+
+            frame_ids = tuple(sorted(sys.intern(str(frame_id)) for frame_id in frame_ids))
+            index[key] = frames2shared.setdefault(frame_ids, frame_ids)
+
+        self.pos_in_lu = pos_in_lu
+        self.pos_mapping = MappingProxyType(dict(pos_mapping))
+        self._lu_to_frames = MappingProxyType(index)
+
+    @classmethod
+    def from_fn_instance(cls, fn_instance, pos_in_lu=False, pos_mapping=dict()):
+        """
+        :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: loaded instance of FrameNet in nltk
+        :param bool pos_in_lu: see tool_utils.load_lu_to_frames
+        :param dict pos_mapping: see tool_utils.load_lu_to_frames
+
+        :rtype: LUIndex
+        """
+        from tool_utils import load_lu_to_frames
+
+        lu_to_frames = load_lu_to_frames(fn_instance, pos_in_lu=pos_in_lu, pos_mapping=pos_mapping)
+        return cls(lu_to_frames, pos_in_lu=pos_in_lu, pos_mapping=pos_mapping)
+
+    @classmethod
+    def from_file(cls, path, pos_in_lu=False, output_format=None):
+        """
+        :param str path: lu_to_frames artifact of tool_utils.create_tool_input (any output format)
+        :param bool pos_in_lu: True if the artifact was created with pos_in_lu=True
+        (keys 'lemma.pos' are split into (lemma, pos))
+        :param str output_format: see format_utils.iter_records
+
+        :rtype: LUIndex
+        """
+        from format_utils import iter_records
+
+        lu_to_frames = {}
+        for key, frame_ids in iter_records(path, output_format=output_format):
+            if pos_in_lu:
+                key = tuple(key.rsplit('.', 1))
+            lu_to_frames[key] = frame_ids
+
+        return cls(lu_to_frames, pos_in_lu=pos_in_lu)
+
+    def __len__(self):
+        return len(self._lu_to_frames)
+
+    def __contains__(self, lu):
+        return self._key(lu) in self._lu_to_frames
+
+    def lus(self):
+        """
+        :rtype: list
+        :return: all lus of the index
+        """
+        return list(self._lu_to_frames)
+
+    def _key(self, lu):
+        if self.pos_in_lu:
+            lemma, pos = lu
+            return lemma, self.pos_mapping.get(pos, pos)
+        return lu
+
+    def lookup(self, lu):
+        """
+        :param lu: lemma, or (lemma, pos) if the index was built with pos_in_lu=True
+        (pos is mapped with the pos_mapping of the index if it is a FrameNet pos)
+
+        :rtype: tuple
+        :return: candidate frame IDs, empty if the lu is unknown
+        """
+        return self._lu_to_frames.get(self._key(lu), ())
+
+    def lookup_many(self, lus):
+        """
+        :param iterable lus: lemmas or (lemma, pos) pairs
+
+        :rtype: list
+        :return: tuple of candidate frame IDs per lu
+        """
+        get = self._lu_to_frames.get
+        if self.pos_in_lu:
+            pos_mapping = self.pos_mapping
+            return [get((lemma, pos_mapping.get(pos, pos)), ()) for lemma, pos in lus]
+        return [get(lu, ()) for lu in lus]
+
+
+Candidate = namedtuple('Candidate', ['frame_id', 'frame_label', 'lu_name', 'match', 'score'])
+Candidate.__doc__ = """
+candidate frame of a token, with the best matching lu of that frame (see CandidateIndex)
+"""
+
+MATCH_SCORES = {
+    'exact': 1.0,
+    'lowercase': 0.9,
+    'edit_distance': 0.6,
+    'multiword_head': 0.5,
+    'prefix': 0.4,
+}
+
+KEY_TYPES = ['lowercase', 'multiword_head', 'deletion', 'prefix']
+MIN_PREFIX_LENGTH = 3
+
+
+def split_lu_name(lu_name):
+    """
+    :param str lu_name: e.g., 'give up.v' or 'e.g..adv'
+
+    :rtype: tuple
+    :return: (lemma, pos), e.g., ('give up', 'v') or ('e.g.', 'adv')
+    """
+    lemma, pos = lu_name.rsplit('.', 1)
+    return lemma, pos
+
+
+def get_multiword_head(lemma, pos):
+    """
+    :param str lemma: e.g., 'give up' or 'ice cream'
+    :param str pos: FrameNet pos, e.g., 'v' or 'n'
+
+    :rtype: str
+    :return: first token for verbs and prepositions, last token otherwise,
+    None if the lemma is a single token
+    """
+    tokens = lemma.replace('_', ' ').split()
+    if len(tokens) < 2:
+        return None
+    if pos in {'v', 'prep'}:
+        return tokens[0]
+    return tokens[-1]
+
+
+def get_deletions(word, max_distance=1):
+    """
+    deletion neighbourhood of a word (symmetric delete spelling correction)
+
+    :rtype: set
+    :return: all strings that are obtained by deleting at most max_distance characters
+    """
+    deletions = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {variant[:index] + variant[index + 1:]
+                    for variant in frontier
+                    for index in range(len(variant))}
+        deletions |= frontier
+    return deletions
+
+
+def edit_distance(a, b):
+    """
+    :rtype: int
+    :return: Levenshtein distance between a and b
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+class LUCandidateAggregator(LexiconAggregator):
+    """
+    (lu name, frame ID, frame label) of all lus (see CandidateIndex.from_fn_instance)
+    """
+
+    def __init__(self):
+        self.lus = []
+
+    def visit_lu(self, frame, lu_name, lu):
+        self.lus.append((lu_name, frame.ID, frame.name))
+
+    def result(self):
+        return self.lus
+
+
+class CandidateIndex(object):
+    """
+    candidate generation of frames for a token over all lu names, with the keys:
+    - exact: the lemma of the lu
+    - lowercase: the lowercased lemma
+    - multiword_head: the head of a multiword lemma (see get_multiword_head)
+    - deletion: deletion neighbourhood of the lowercased lemma (see get_deletions), for edit-distance matches
+    - prefix: the first prefix_length characters of the lowercased lemma, e.g., for inflected tokens
+    (lemmas shorter than MIN_PREFIX_LENGTH have no prefix key)
+
+    Each key maps to a tuple of positions in the list of lus.
+    """
+
+    def __init__(self, lus, max_distance=1, prefix_length=4, key2positions=None):
+        """
+        :param list lus: list of (lu name, frame ID, frame label)
+        :param int max_distance: maximum edit distance of edit_distance matches
+        :param int prefix_length: length of the prefix keys
+        :param dict key2positions: key type -> key -> positions, if None, they are computed
+        """
+        self.lus = [(sys.intern(lu_name), int(frame_id), sys.intern(frame_label))
+                    for lu_name, frame_id, frame_label in lus]
+        self.lemmas = []
+        self.poss = []
+        for lu_name, frame_id, frame_label in self.lus:
+            lemma, pos = split_lu_name(lu_name)
+            self.lemmas.append(sys.intern(lemma))
+            self.poss.append(sys.intern(pos))
+
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+
+        self.exact = defaultdict(list)
+        for position, lemma in enumerate(self.lemmas):
+            self.exact[lemma].append(position)
+
+        if key2positions is None:
+            key2positions = self._build_keys()
+        self.key2positions = {key_type: {key: tuple(positions) for key, positions in key2positions[key_type].items()}
+                              for key_type in KEY_TYPES}
+
+    def _build_keys(self):
+        key2positions = {key_type: defaultdict(list) for key_type in KEY_TYPES}
+
+        for position, (lemma, pos) in enumerate(zip(self.lemmas, self.poss)):
+            lowercased = lemma.lower()
+            key2positions['lowercase'][lowercased].append(position)
+
+            head = get_multiword_head(lowercased, pos)
+            if head is not None:
+                key2positions['multiword_head'][head].append(position)
+
+            for deletion in get_deletions(lowercased, max_distance=self.max_distance):
+                key2positions['deletion'][deletion].append(position)
+
+            if len(lowercased) >= MIN_PREFIX_LENGTH:
+                key2positions['prefix'][lowercased[:self.prefix_length]].append(position)
+
+        return key2positions
+
+    @classmethod
+    def from_fn_instance(cls, fn_instance, max_distance=1, prefix_length=4):
+        """
+        :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: loaded instance of FrameNet in nltk
+
+        :rtype: CandidateIndex
+        """
+        lus = traverse_lexicon(fn_instance, {'lus': LUCandidateAggregator()})['lus']
+        return cls(lus, max_distance=max_distance, prefix_length=prefix_length)
+
+    def records(self):
+        """
+        :rtype: generator
+        :return: (name, value) records to persist the index with format_utils.write_records
+        """
+        yield 'settings', {'max_distance': self.max_distance, 'prefix_length': self.prefix_length}
+        yield 'lus', self.lus
+        for key_type in KEY_TYPES:
+            yield key_type, self.key2positions[key_type]
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        :param records: (name, value) records, e.g., format_utils.iter_records of a persisted index
+
+        :rtype: CandidateIndex
+        """
+        records = dict(records)
+        return cls(records['lus'],
+                   key2positions={key_type: records[key_type] for key_type in KEY_TYPES},
+                   **records['settings'])
+
+    @classmethod
+    def load(cls, path, output_format=None):
+        """
+        :param str path: lu_candidates artifact of tool_utils.create_tool_input
+
+        :rtype: CandidateIndex
+        """
+        from format_utils import iter_records
+
+        return cls.from_records(iter_records(path, output_format=output_format))
+
+    def __len__(self):
+        return len(self.lus)
+
+    def matches(self, token, pos=None):
+        """
+        :param str token: e.g., 'Running', 'give', 'murderd'
+        :param str pos: FrameNet pos (e.g., 'v'), None for all pos
+
+        :rtype: dict
+        :return: position of lu -> (match type, score), with the best match per lu
+        """
+        lowercased = token.lower()
+        position2match = {}
+
+        def add(positions, match, score):
+            for position in positions:
+                if pos is not None and self.poss[position] != pos:
+                    continue
+                if position not in position2match or position2match[position][1] < score:
+                    position2match[position] = (match, score)
+
+        add(self.exact.get(token, ()), 'exact', MATCH_SCORES['exact'])
+        add(self.key2positions['lowercase'].get(lowercased, ()), 'lowercase', MATCH_SCORES['lowercase'])
+        add(self.key2positions['multiword_head'].get(lowercased, ()), 'multiword_head', MATCH_SCORES['multiword_head'])
+
+        if self.max_distance:
+            deletion_keys = self.key2positions['deletion']
+            candidates = set()
+            for deletion in get_deletions(lowercased, max_distance=self.max_distance):
+                candidates.update(deletion_keys.get(deletion, ()))
+            for position in candidates:
+                distance = edit_distance(lowercased, self.lemmas[position].lower())
+                if 0 < distance <= self.max_distance:
+                    add([position], 'edit_distance', MATCH_SCORES['edit_distance'] / distance)
+
+        # lemmas shorter than prefix_length are keyed by the whole lemma, e.g., 'run' for 'running'
+        prefix_keys = self.key2positions['prefix']
+        for length in range(MIN_PREFIX_LENGTH, min(len(lowercased), self.prefix_length) + 1):
+            for position in prefix_keys.get(lowercased[:length], ()):
+                lemma = self.lemmas[position].lower()
+                common = len(os.path.commonprefix([lowercased, lemma]))
+                add([position], 'prefix', MATCH_SCORES['prefix'] * common / max(len(lowercased), len(lemma)))
+
+        return position2match
+
+    def candidates(self, token, pos=None, max_candidates=10):
+        """
+        rank the candidate frames of a token
+
+        :param str token: e.g., 'Running', 'give', 'murderd'
+        :param str pos: FrameNet pos (e.g., 'v'), None for all pos
+        :param int max_candidates: maximum number of candidates, None for all
+
+        :rtype: list
+        :return: Candidate per frame, sorted from best to worst
+        """
+        frame2candidate = {}
+        for position, (match, score) in self.matches(token, pos=pos).items():
+            lu_name, frame_id, frame_label = self.lus[position]
+            if frame_id not in frame2candidate or frame2candidate[frame_id].score < score:
+                frame2candidate[frame_id] = Candidate(frame_id, frame_label, lu_name, match, score)
+
+        ranked = sorted(frame2candidate.values(), key=lambda candidate: (-candidate.score, candidate.frame_id))
+        if max_candidates is not None:
+            ranked = ranked[:max_candidates]
+        return ranked
+
+
+class LookupRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /lookup with {"lus": [lemma, ...]} or {"lus": [[lemma, pos], ...]}
+    returns {"frames": [[frame ID, ...], ...]}
+    """
+
+    index = None
+
+    def do_POST(self):
+        if self.path != '/lookup':
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            request = json.loads(self.rfile.read(length))
+            lus = request['lus']
+            if self.index.pos_in_lu:
+                lus = [tuple(lu) for lu in lus]
+            frames = self.index.lookup_many(lus)
+        except (ValueError, KeyError, TypeError) as error:
+            self.send_error(400, str(error))
+            return
+
+        body = json.dumps({'frames': frames}, separators=(',', ':')).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, client_address = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) address
+        return request, ('localhost', 0)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def remove_stale_socket(path):
+    """
+    remove a Unix socket that no server is listening on anymore
+
+    :param str path: path of a Unix socket
+
+    :raises FileExistsError: if the path exists and is not a socket
+    :raises OSError: if a server is still listening on the socket
+    """
+    if not os.path.exists(path):
+        return
+
+    if not stat.S_ISSOCK(os.stat(path).st_mode):
+        raise FileExistsError(errno.EEXIST, 'exists and is not a socket', path)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(path)
+        except ConnectionRefusedError:
+            os.remove(path)
+            return
+
+    raise OSError(errno.EADDRINUSE, 'a server is listening on this socket', path)
+
+
+def make_server(index, host='127.0.0.1', port=8765, unix_socket=None):
+    """
+    :param LUIndex index: the index that is served
+    :param str host: host of the HTTP server
+    :param int port: port of the HTTP server, 0 for a free port
+    :param str unix_socket: path of a Unix socket, in which case host and port are ignored.
+    A stale socket at the path is replaced (see remove_stale_socket), and the socket is removed
+    when the server is closed
+
+    :return: server, call serve_forever() to start it (see serve)
+    """
+    handler = type('BoundLookupRequestHandler', (LookupRequestHandler,), {'index': index})
+
+    if unix_socket is not None:
+        remove_stale_socket(unix_socket)
+        return ThreadingUnixHTTPServer(unix_socket, handler)
+
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(index, host='127.0.0.1', port=8765, unix_socket=None, background=False, verbose=0):
+    """
+    serve the index to other processes over HTTP (see LookupClient)
+
+    :param LUIndex index: the index that is served
+    :param bool background: if True, the server runs in a daemon thread and is returned
+
+    :return: the server if background is True, else this blocks until interrupted
+    """
+    server = make_server(index, host=host, port=port, unix_socket=unix_socket)
+
+    if verbose:
+        address = unix_socket if unix_socket is not None else 'http://%s:%s' % server.server_address[:2]
+        print(f'serving {len(index)} lus on {address}')
+
+    if background:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return server
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, unix_socket, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_socket = unix_socket
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_socket)
+
+
+class LookupClient(object):
+    """
+    client of a server started with serve, with the lookup interface of LUIndex
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, unix_socket=None, timeout=None):
+        if unix_socket is not None:
+            self.connection = UnixHTTPConnection(unix_socket, timeout=timeout)
+        else:
+            self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def lookup_many(self, lus):
+        """
+        :param list lus: lemmas or (lemma, pos) pairs
+
+        :rtype: list
+        :return: tuple of candidate frame IDs per lu
+        """
+        body = json.dumps({'lus': list(lus)}).encode('utf-8')
+        self.connection.request('POST', '/lookup', body=body,
+                                headers={'Content-Type': 'application/json'})
+        response = self.connection.getresponse()
+        content = response.read()
+        assert response.status == 200, f'lookup failed: {response.status} {content}'
+
+        return [tuple(frame_ids) for frame_ids in json.loads(content)['frames']]
+
+    def lookup(self, lu):
+        return self.lookup_many([lu])[0]
+
+    def close(self):
+        self.connection.close()
+
+
+if __name__ == '__main__':
+    from stats_utils import load_framenet
+
+    fn = load_framenet(version='1.7')
+    index = LUIndex.from_fn_instance(fn)
+    serve(index, verbose=1)
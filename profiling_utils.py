@@ -0,0 +1,245 @@
+import json
+import threading
+import functools
+import tracemalloc
+from contextlib import contextmanager
+from time import perf_counter
+
+
+class StageRecord(object):
+    """
+    measurements of one execution of a stage (see Profiler.stage)
+    """
+
+    def __init__(self, name, parent=None, num_items=None):
+        self.name = name
+        self.parent = parent
+        self.num_items = num_items
+        self.wall_time = None
+        self.peak_memory = None
+
+    def add_items(self, num_items=1):
+        """
+        :param int num_items: number of processed items, e.g., frames or annotations
+        """
+        self.num_items = (self.num_items or 0) + num_items
+
+    def to_dict(self):
+        return {
+            'stage': self.name,
+            'parent': self.parent,
+            'wall_time': self.wall_time,
+            'num_items': self.num_items,
+            'peak_memory': self.peak_memory,
+        }
+
+
+class _NullRecord(object):
+    """
+    returned by Profiler.stage if profiling is disabled
+    """
+
+    def add_items(self, num_items=1):
+        pass
+
+
+_null_record = _NullRecord()
+
+
+class Profiler(object):
+    """
+    opt-in instrumentation: wall time, number of processed items and peak memory per stage.
+    Disabled stages cost one attribute lookup.
+
+    usage:
+        profiler.enable()
+        fn = load_framenet('1.7')
+        df = df_fe2num_frames(fn)
+        print(profiler.summary())
+        profiler.write_json('profile.json')
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        # only stop tracemalloc in disable if enable started it
+        self._started_tracing = False
+        self.records = []
+        self._local = threading.local()
+
+    def enable(self, trace_memory=True):
+        """
+        :param bool trace_memory: if True, the peak memory per stage is measured with tracemalloc
+        (which slows down allocation-heavy code)
+        """
+        self.enabled = True
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def disable(self):
+        """
+        tracemalloc is stopped if enable started it, tracing started by the caller is left running
+        """
+        self.enabled = False
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracing = False
+        self.trace_memory = False
+
+    def reset(self):
+        """
+        forget all records
+        """
+        self.records = []
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def stage(self, name, num_items=None):
+        """
+        measure a stage, e.g.,
+            with profiler.stage('aggregate', num_items=len(frames)) as record:
+                ...
+                record.add_items(1)
+
+        :param str name: name of the stage
+        :param int num_items: number of items processed in the stage, if known upfront
+        """
+        if not self.enabled:
+            yield _null_record
+            return
+
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        record = StageRecord(name, parent=parent['record'].name if parent else None, num_items=num_items)
+        frame = {'record': record, 'start_memory': 0, 'peak_memory': 0}
+
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent['peak_memory'] = max(parent['peak_memory'], peak)
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            frame['start_memory'] = frame['peak_memory'] = current
+
+        stack.append(frame)
+        start = perf_counter()
+        try:
+            yield record
+        finally:
+            record.wall_time = perf_counter() - start
+            stack.pop()
+
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                frame['peak_memory'] = max(frame['peak_memory'], peak)
+                record.peak_memory = frame['peak_memory'] - frame['start_memory']
+                if parent is not None:
+                    parent['peak_memory'] = max(parent['peak_memory'], frame['peak_memory'])
+
+            self.records.append(record)
+
+    def add(self, name, wall_time, num_items=None):
+        """
+        add a stage that was timed by the caller, e.g., time spent in a loop across iterations
+
+        :param str name: name of the stage
+        :param float wall_time: seconds
+        :param int num_items: number of processed items
+        """
+        if not self.enabled:
+            return
+
+        stack = self._stack()
+        record = StageRecord(name, parent=stack[-1]['record'].name if stack else None, num_items=num_items)
+        record.wall_time = wall_time
+        self.records.append(record)
+
+    def report(self):
+        """
+        :rtype: list
+        :return: one dict per stage execution, in order of completion
+        """
+        return [record.to_dict() for record in self.records]
+
+    def write_json(self, path):
+        """
+        :param str path: output path of the report (see report)
+        """
+        with open(path, 'w') as outfile:
+            json.dump({'stages': self.report()}, outfile, indent=4)
+
+    def summary(self):
+        """
+        :rtype: pandas.core.frame.DataFrame
+        :return: per stage: number of calls, total and mean wall time, items, items per second,
+        and maximum peak memory (MB), sorted by total wall time
+        """
+        import pandas
+
+        headers = ['stage', 'parent', 'wall_time', 'num_items', 'peak_memory']
+        df = pandas.DataFrame([[record.name,
+                                record.parent,
+                                record.wall_time,
+                                record.num_items,
+                                record.peak_memory]
+                               for record in self.records], columns=headers)
+
+        summary = df.groupby('stage', sort=False).agg(**{
+            'calls': ('wall_time', 'size'),
+            'total time (s)': ('wall_time', 'sum'),
+            'mean time (s)': ('wall_time', 'mean'),
+            'items': ('num_items', lambda num_items: num_items.sum(min_count=1)),
+            'peak memory (MB)': ('peak_memory', 'max'),
+        })
+        summary['items/s'] = summary['items'] / summary['total time (s)']
+        summary['peak memory (MB)'] = summary['peak memory (MB)'] / 2 ** 20
+
+        return summary.sort_values('total time (s)', ascending=False).reset_index()
+
+
+profiler = Profiler()
+
+
+def count_items(result):
+    """
+    :return: number of items of a result (e.g., rows of a DataFrame or keys of a dict),
+    None if it has no length or is a tuple of several results
+    """
+    if isinstance(result, (tuple, str, bytes)) or not hasattr(result, '__len__'):
+        return None
+    return len(result)
+
+
+def profiled(name=None, count=count_items):
+    """
+    decorator that measures each call of a function as a stage (see Profiler.stage)
+
+    :param str name: name of the stage, default: module.function
+    :param count: function from the return value to the number of processed items, None to not count
+    """
+    def decorator(function):
+        stage_name = name or f'{function.__module__}.{function.__name__}'
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return function(*args, **kwargs)
+
+            with profiler.stage(stage_name) as record:
+                result = function(*args, **kwargs)
+                if count is not None:
+                    num_items = count(result)
+                    if num_items is not None:
+                        record.add_items(num_items)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,189 @@
+import numpy
+import pandas
+from scipy import sparse as sp
+
+
+FEATURES = ['FE', 'lemma.pos', 'lemma']
+METRICS = ['jaccard', 'cosine']
+
+
+def get_feature_column(df_edges, feature):
+    """
+    :param pandas.core.frame.DataFrame df_edges: output of stats_utils.df_frame_fe_edges (feature 'FE')
+    or stats_utils.df_frame_lu_edges (features 'lemma.pos' and 'lemma')
+    :param str feature: one of FEATURES
+
+    :rtype: pandas.core.series.Series
+    :return: categorical feature per edge, e.g., 'buy.v' for 'lemma.pos' and 'buy' for 'lemma'
+    """
+    assert feature in FEATURES, f'{feature} not in {FEATURES}'
+
+    if feature == 'FE':
+        return df_edges['FE'].astype('category')
+
+    lu_names = df_edges['LU name'].astype('category')
+    if feature == 'lemma.pos':
+        return lu_names
+
+    # strip the POS from the categories only, not from every row
+    lemmas = pandas.Series(lu_names.cat.categories).str.rsplit('.', n=1).str[0]
+    return pandas.Series(pandas.Categorical(lemmas.to_numpy()[lu_names.cat.codes.to_numpy()]),
+                         index=df_edges.index)
+
+
+def incidence_matrix(df_edges, feature='FE'):
+    """
+    binary (frame x feature) matrix from an edge list.
+    Rows follow the categories of the 'Frame' column, so frames without any feature
+    (e.g., non-lexicalized frames for lemmas) have an empty row.
+
+    :param pandas.core.frame.DataFrame df_edges: see get_feature_column
+    :param str feature: one of FEATURES
+
+    :rtype: tuple
+    :return: (scipy.sparse.csr_matrix, list of frame labels, list of feature labels)
+    """
+    frames = df_edges['Frame'].astype('category')
+    features = get_feature_column(df_edges, feature)
+
+    rows = frames.cat.codes.to_numpy()
+    columns = features.cat.codes.to_numpy()
+    matrix = sp.coo_matrix((numpy.ones(len(rows), dtype='int32'), (rows, columns)),
+                           shape=(len(frames.cat.categories), len(features.cat.categories))).tocsr()
+    # an FE or lemma can occur twice in a frame (e.g., 'run.n' and 'run.v' for 'lemma')
+    matrix.data[:] = 1
+
+    return matrix, list(frames.cat.categories), list(features.cat.categories)
+
+
+def pairwise_similarity(matrix, metric='jaccard'):
+    """
+    all-pairs similarity of the rows of a binary matrix with one sparse matrix product:
+    the overlap of rows i and j is (X X^T)[i, j], so only pairs with any overlap are computed
+
+    jaccard: overlap / (|i| + |j| - overlap)
+    cosine: overlap / sqrt(|i| * |j|)
+
+    :param scipy.sparse.csr_matrix matrix: binary (frame x feature) matrix
+    :param str metric: one of METRICS
+
+    :rtype: tuple
+    :return: (similarity, overlap), both (frame x frame) scipy.sparse.csr_matrix
+    without the diagonal
+    """
+    assert metric in METRICS, f'{metric} not in {METRICS}'
+
+    overlap = (matrix @ matrix.T).tocoo()
+    off_diagonal = overlap.row != overlap.col
+    rows = overlap.row[off_diagonal]
+    columns = overlap.col[off_diagonal]
+    shared = overlap.data[off_diagonal].astype('float64')
+
+    sizes = numpy.asarray(matrix.sum(axis=1)).ravel().astype('float64')
+    if metric == 'jaccard':
+        values = shared / (sizes[rows] + sizes[columns] - shared)
+    else:
+        values = shared / numpy.sqrt(sizes[rows] * sizes[columns])
+
+    shape = overlap.shape
+    similarity = sp.csr_matrix((values, (rows, columns)), shape=shape)
+    overlap = sp.csr_matrix((shared.astype('int32'), (rows, columns)), shape=shape)
+
+    return similarity, overlap
+
+
+class FrameSimilarity(object):
+    """
+    pairwise similarity of frames based on shared FEs or lemmas (see stats_utils.get_frame_similarity)
+
+    usage:
+        similarity = FrameSimilarity.from_edges(df_frame_fe_edges(fn), feature='FE', metric='jaccard')
+        similarity.neighbours('Commerce_buy', k=5)
+    """
+
+    def __init__(self, similarity, overlap, frames, features, feature, metric):
+        """
+        :param scipy.sparse.csr_matrix similarity: (frame x frame) similarity
+        :param scipy.sparse.csr_matrix overlap: (frame x frame) number of shared features
+        :param list frames: frame label per row
+        :param list features: feature label per column of the incidence matrix
+        :param str feature: one of FEATURES
+        :param str metric: one of METRICS
+        """
+        self.similarity = similarity
+        self.overlap = overlap
+        self.frames = frames
+        self.features = features
+        self.feature = feature
+        self.metric = metric
+        self.frame2index = {frame: index for index, frame in enumerate(frames)}
+
+    @classmethod
+    def from_edges(cls, df_edges, feature='FE', metric='jaccard'):
+        """
+        :param pandas.core.frame.DataFrame df_edges: see get_feature_column
+        :param str feature: one of FEATURES
+        :param str metric: one of METRICS
+
+        :rtype: FrameSimilarity
+        """
+        matrix, frames, features = incidence_matrix(df_edges, feature=feature)
+        similarity, overlap = pairwise_similarity(matrix, metric=metric)
+        return cls(similarity, overlap, frames, features, feature, metric)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def get(self, frame, other_frame):
+        """
+        :rtype: float
+        :return: similarity of two frames (0.0 if they share nothing)
+        """
+        return float(self.similarity[self.frame2index[frame], self.frame2index[other_frame]])
+
+    def _top_k(self, index, k):
+        start, end = self.similarity.indptr[index], self.similarity.indptr[index + 1]
+        columns = self.similarity.indices[start:end]
+        values = self.similarity.data[start:end]
+        # highest similarity first, ties in the order of the frames
+        order = numpy.lexsort((columns, -values))[:k]
+        return columns[order], values[order]
+
+    def neighbours(self, frame, k=10):
+        """
+        :param str frame: frame label
+        :param int k: maximum number of neighbours, None for all frames with any overlap
+
+        :rtype: list
+        :return: (frame label, similarity, number of shared features), from most to least similar
+        """
+        assert frame in self.frame2index, f'{frame} is not a frame'
+        index = self.frame2index[frame]
+
+        columns, values = self._top_k(index, k)
+        return [(self.frames[column], float(value), int(self.overlap[index, column]))
+                for column, value in zip(columns, values)]
+
+    def to_df(self, k=10):
+        """
+        :param int k: maximum number of neighbours per frame, None for all frames with any overlap
+
+        :rtype: pandas.core.frame.DataFrame
+        :return: one row per (frame, neighbour) with the rank, similarity, and number of shared features
+        """
+        columns = {'Frame': [], 'Neighbour': [], 'Rank': [], 'Similarity': [], '# shared': []}
+        for frame in self.frames:
+            for rank, (neighbour, value, num_shared) in enumerate(self.neighbours(frame, k=k), 1):
+                for column, column_value in [('Frame', frame),
+                                             ('Neighbour', neighbour),
+                                             ('Rank', rank),
+                                             ('Similarity', value),
+                                             ('# shared', num_shared)]:
+                    columns[column].append(column_value)
+
+        df = pandas.DataFrame(columns)
+        df['Frame'] = pandas.Categorical(df['Frame'], categories=self.frames)
+        df['Neighbour'] = pandas.Categorical(df['Neighbour'], categories=self.frames)
+        df['Rank'] = df['Rank'].astype('int32')
+        df['# shared'] = df['# shared'].astype('int32')
+        return df
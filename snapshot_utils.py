@@ -0,0 +1,423 @@
+import os
+import re
+import pickle
+import hashlib
+
+from graph_utils import RelationHierarchyIndex
+
+
+SNAPSHOT_FORMAT = 2
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'fn_reader')
+
+
+class SnapshotEntry(dict):
+    """
+    dict with attribute access, mirroring the AttrDict objects of
+    nltk.corpus.reader.framenet, e.g., frame.name and frame['name']
+    """
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __repr__(self):
+        if '_type' not in self:
+            return dict.__repr__(self)
+        return f'<{self["_type"]} ID={self.get("ID")} name={self.get("name")}>'
+
+
+class FrameNetSnapshot(object):
+    """
+    FrameNet lexicon (frames, FEs, LUs, frame relations, semantic types)
+    and the closure of the frame relations (see graph_utils.RelationHierarchyIndex)
+    loaded from a compiled snapshot (see compile_snapshot).
+
+    It exposes the subset of the nltk.corpus.reader.framenet.FramenetCorpusReader
+    interface that is used by stats_utils and tool_utils.
+    Annotations (exemplars and full text) are not part of a snapshot.
+    """
+
+    def __init__(self, payload, path=None):
+        self.version = payload['version']
+        self.cache_key = payload['cache_key']
+        self.path = path
+        self._relation_index_payload = payload['relation_index']
+        self._relation_index = None
+
+        self._semtypes = {}
+        for st_id, name, abbrev, definition, super_id in payload['semtypes']:
+            self._semtypes[st_id] = SnapshotEntry(_type='semtype',
+                                                  ID=st_id,
+                                                  name=name,
+                                                  abbrev=abbrev,
+                                                  definition=definition,
+                                                  superType=super_id,
+                                                  subTypes=[])
+        for semtype in self._semtypes.values():
+            if semtype.superType is not None:
+                semtype['superType'] = self._semtypes[semtype.superType]
+                semtype.superType.subTypes.append(semtype)
+
+        self._frames = []
+        self._frame_by_id = {}
+        self._frame_by_name = {}
+        self._lus = []
+        self._lu_by_id = {}
+
+        for frame_id, name, definition, semtype_ids, fes, lus, coresets in payload['frames']:
+            frame = SnapshotEntry(_type='frame',
+                                  ID=frame_id,
+                                  name=name,
+                                  definition=definition,
+                                  semTypes=[self._semtypes[st_id] for st_id in semtype_ids],
+                                  FE=SnapshotEntry(),
+                                  lexUnit=SnapshotEntry(),
+                                  FEcoreSets=[])
+
+            for fe_id, fe_name, abbrev, fe_definition, core_type, semtype_id, requires, excludes in fes:
+                frame.FE[fe_name] = SnapshotEntry(_type='fe',
+                                                  ID=fe_id,
+                                                  name=fe_name,
+                                                  abbrev=abbrev,
+                                                  definition=fe_definition,
+                                                  coreType=core_type,
+                                                  semType=self._semtypes.get(semtype_id),
+                                                  requiresFE=requires,
+                                                  excludesFE=excludes,
+                                                  frame=frame)
+            for fe in frame.FE.values():
+                if fe.requiresFE is not None:
+                    fe['requiresFE'] = frame.FE[fe.requiresFE]
+                if fe.excludesFE is not None:
+                    fe['excludesFE'] = frame.FE[fe.excludesFE]
+
+            for coreset in coresets:
+                frame.FEcoreSets.append([frame.FE[fe_name] for fe_name in coreset])
+
+            for lu_id, lu_name, pos, lu_definition, status in lus:
+                lu = SnapshotEntry(_type='lu',
+                                   ID=lu_id,
+                                   name=lu_name,
+                                   POS=pos,
+                                   definition=lu_definition,
+                                   status=status,
+                                   frame=frame)
+                frame.lexUnit[lu_name] = lu
+                self._lus.append(lu)
+                self._lu_by_id[lu_id] = lu
+
+            self._frames.append(frame)
+            self._frame_by_id[frame_id] = frame
+            self._frame_by_name[name] = frame
+
+        self._relation_types = {}
+        self._frame_relations = []
+        for rel_id, rel_type, sup_id, sup_name, sub_id, sub_name in payload['frame_relations']:
+            if rel_type not in self._relation_types:
+                self._relation_types[rel_type] = SnapshotEntry(_type='framerelationtype',
+                                                               name=rel_type,
+                                                               frameRelations=[])
+            relation_type = self._relation_types[rel_type]
+            frame_relation = SnapshotEntry(_type='framerelation',
+                                           ID=rel_id,
+                                           type=relation_type,
+                                           supID=sup_id,
+                                           superFrameName=sup_name,
+                                           subID=sub_id,
+                                           subFrameName=sub_name,
+                                           superFrame=self._frame_by_id.get(sup_id),
+                                           subFrame=self._frame_by_id.get(sub_id))
+            frame_relation['Parent'] = frame_relation.superFrame
+            frame_relation['Child'] = frame_relation.subFrame
+            relation_type.frameRelations.append(frame_relation)
+            self._frame_relations.append(frame_relation)
+
+    def __repr__(self):
+        return f'<FrameNetSnapshot version={self.version} path={self.path}>'
+
+    def frames(self, name=None):
+        """
+        :param str name: (optional) regular expression that frame names should match
+
+        :rtype: list
+        :return: frames
+        """
+        if name is None:
+            return list(self._frames)
+        return [frame for frame in self._frames
+                if re.search(name, frame.name) is not None]
+
+    def frame_ids_and_names(self, name=None):
+        """
+        :param str name: (optional) regular expression that frame names should match
+
+        :rtype: dict
+        :return: frame ID -> frame name
+        """
+        return {frame.ID: frame.name
+                for frame in self.frames(name)}
+
+    def frame_by_id(self, fn_fid):
+        return self._frame_by_id[fn_fid]
+
+    def frame_by_name(self, fn_fname):
+        return self._frame_by_name[fn_fname]
+
+    def frame(self, fn_fid_or_fname):
+        if isinstance(fn_fid_or_fname, str):
+            return self.frame_by_name(fn_fid_or_fname)
+        return self.frame_by_id(fn_fid_or_fname)
+
+    def lus(self, name=None):
+        """
+        :param str name: (optional) regular expression that LU names should match
+
+        :rtype: list
+        :return: lexical units
+        """
+        if name is None:
+            return list(self._lus)
+        return [lu for lu in self._lus
+                if re.search(name, lu.name) is not None]
+
+    def lu(self, fn_luid):
+        return self._lu_by_id[fn_luid]
+
+    def fes(self, name=None):
+        """
+        :param str name: (optional) regular expression that FE names should match
+
+        :rtype: list
+        :return: frame elements of all frames
+        """
+        return [fe
+                for frame in self._frames
+                for fe in frame.FE.values()
+                if name is None or re.search(name, fe.name) is not None]
+
+    def frame_relation_types(self):
+        return list(self._relation_types.values())
+
+    def frame_relations(self, frame=None, type=None):
+        """
+        :param frame: (optional) frame name or ID, only relations involving this frame
+        :param str type: (optional) only relations of this type
+
+        :rtype: list
+        :return: frame relations
+        """
+        relations = self._frame_relations
+        if frame is not None:
+            frame = self.frame(frame)
+            relations = [relation for relation in relations
+                         if frame.ID in {relation.supID, relation.subID}]
+        if type is not None:
+            relations = [relation for relation in relations
+                         if relation.type.name == type]
+        return list(relations)
+
+    def semtypes(self):
+        return list(self._semtypes.values())
+
+    def relation_index(self):
+        """
+        :rtype: graph_utils.RelationHierarchyIndex
+        :return: precomputed ancestors and descendants per frame relation type
+        """
+        if self._relation_index is None:
+            if self._relation_index_payload is None:
+                self._relation_index = RelationHierarchyIndex.from_fn_instance(self)
+            else:
+                self._relation_index = RelationHierarchyIndex.from_payload(self._relation_index_payload)
+        return self._relation_index
+
+
+def get_cache_key(corpus_dir):
+    """
+    compute a key that changes whenever a file in the corpus directory changes
+
+    :param str corpus_dir: directory of an NLTK FrameNet corpus
+
+    :rtype: str
+    :return: hex digest based on the relative path, size and modification time of all files
+    """
+    hasher = hashlib.sha1(f'snapshot format {SNAPSHOT_FORMAT}'.encode('utf-8'))
+
+    file_stats = []
+    for root, dirs, files in os.walk(corpus_dir):
+        for filename in files:
+            path = os.path.join(root, filename)
+            stat = os.stat(path)
+            file_stats.append((os.path.relpath(path, corpus_dir), stat.st_size, stat.st_mtime_ns))
+
+    for rel_path, size, mtime in sorted(file_stats):
+        hasher.update(f'{rel_path}\t{size}\t{mtime}\n'.encode('utf-8'))
+
+    return hasher.hexdigest()
+
+
+def get_snapshot_path(version, cache_key, snapshot_dir=None):
+    """
+    :param str version: supported: '1.5' | '1.7'
+    :param str cache_key: see get_cache_key
+    :param str snapshot_dir: folder in which snapshots are stored
+
+    :rtype: str
+    :return: path of the snapshot file
+    """
+    if snapshot_dir is None:
+        snapshot_dir = DEFAULT_SNAPSHOT_DIR
+    return os.path.join(snapshot_dir, f'framenet-{version}-{cache_key[:16]}.pickle')
+
+
+def snapshot_payload(fn_instance, version, cache_key):
+    """
+    convert a FrameNet instance into compact tuples
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param str version: supported: '1.5' | '1.7'
+    :param str cache_key: see get_cache_key
+
+    :rtype: dict
+    :return: payload of a snapshot
+    """
+    semtypes = []
+    for semtype in fn_instance.semtypes():
+        super_id = semtype.superType.ID if semtype.superType else None
+        semtypes.append((semtype.ID,
+                         semtype.name,
+                         semtype.abbrev,
+                         semtype.get('definition', ''),
+                         super_id))
+
+    frames = []
+    for frame in fn_instance.frames():
+        fes = []
+        for fe_name, fe in frame.FE.items():
+            fes.append((fe.ID,
+                        fe.name,
+                        fe.abbrev,
+                        fe.definition,
+                        fe.coreType,
+                        fe.semType.ID if fe.semType else None,
+                        fe.requiresFE.name if fe.requiresFE else None,
+                        fe.excludesFE.name if fe.excludesFE else None))
+
+        lus = []
+        for lu_name, lu in frame.lexUnit.items():
+            lus.append((lu.ID,
+                        lu.name,
+                        lu.POS,
+                        lu.definition,
+                        lu.get('status')))
+
+        coresets = [tuple(fe.name for fe in coreset)
+                    for coreset in frame.FEcoreSets]
+
+        frames.append((frame.ID,
+                       frame.name,
+                       frame.definition,
+                       tuple(semtype.ID for semtype in frame.semTypes),
+                       tuple(fes),
+                       tuple(lus),
+                       tuple(coresets)))
+
+    frame_relations = []
+    for frame_relation in fn_instance.frame_relations():
+        frame_relations.append((frame_relation.ID,
+                                frame_relation['type'].name,
+                                frame_relation.supID,
+                                frame_relation.superFrameName,
+                                frame_relation.subID,
+                                frame_relation.subFrameName))
+
+    relation_index = RelationHierarchyIndex.from_fn_instance(fn_instance)
+
+    payload = {
+        'format': SNAPSHOT_FORMAT,
+        'version': version,
+        'cache_key': cache_key,
+        'semtypes': semtypes,
+        'frames': frames,
+        'frame_relations': frame_relations,
+        'relation_index': relation_index.to_payload(),
+    }
+
+    return payload
+
+
+def compile_snapshot(fn_instance, snapshot_path, version, cache_key, verbose=0):
+    """
+    write a snapshot of a FrameNet version to disk (atomically)
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param str snapshot_path: where the snapshot is stored
+    :param str version: supported: '1.5' | '1.7'
+    :param str cache_key: see get_cache_key
+    """
+    payload = snapshot_payload(fn_instance, version, cache_key)
+
+    from tool_utils import write_atomically
+
+    snapshot_dir = os.path.dirname(os.path.abspath(snapshot_path))
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    write_atomically(snapshot_path,
+                     lambda outfile: pickle.dump(payload, outfile, protocol=pickle.HIGHEST_PROTOCOL),
+                     mode='wb')
+
+    if verbose:
+        print(f'written FrameNet {version} snapshot to {snapshot_path}')
+
+
+def load_snapshot(snapshot_path):
+    """
+    load a snapshot. The whole payload is unpickled into Python objects at once
+    (nothing is memory-mapped or loaded lazily); this is fast because a snapshot is
+    one pickle of plain tuples instead of the many XML files that NLTK parses.
+
+    :param str snapshot_path: path of a snapshot created with compile_snapshot
+
+    :rtype: FrameNetSnapshot
+    :return: the FrameNet lexicon stored in the snapshot
+    """
+    with open(snapshot_path, 'rb') as infile:
+        payload = pickle.load(infile)
+
+    assert payload['format'] == SNAPSHOT_FORMAT, f'{snapshot_path} has an outdated snapshot format'
+
+    return FrameNetSnapshot(payload, path=snapshot_path)
+
+
+def get_snapshot(version='1.7', snapshot_dir=None, verbose=0):
+    """
+    load the snapshot of a FrameNet version, compiling it first if
+    it does not exist yet or if the NLTK corpus has changed
+
+    :param str version: supported: '1.5' | '1.7'
+    :param str snapshot_dir: folder in which snapshots are stored
+
+    :rtype: FrameNetSnapshot
+    :return: the FrameNet lexicon stored in the snapshot
+    """
+    from stats_utils import registry
+
+    cache_key = get_cache_key(registry.get_path(version))
+    snapshot_path = get_snapshot_path(version, cache_key, snapshot_dir=snapshot_dir)
+
+    if not os.path.exists(snapshot_path):
+        compile_snapshot(registry.get(version),
+                         snapshot_path,
+                         version=version,
+                         cache_key=cache_key,
+                         verbose=verbose)
+
+    return load_snapshot(snapshot_path)
+
+
+if __name__ == '__main__':
+    for version in ['1.5', '1.7']:
+        snapshot = get_snapshot(version=version, verbose=1)
+        print(snapshot, len(snapshot.frames()))
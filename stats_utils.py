@@ -1,134 +1,633 @@
 import os
-import nltk
-from nltk.corpus.reader.framenet import FramenetCorpusReader
-from nltk.corpus import framenet as fn17
+import weakref
 import networkx as nx
 import pandas
-from collections import Counter, defaultdict
-from datetime import datetime
+from collections import defaultdict
 
+from traversal_utils import LexiconAggregator, traverse_lexicon
+from profiling_utils import profiled
+import annotation_utils
+from annotation_utils import scan_annotations
+from graph_utils import RelationHierarchyIndex, CompactFrameGraph
 
-def load_framenet(version='1.7'):
+
+class FrameNetRegistry(object):
+    """
+    lazy, per-version memoized loader of English FrameNet
+
+    nothing is parsed when the registry is created: a version is only loaded
+    the first time it is requested, after which the same instance is returned.
+    """
+    corpus_names = {
+        '1.5': 'framenet_v15',
+        '1.7': 'framenet_v17'
+    }
+    fileids = ['frRelation.xml',
+               'frameIndex.xml',
+               'fulltextIndex.xml',
+               'luIndex.xml',
+               'semTypes.xml']
+    expected_num_frames = {
+        '1.5': 1019,
+        '1.7': 1221
+    }
+
+    def __init__(self):
+        self._instances = dict()
+
+    def get(self, version='1.7', snapshot=False):
+        """
+        return the FrameNet instance of a version, loading it on first use
+
+        :param str version: supported: '1.5' | '1.7'
+        :param bool snapshot: if True, load the lexicon from a compiled snapshot
+        (see snapshot_utils), which is compiled first if needed
+
+        :rtype: nltk.corpus.reader.framenet.FramenetCorpusReader | snapshot_utils.FrameNetSnapshot
+        :return: instance of nltk.corpus.reader.framenet.FramenetCorpusReader or,
+        if snapshot is True, of snapshot_utils.FrameNetSnapshot
+        """
+        assert version in self.corpus_names, f'version {version} not supported, only versions 1.5 and 1.7'
+
+        key = (version, snapshot)
+        if key not in self._instances:
+            if snapshot:
+                from snapshot_utils import get_snapshot
+                self._instances[key] = get_snapshot(version=version)
+            else:
+                from nltk.corpus.reader.framenet import FramenetCorpusReader
+                self._instances[key] = FramenetCorpusReader(self.get_path(version), self.fileids)
+
+        return self._instances[key]
+
+    def get_path(self, version='1.7'):
+        """
+        return the directory of the NLTK corpus of a FrameNet version
+
+        :param str version: supported: '1.5' | '1.7'
+
+        :rtype: str
+        :return: path to the corpus directory
+        """
+        assert version in self.corpus_names, f'version {version} not supported, only versions 1.5 and 1.7'
+        import nltk
+
+        pointer = nltk.data.find(os.path.join('corpora', self.corpus_names[version]))
+
+        return pointer.path
+
+    def is_loaded(self, version, snapshot=False):
+        """
+        :param str version: supported: '1.5' | '1.7'
+        :param bool snapshot: whether to check the snapshot or the NLTK instance
+
+        :rtype: bool
+        :return: True if the version has already been loaded
+        """
+        return (version, snapshot) in self._instances
+
+    def version_of(self, fn_instance):
+        """
+        :param fn_instance: instance returned by this registry
+
+        :rtype: str
+        :return: the version of fn_instance, None if this registry did not load it
+        """
+        for (version, snapshot), instance in self._instances.items():
+            if instance is fn_instance:
+                return version
+
+    def clear(self):
+        """
+        forget all loaded versions
+        """
+        self._instances.clear()
+
+
+registry = FrameNetRegistry()
+
+
+@profiled(count=None)
+def load_framenet(version='1.7', snapshot=False):
     """
     load framenet version
+
+    the version is only parsed on first use and memoized afterwards (see FrameNetRegistry)
     
     :param str version: supported: '1.5' | '1.7'
+    :param bool snapshot: if True, load the lexicon from a compiled snapshot (see snapshot_utils).
+    This is much faster on a cold start, but annotations are not available.
     
     :rtype: nltk.corpus.reader.framenet.FramenetCorpusReader
     :return: instance of nltk.corpus.reader.framenet.FramenetCorpusReader
     (either version 1.5 or 1.7 of English FrameNet)
     """
-    assert version in {'1.5', '1.7'}, f'version {version} not supported, only versions 1.5 and 1.7'
+    return registry.get(version, snapshot=snapshot)
 
-    if version == '1.7':
-        fn_instance = fn17
-    elif version == '1.5':
-        fn_path = os.path.join(nltk.data.path[0], 'corpora', 'framenet_v15')
-        fn_instance = FramenetCorpusReader(fn_path, ['frRelation.xml',
-                                                     'frameIndex.xml',
-                                                     'fulltextIndex.xml',
-                                                     'luIndex.xml',
-                                                     'semTypes.xml'])
 
-    return fn_instance
+@profiled(count=None)
+def check_framenet(version='1.7'):
+    """
+    sanity check that a FrameNet version has the expected number of frames
+    (opt-in, since this requires parsing all frames of that version)
 
+    :param str version: supported: '1.5' | '1.7'
 
-fn = load_framenet()
-assert len(fn.frames()) == 1221
-fn = load_framenet(version='1.7')
-assert len(fn.frames()) == 1221
-fn = load_framenet(version='1.5')
-assert len(fn.frames()) == 1019
+    :rtype: int
+    :return: number of frames
+    """
+    fn_instance = load_framenet(version=version)
+    num_frames = len(fn_instance.frames())
+    expected = FrameNetRegistry.expected_num_frames[version]
+    assert num_frames == expected, f'expected {expected} frames in FrameNet {version}, found {num_frames}'
 
+    return num_frames
 
-def get_mapping_id2frame_label(fn_instance):
+
+class FrameLabelMappingAggregator(LexiconAggregator):
+    """
+    frame label <-> frame ID (see get_mapping_id2frame_label)
     """
 
-    :param fn_instance:
-    :return:
+    def __init__(self):
+        self.framelabel2id_ = {}
+        self.id_2framelabel = {}
+
+    def visit_frame(self, frame):
+        self.framelabel2id_[frame.name] = frame.ID
+        self.id_2framelabel[frame.ID] = frame.name
+
+    def result(self):
+        return self.framelabel2id_, self.id_2framelabel
+
+
+class LemmaPosToFramesAggregator(LexiconAggregator):
+    """
+    LU name -> frame labels (see get_mapping_lemmapos2frames)
+    """
+
+    def __init__(self):
+        self.lu_name2frame_ids = defaultdict(set)
+
+    def visit_lu(self, frame, lu_name, lu):
+        self.lu_name2frame_ids[lu.name].add(frame.name)
+
+    def result(self):
+        return self.lu_name2frame_ids
+
+
+
+class LemmaFramesAggregator(LexiconAggregator):
+    """
+    lemma -> frame labels and frame label -> lemmas, with and without POS
+    (see get_lemma_frame_mappings)
+    """
+
+    def __init__(self, pos_mapping=dict()):
+        from tool_utils import get_lu
+        self.get_lu = get_lu
+        self.pos_mapping = pos_mapping
+        self.with_pos2mappings = {with_pos: (defaultdict(set), defaultdict(set))
+                                  for with_pos in [True, False]}
+
+    def visit_lu(self, frame, lu_name, lu):
+        lemma_pos = self.get_lu(lu_name, pos_in_lu=True, pos_mapping=self.pos_mapping)
+        for with_pos, lemma in [(True, lemma_pos), (False, lemma_pos[0])]:
+            lemma2frames, frame2lemmas = self.with_pos2mappings[with_pos]
+            lemma2frames[lemma].add(frame.name)
+            frame2lemmas[frame.name].add(lemma)
+
+    def result(self):
+        return {with_pos: tuple({key: frozenset(values) for key, values in mapping.items()}
+                                for mapping in mappings)
+                for with_pos, mappings in self.with_pos2mappings.items()}
+
+CORE_TYPES = ['Core', 'Core-Unexpressed', 'Extra-Thematic', 'Peripheral']
+
+
+def _columns_to_df(columns, categories=dict()):
+    """
+    :param dict columns: column name -> list of values
+    :param dict categories: column name -> all categories of a categorical column
+    (categories that do not occur in the column are kept, e.g., non-lexicalized frames)
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: df with categorical string columns and int32 ID columns
+    """
+    data = {}
+    for column, values in columns.items():
+        if column in categories:
+            data[column] = pandas.Categorical(values, categories=categories[column])
+        elif column.endswith(' ID'):
+            data[column] = pandas.array(values, dtype='int32')
+        else:
+            data[column] = pandas.Categorical(values)
+    return pandas.DataFrame(data, columns=list(columns))
+
+
+class FrameLUEdgesAggregator(LexiconAggregator):
+    """
+    one row per (frame, LU) pair (see df_frame_lu_edges)
+    """
+
+    def __init__(self):
+        self.frame_ids = []
+        self.frame_labels = []
+        self.columns = {'Frame ID': [], 'Frame': [], 'LU ID': [], 'LU name': [], 'POS': []}
+
+    def visit_frame(self, frame):
+        self.frame_ids.append(frame.ID)
+        self.frame_labels.append(frame.name)
+
+    def visit_lu(self, frame, lu_name, lu):
+        for column, value in [('Frame ID', frame.ID),
+                              ('Frame', frame.name),
+                              ('LU ID', lu.ID),
+                              ('LU name', lu.name),
+                              ('POS', lu.POS)]:
+            self.columns[column].append(value)
+
+    def result(self):
+        return _columns_to_df(self.columns, categories={'Frame ID': self.frame_ids,
+                                                        'Frame': self.frame_labels})
+
+
+class FrameFEEdgesAggregator(LexiconAggregator):
+    """
+    one row per (frame, FE) pair (see df_frame_fe_edges)
+    """
+
+    def __init__(self):
+        self.frame_ids = []
+        self.frame_labels = []
+        self.columns = {'Frame ID': [], 'Frame': [], 'FE ID': [], 'FE': [], 'Coreness': []}
+
+    def visit_frame(self, frame):
+        self.frame_ids.append(frame.ID)
+        self.frame_labels.append(frame.name)
+
+    def visit_fe(self, frame, fe_name, fe):
+        for column, value in [('Frame ID', frame.ID),
+                              ('Frame', frame.name),
+                              ('FE ID', fe.ID),
+                              ('FE', fe_name),
+                              ('Coreness', fe.coreType)]:
+            self.columns[column].append(value)
+
+    def result(self):
+        coreness_types = CORE_TYPES + sorted(set(self.columns['Coreness']) - set(CORE_TYPES))
+        return _columns_to_df(self.columns, categories={'Frame ID': self.frame_ids,
+                                                        'Frame': self.frame_labels,
+                                                        'Coreness': coreness_types})
+
+
+@profiled()
+def frame_lu_edges_to_wide(df_edges, with_members=True):
+    """
+    derive the frame -> LUs and LU name -> frames views from the edge list (see df_frame_lu_edges)
+
+    :param pandas.core.frame.DataFrame df_edges: output of df_frame_lu_edges
+    :param bool with_members: if True (default), a column with the list of LU names/frame IDs is added,
+    False gives the compact form with only the frequencies
+
+    :rtype: tuple
+    :return: (df with 'Frame ID', ['LU IDs'], 'Freq', df with 'LU ID', ['Frame IDs'], 'Freq')
+    """
+    dfs = []
+    for key, member, headers in [('Frame ID', 'LU name', ['Frame ID', 'LU IDs', 'Freq']),
+                                 ('LU name', 'Frame ID', ['LU ID', 'Frame IDs', 'Freq'])]:
+        # non-lexicalized frames are kept with frequency 0
+        keys = df_edges[key]
+        df = keys.value_counts(sort=False).astype('int32').rename('Freq').rename_axis(headers[0]).reset_index()
+        if key == 'LU name':
+            # one row per category: keep the LU names that occur, in the order of the traversal
+            # (the categories are sorted alphabetically)
+            df = df.iloc[pandas.unique(keys.cat.codes.to_numpy())].reset_index(drop=True)
+        else:
+            df[headers[0]] = df[headers[0]].astype('int32')
+
+        if with_members:
+            members = df_edges[member].astype(object).groupby(keys, observed=True).agg(list)
+            df.insert(1, headers[1], [members.get(value, []) for value in df[headers[0]]])
+        dfs.append(df)
+
+    return dfs
+
+
+@profiled()
+def frame_fe_edges_to_fe_types(df_edges):
+    """
+    :param pandas.core.frame.DataFrame df_edges: output of df_frame_fe_edges
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: df with 'Frame ID', 'total # of FEs', and '# of <coreness type>' per coreness type
+    """
+    counts = pandas.crosstab(df_edges['Frame ID'], df_edges['Coreness'], dropna=False)
+    counts = counts.reindex(columns=CORE_TYPES, fill_value=0).astype('int32')
+    counts.columns = [f'# of {core_type}' for core_type in CORE_TYPES]
+    counts.insert(0, 'total # of FEs', counts.sum(axis=1).astype('int32'))
+
+    df = counts.reset_index()
+    df['Frame ID'] = df['Frame ID'].astype('int32')
+    return df
+
+
+@profiled()
+def frame_fe_edges_to_fe2num_frames(df_edges, with_members=True):
+    """
+    :param pandas.core.frame.DataFrame df_edges: output of df_frame_fe_edges
+    :param bool with_members: if True (default), a column with the set of frame IDs is added,
+    False gives the compact form with only the counts
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: df with 'FE', ['Frame IDs'], and '# of Frame IDs'
+    """
+    groups = df_edges.groupby('FE', observed=True, sort=False)['Frame ID']
+    df = groups.nunique().astype('int32').rename('# of Frame IDs').reset_index()
+    if with_members:
+        members = df_edges['Frame ID'].astype(object).groupby(df_edges['FE'], observed=True, sort=False).agg(set)
+        df.insert(1, 'Frame IDs', members.values)
+    return df
+
+
+class FrameLUNameRelationAggregator(FrameLUEdgesAggregator):
+    """
+    frame ID <-> LU names (see get_dfs_frame_lu_name_relation)
     """
-    framelabel2id_ = {}
-    id_2framelabel = {}
 
-    for frame in fn_instance.frames():
+    def __init__(self, with_members=True):
+        super().__init__()
+        self.with_members = with_members
 
-        framelabel = frame.name
-        id_ = frame.ID
+    def result(self):
+        return frame_lu_edges_to_wide(super().result(), with_members=self.with_members)
 
-        framelabel2id_[framelabel] = id_
-        id_2framelabel[id] = framelabel
 
-    return framelabel2id_, id_2framelabel
+class FrameFETypesAggregator(FrameFEEdgesAggregator):
+    """
+    number of FEs per coreness type per frame (see df_frame2num_of_fe_types)
+    """
+    core_types = CORE_TYPES
+
+    def result(self):
+        return frame_fe_edges_to_fe_types(super().result())
+
+
+class FEToFramesAggregator(FrameFEEdgesAggregator):
+    """
+    FE name -> frame IDs (see df_fe2num_frames)
+    """
 
+    def __init__(self, with_members=True):
+        super().__init__()
+        self.with_members = with_members
+
+    def result(self):
+        return frame_fe_edges_to_fe2num_frames(super().result(), with_members=self.with_members)
+
+
+@profiled()
+def get_mapping_id2frame_label(fn_instance):
+    """
+
+    :param fn_instance:
+    :return: (frame label -> frame ID, frame ID -> frame label)
+    """
+    results = traverse_lexicon(fn_instance, {'mapping': FrameLabelMappingAggregator()})
+    return results['mapping']
+
+@profiled()
 def get_mapping_lemmapos2frames(fn_instance):
     """
 
     :param fn_instance:
-    :return:
+    :return: LU name -> frame labels
+    """
+    results = traverse_lexicon(fn_instance, {'mapping': LemmaPosToFramesAggregator()})
+    return results['mapping']
+
+
+_lemma_frame_mappings = weakref.WeakKeyDictionary()
+
+
+@profiled(count=None)
+def get_lemma_frame_mappings(fn_instance, pos_mapping=dict()):
+    """
+    lemma -> frames and frame -> lemmas, with and without POS, in one traversal of the lexicon.
+    LU names are split with tool_utils.get_lu, so lemmas with dots (e.g., 'e.g..adv') are kept intact.
+    The result is memoized per instance and pos_mapping, and dropped with the instance.
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param dict pos_mapping: see tool_utils.get_lu, e.g., {'v': 'VERB', 'n': 'NOUN', ...}
+
+    :rtype: dict
+    :return: with_pos (True | False) -> (lemma2frames, frame2lemmas), where a lemma is
+    (lemma, POS) if with_pos else lemma, and the values are frozensets
+    (frames without LUs are not part of frame2lemmas)
+    """
+    pos_mapping2mappings = _lemma_frame_mappings.setdefault(fn_instance, dict())
+    key = frozenset(pos_mapping.items())
+    if key not in pos_mapping2mappings:
+        results = traverse_lexicon(fn_instance, {'mappings': LemmaFramesAggregator(pos_mapping)})
+        pos_mapping2mappings[key] = results['mappings']
+
+    return pos_mapping2mappings[key]
+
+
+def _distribution_df(sizes, size_column, count_column):
+    """
+    :param list sizes: e.g., the number of frames per lemma
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: frequency and percentage per size, sorted from most to least frequent
+    """
+    counts = pandas.Series(sizes, dtype='int32').value_counts()
+    df = pandas.DataFrame({size_column: counts.index.astype('int32'),
+                           count_column: counts.to_numpy(dtype='int32')})
+    df[count_column.replace('# of', '% of')] = 100 * df[count_column] / max(len(sizes), 1)
+    return df
+
+
+@profiled()
+def df_lemma_polysemy(fn_instance, with_pos=True, pos_mapping=dict()):
+    """
+    create a df with one row per lemma: 'Lemma', 'POS' (if with_pos), '# of frames'
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param bool with_pos: if True, lemmas are (lemma, POS) pairs
+    :param dict pos_mapping: see get_lemma_frame_mappings
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: df sorted from most to least polysemous lemma
+    """
+    lemma2frames, _ = get_lemma_frame_mappings(fn_instance, pos_mapping=pos_mapping)[with_pos]
+
+    columns = {'Lemma': [], 'POS': [], '# of frames': []}
+    for lemma, frames in lemma2frames.items():
+        if with_pos:
+            lemma, pos = lemma
+            columns['POS'].append(pos)
+        columns['Lemma'].append(lemma)
+        columns['# of frames'].append(len(frames))
+
+    if not with_pos:
+        del columns['POS']
+
+    df = pandas.DataFrame(columns)
+    df['# of frames'] = df['# of frames'].astype('int32')
+    if with_pos:
+        df['POS'] = df['POS'].astype('category')
+
+    return df.sort_values(['# of frames', 'Lemma'], ascending=[False, True]).reset_index(drop=True)
+
+
+@profiled()
+def df_polysemy_distribution(fn_instance, with_pos=True, pos_mapping=dict()):
+    """
+    create a df with the distribution of the number of frames per lemma:
+    '# of frames', '# of lemmas', '% of lemmas'
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param bool with_pos: if True, lemmas are (lemma, POS) pairs
+    :param dict pos_mapping: see get_lemma_frame_mappings
+
+    :rtype: pandas.core.frame.DataFrame
+    """
+    lemma2frames, _ = get_lemma_frame_mappings(fn_instance, pos_mapping=pos_mapping)[with_pos]
+    return _distribution_df([len(frames) for frames in lemma2frames.values()],
+                            size_column='# of frames',
+                            count_column='# of lemmas')
+
+
+@profiled()
+def df_lemma_pos_distribution(fn_instance, pos_mapping=dict()):
+    """
+    create a df with the number of (lemma, POS) pairs per POS:
+    'POS', '# of lemmas', '% of lemmas'
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param dict pos_mapping: see get_lemma_frame_mappings
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: df sorted from most to least frequent POS
+    """
+    lemma2frames, _ = get_lemma_frame_mappings(fn_instance, pos_mapping=pos_mapping)[True]
+
+    counts = pandas.Series([pos for lemma, pos in lemma2frames], dtype='category').value_counts()
+    df = pandas.DataFrame({'POS': counts.index.astype(str),
+                           '# of lemmas': counts.to_numpy(dtype='int32')})
+    df['% of lemmas'] = 100 * df['# of lemmas'] / max(len(lemma2frames), 1)
+    df['POS'] = df['POS'].astype('category')
+    return df
+
+
+@profiled()
+def df_frame_variance_distribution(fn_instance, with_pos=True, pos_mapping=dict()):
+    """
+    create a df with the distribution of the number of lemmas per frame (frames without LUs are left out):
+    '# of lemmas', '# of frames', '% of frames'
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param bool with_pos: if True, lemmas are (lemma, POS) pairs
+    :param dict pos_mapping: see get_lemma_frame_mappings
+
+    :rtype: pandas.core.frame.DataFrame
+    """
+    _, frame2lemmas = get_lemma_frame_mappings(fn_instance, pos_mapping=pos_mapping)[with_pos]
+    return _distribution_df([len(lemmas) for lemmas in frame2lemmas.values()],
+                            size_column='# of lemmas',
+                            count_column='# of frames')
+
+@profiled()
+def df_frame_lu_edges(fn_instance):
     """
-    lu_name2frame_ids = defaultdict(set)
+    create a long df with one row per (frame, LU) pair:
+    'Frame ID', 'Frame', 'LU ID', 'LU name', 'POS'
+    ('Frame ID' and 'Frame' are categorical over all frames, including non-lexicalized frames)
 
-    for frame in fn_instance.frames():
-        for lu, info in frame.lexUnit.items():
-            # lu -> frames
-            lu_name2frame_ids[info.name].add(frame.name)
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+
+    :rtype: pandas.core.frame.DataFrame
+    """
+    results = traverse_lexicon(fn_instance, {'df': FrameLUEdgesAggregator()})
+    return results['df']
 
-    return lu_name2frame_ids
+
+@profiled()
+def df_frame_fe_edges(fn_instance):
+    """
+    create a long df with one row per (frame, FE) pair:
+    'Frame ID', 'Frame', 'FE ID', 'FE', 'Coreness'
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+
+    :rtype: pandas.core.frame.DataFrame
+    """
+    results = traverse_lexicon(fn_instance, {'df': FrameFEEdgesAggregator()})
+    return results['df']
 
 
-def get_dfs_frame_lu_name_relation(fn_instance):
+@profiled()
+def get_dfs_frame_lu_name_relation(fn_instance, with_members=True):
     """
-    get two dataframes
+    get two dataframes (derived from df_frame_lu_edges)
 
     dataframe 1:
-    1. LU name, e.g., lemma and pos combination
-    2. list of frame IDS that the LU name can evoke
+    1. frame ID
+    2. list of LU names that can evoke the frame (left out if with_members is False)
+    3. number of LU names
 
     dataframe 2:
-    1. frame ID
-    2. list of LU IDs that can evoke the frame
+    1. LU name, e.g., lemma and pos combination
+    2. list of frame IDS that the LU name can evoke (left out if with_members is False)
+    3. number of frame IDs
 
     :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of
     nltk.corpus.reader.framenet.FramenetCorpusReader
+    :param bool with_members: if False, the list columns are left out (compact form, faster on large lexicons)
 
     :rtype: tuple
     :return: (dataframe 1, dataframe 2)
     """
-    frame_ids2lu_ids = dict()
-    lu_name2frame_ids = dict()
-
-    for lu in fn_instance.lus():
-        lu_name2frame_ids[lu.name] = []
+    results = traverse_lexicon(fn_instance, {'dfs': FrameLUNameRelationAggregator(with_members=with_members)})
+    return results['dfs']
 
-    for frame in fn_instance.frames():
-        frame_id = frame.ID
 
-        if frame_id not in frame_ids2lu_ids:
-            frame_ids2lu_ids[frame_id] = []
-
-        for lu, info in frame.lexUnit.items():
-
-            # lu -> frames
-            lu_name2frame_ids[info.name].append(frame_id)
-
-            # frame -> lus
-            frame_ids2lu_ids[frame_id].append(info.name)
+@profiled()
+def get_full_report(fn_instance,
+                    pos_in_lu=False,
+                    pos_mapping=dict()):
+    """
+    compute all lexicon tables of stats_utils and tool_utils
+    in one traversal of the lexicon
 
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param bool pos_in_lu: see tool_utils.load_lu_to_frames
+    :param dict pos_mapping: see tool_utils.load_lu_to_frames
 
-    dfs = []
-    for a_dict, headers in [(frame_ids2lu_ids, ['Frame ID', 'LU IDs', 'Freq']),
-                            (lu_name2frame_ids, ['LU ID', 'Frame IDs', 'Freq'])]:
-
-        list_of_lists = []
-        for key, value in a_dict.items():
-            one_row = [key, value, len(value)]
-            list_of_lists.append(one_row)
-        df = pandas.DataFrame(list_of_lists, columns=headers)
-        dfs.append(df)
+    :rtype: dict
+    :return: mapping from the name of each function to its output, e.g.,
+    'df_fe2num_frames' -> output of df_fe2num_frames(fn_instance)
+    """
+    from tool_utils import LUToFramesAggregator, FrameToInfoAggregator
+
+    aggregators = {
+        'get_mapping_id2frame_label': FrameLabelMappingAggregator(),
+        'get_mapping_lemmapos2frames': LemmaPosToFramesAggregator(),
+        'get_lemma_frame_mappings': LemmaFramesAggregator(pos_mapping=pos_mapping),
+        'get_dfs_frame_lu_name_relation': FrameLUNameRelationAggregator(),
+        'df_frame2num_of_fe_types': FrameFETypesAggregator(),
+        'df_fe2num_frames': FEToFramesAggregator(),
+        'df_frame_lu_edges': FrameLUEdgesAggregator(),
+        'df_frame_fe_edges': FrameFEEdgesAggregator(),
+        'load_lu_to_frames': LUToFramesAggregator(pos_in_lu=pos_in_lu, pos_mapping=pos_mapping),
+        'load_frame_to_info': FrameToInfoAggregator(),
+    }
 
-    return dfs
+    return traverse_lexicon(fn_instance, aggregators)
 
 
+@profiled()
 def load_frame_relations_as_directed_graph(fn_instance, subset_of_relations=set()):
     """
 
@@ -175,6 +674,61 @@ def load_frame_relations_as_directed_graph(fn_instance, subset_of_relations=set(
 
     return G
 
+@profiled()
+def load_frame_relations_as_compact_graph(fn_instance):
+    """
+    load all frame-to-frame relations into integer-indexed CSR arrays,
+    keeping parallel relations between two frames as a relation-type bitmask per edge
+    (unlike load_frame_relations_as_directed_graph, which keeps only one relation per pair)
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+
+    :rtype: graph_utils.CompactFrameGraph
+    :return: graph of all frames and relation types (see CompactFrameGraph.to_networkx for networkx)
+    """
+    return CompactFrameGraph.from_fn_instance(fn_instance)
+
+_frame_relation_graphs = weakref.WeakKeyDictionary()
+
+
+@profiled()
+def get_frame_relation_graph(fn_instance):
+    """
+    the compact graph of all frame-to-frame relations of a FrameNet instance,
+    built once and reused by all queries (see load_frame_relations_as_compact_graph)
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+
+    :rtype: graph_utils.CompactFrameGraph
+    """
+    if fn_instance not in _frame_relation_graphs:
+        _frame_relation_graphs[fn_instance] = load_frame_relations_as_compact_graph(fn_instance)
+    return _frame_relation_graphs[fn_instance]
+
+
+@profiled()
+def get_successors_by_depth(fn_instance, starting_node, relations=None, direction='out', max_depth=None):
+    """
+    like get_all_successors_of_all_successors, but the relation types are chosen per query
+    on one cached graph, e.g., relations={'Inheritance', 'Using'}
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param str starting_node: frame name
+    :param relations: relation type or set of relation types, None for all types
+    :param str direction: 'out' (super -> sub) | 'in' (sub -> super) | 'both'
+    :param int max_depth: maximum depth, None for no maximum
+
+    :rtype: dict
+    :return: {depth -> frames at that level} (1 being the neighbours of the starting node),
+    {0: {starting_node}} if the frame has no edge of the relation types
+    """
+    graph = get_frame_relation_graph(fn_instance)
+    return graph.successors_by_depth(starting_node,
+                                     relations=relations,
+                                     direction=direction,
+                                     max_depth=max_depth)
+
+@profiled()
 def get_all_successors_of_all_successors(graph, starting_node, verbose=0):
     """
     given a directed graph, return all
@@ -186,6 +740,8 @@ def get_all_successors_of_all_successors(graph, starting_node, verbose=0):
     :rtype: dict
     :return: key are the 'depth' (1 being the successors of the starting node)
     {depth -> nodes at that level}
+
+    for repeated queries, see get_relation_hierarchy_index
     """
     level2successors = defaultdict(set)
     level = 1
@@ -215,6 +771,32 @@ def get_all_successors_of_all_successors(graph, starting_node, verbose=0):
     return level2successors
 
 
+_relation_indices = weakref.WeakKeyDictionary()
+
+
+@profiled()
+def get_relation_hierarchy_index(fn_instance):
+    """
+    precomputed ancestors and descendants of all frames per relation type,
+    e.g., to compute inheritance depths of all frames without a BFS per frame.
+    Snapshots (see snapshot_utils) store the index, other instances compute it once.
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+
+    :rtype: graph_utils.RelationHierarchyIndex
+    :return: index with descendants/ancestors/lowest common ancestor queries
+    """
+    if fn_instance not in _relation_indices:
+        if hasattr(fn_instance, 'relation_index'):
+            index = fn_instance.relation_index()
+        else:
+            index = RelationHierarchyIndex.from_fn_instance(fn_instance)
+        _relation_indices[fn_instance] = index
+
+    return _relation_indices[fn_instance]
+
+
+@profiled()
 def df_frame2num_of_fe_types(fn_instance):
     """
     create a df in which each row contains the number of types of FEs per frame,
@@ -225,62 +807,79 @@ def df_frame2num_of_fe_types(fn_instance):
     :rtype: pandas.core.frame.DataFrame
     :return: df with FE type information per frame
     """
-    core_types = ['Core', 'Core-Unexpressed', 'Extra-Thematic', 'Peripheral']
+    results = traverse_lexicon(fn_instance, {'df': FrameFETypesAggregator()})
+    return results['df']
 
-    headers = ['Frame ID', 'total # of FEs', '# of Core', '# of Core-Unexpressed', '# of Extra-Thematic',
-               '# of Peripheral']
-    list_of_lists = []
 
-    for frame in fn_instance.frames():
 
-        counts = {core_type: 0 for core_type in core_types}
-        actual_counts = Counter([info.coreType for fe, info in frame.FE.items()])
-        counts.update(actual_counts)
-
-        one_row = [frame.ID]
-        one_row.append(sum(counts.values()))
-        for core_type in core_types:
-            one_row.append(counts[core_type])
+@profiled()
+def df_fe2num_frames(fn_instance, with_members=True):
+    """
+    create a df in which each row contains the number of frames that a FE is a part of
 
-        list_of_lists.append(one_row)
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param bool with_members: if False, the column 'Frame IDs' with the set of frame IDs is left out (compact form)
 
-    df = pandas.DataFrame(list_of_lists, columns=headers)
+    :rtype: pandas.core.frame.DataFrame
+    :return: df with for each FE the number of frames it is part of
+    """
+    results = traverse_lexicon(fn_instance, {'df': FEToFramesAggregator(with_members=with_members)})
+    return results['df']
 
-    return df
 
+_frame_fe_edges = weakref.WeakKeyDictionary()
 
 
-def df_fe2num_frames(fn_instance):
+@profiled()
+def get_frame_fe_edges(fn_instance):
     """
-    create a df in which each row contains the number of frames that a FE is a part of
+    df_frame_fe_edges of a FrameNet instance, computed once and reused
 
     :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
 
-
     :rtype: pandas.core.frame.DataFrame
-    :return: df with for each FE the number of frames it is part of
+    """
+    if fn_instance not in _frame_fe_edges:
+        _frame_fe_edges[fn_instance] = df_frame_fe_edges(fn_instance)
+    return _frame_fe_edges[fn_instance]
 
-    :param fn_instance:
-    :return:
+
+@profiled()
+def frame_fe_edges_to_coreness_types(df_edges, by=('FE',), sparse=False):
     """
-    fe2frame_ids = defaultdict(set)
+    cross-tabulate the edge list(s) into counts per coreness type in one pass,
+    by building a sparse (group x coreness type) count matrix from the category codes
 
-    for frame in fn_instance.frames():
-        frame_id = frame.ID
-        for fe, info in frame.FE.items():
-            fe2frame_ids[fe].add(frame_id)
+    :param pandas.core.frame.DataFrame df_edges: output of df_frame_fe_edges (optionally with a 'Version' column)
+    :param tuple by: columns that identify a row, e.g., ('FE',) or ('Version', 'FE')
+    :param bool sparse: if True, the count columns are sparse
 
-    headers = ['FE', 'Frame IDs', '# of Frame IDs']
-    list_of_lists = []
-    for fe, frame_ids in fe2frame_ids.items():
-        list_of_lists.append((fe, frame_ids, len(frame_ids)))
+    :rtype: pandas.core.frame.DataFrame
+    :return: df with the 'by' columns and '# of <coreness type>' per coreness type
+    """
+    import numpy
+    from scipy import sparse as sp
 
-    df = pandas.DataFrame(list_of_lists, columns=headers)
+    groups = df_edges.groupby(list(by), observed=True, sort=True).ngroup().to_numpy()
+    coreness = df_edges['Coreness'].astype(pandas.CategoricalDtype(CORE_TYPES))
+    assert not coreness.isna().any(), f'unknown coreness types: {set(df_edges["Coreness"]) - set(CORE_TYPES)}'
+    num_groups = groups.max() + 1 if len(groups) else 0
 
-    return df
+    counts = sp.coo_matrix((numpy.ones(len(groups), dtype='int32'), (groups, coreness.cat.codes.to_numpy())),
+                           shape=(num_groups, len(CORE_TYPES))).tocsr()
+
+    columns = [f'# of {core_type}' for core_type in CORE_TYPES]
+    if sparse:
+        df = pandas.DataFrame.sparse.from_spmatrix(counts, columns=columns)
+    else:
+        df = pandas.DataFrame(counts.toarray(), columns=columns)
+
+    keys = df_edges[list(by)].drop_duplicates().sort_values(list(by)).reset_index(drop=True)
+    return pandas.concat([keys, df], axis=1)
 
 
-def df_fe2coreness_types(fn_instance):
+@profiled()
+def df_fe2coreness_types(fn_instance, versions=None, sparse=False):
     """
     create a df in which each row contains for an FE
     1. how many times as core
@@ -289,90 +888,381 @@ def df_fe2coreness_types(fn_instance):
     4. how many times as extra-thematic
 
     :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
-
+    :param versions: if provided, e.g., ['1.5', '1.7'], the counts are broken down per FrameNet version
+    (loaded with load_framenet, fn_instance is then ignored); the edge lists of each version are cached,
+    such that comparing versions does not rescan the lexicon
+    :param bool sparse: if True, the count columns are sparse
+    (pandas does not support, e.g., describe() on sparse columns)
 
     :rtype: pandas.core.frame.DataFrame
-    :return: df with for each FE the frequency per coreness type
+    :return: df with for each FE (and version) the frequency per coreness type
     """
-    fe2frame_ids = defaultdict(set)
+    if versions is None:
+        return frame_fe_edges_to_coreness_types(get_frame_fe_edges(fn_instance), sparse=sparse)
+
+    dfs = []
+    for version in versions:
+        df_edges = get_frame_fe_edges(load_framenet(version=version))[['FE', 'Coreness']]
+        dfs.append(df_edges.assign(Version=version))
 
-    for frame in fn_instance.frames():
-        frame_id = frame.ID
-        for fe, info in frame.FE.items():
-            fe2frame_ids[fe].add(frame_id)
+    df_edges = pandas.concat(dfs, ignore_index=True)
+    df_edges['Version'] = pandas.Categorical(df_edges['Version'], categories=list(versions))
+    df_edges['FE'] = df_edges['FE'].astype('category')
+    return frame_fe_edges_to_coreness_types(df_edges, by=('Version', 'FE'), sparse=sparse)
 
 
-    #headers = ['FE', 'Frame IDs', '# of Frame IDs']
-    #list_of_lists = []
-    #for fe, frame_ids in fe2frame_ids.items():
-    #    list_of_lists.append((fe, frame_ids, len(frame_ids)))
 
-    df = pandas.DataFrame(list_of_lists, columns=headers)
+_frame_similarities = weakref.WeakKeyDictionary()
 
-    return df
 
+@profiled(count=len)
+def get_frame_similarity(fn_instance, feature='FE', metric='jaccard'):
+    """
+    all-pairs similarity of frames based on shared FE names or lemmas,
+    computed with sparse matrix products (see similarity_utils).
+    The result is cached per FrameNet instance (i.e., per version loaded with load_framenet),
+    feature, and metric.
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param str feature: 'FE' | 'lemma.pos' | 'lemma'
+    :param str metric: 'jaccard' | 'cosine'
 
-def get_gf_and_pos2annotations(fn_instance, verbose=0):
+    :rtype: similarity_utils.FrameSimilarity
     """
+    from similarity_utils import FrameSimilarity
 
+    key2similarity = _frame_similarities.setdefault(fn_instance, dict())
+    if (feature, metric) not in key2similarity:
+        if feature == 'FE':
+            df_edges = get_frame_fe_edges(fn_instance)
+        else:
+            df_edges = df_frame_lu_edges(fn_instance)
+        key2similarity[(feature, metric)] = FrameSimilarity.from_edges(df_edges, feature=feature, metric=metric)
+
+    return key2similarity[(feature, metric)]
+
+
+@profiled()
+def df_frame_neighbours(fn_instance, feature='FE', metric='jaccard', k=10):
+    """
+    create a long df with the k most similar frames of each frame:
+    'Frame', 'Neighbour', 'Rank', 'Similarity', '# shared'
 
     :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param str feature: 'FE' | 'lemma.pos' | 'lemma' (see get_frame_similarity)
+    :param str metric: 'jaccard' | 'cosine'
+    :param int k: maximum number of neighbours per frame, None for all frames with any overlap
 
-    :rtype: collections.defaultdict
-    :return: mapping of (POS, GF) -> annotations
+    :rtype: pandas.core.frame.DataFrame
     """
-    pos_and_gf2annotations = defaultdict(list)
-    set_pos = set()
-    set_gf = set()
-    for annotation in fn_instance.annotations(full_text=False):
-        pos = annotation.LU.POS
-        for start, end, gf in annotation.GF:
-            key = (pos, gf)
-            pos_and_gf2annotations[key].append(annotation)
+    return get_frame_similarity(fn_instance, feature=feature, metric=metric).to_df(k=k)
+
 
-            set_pos.add(pos)
-            set_gf.add(gf)
+@profiled()
+def get_gf_and_pos2annotations(fn_instance,
+                               sample_size=None,
+                               seed=None,
+                               num_workers=1,
+                               source='exemplar',
+                               verbose=0):
+    """
+    sample references to exemplar annotations per (POS, GF).
+    Use resolve_annotation to load the annotation of a reference.
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param int sample_size: maximum number of references per (POS, GF),
+    sampled uniformly at random. None to keep all of them.
+    :param seed: seed for sampling, None for a random sample on each call
+    :param int num_workers: number of processes, 1 (default) to scan in this process, None for the number of CPUs
+    :param str source: 'exemplar' | 'fulltext' (see annotation_utils.scan_annotations)
+    :param int verbose: if >= 2, progress is printed
+
+    :rtype: dict
+    :return: mapping of (POS, GF) -> list of annotation_utils.AnnotationRef
+    """
+    layer2counts, layer2samples = scan_annotations(fn_instance,
+                                                   sources=(source,),
+                                                   layers=('GF',),
+                                                   sample_size=sample_size,
+                                                   seed=seed,
+                                                   num_workers=num_workers,
+                                                   verbose=verbose)[source]
+    pos_and_gf2annotations = layer2samples['GF']
 
     if verbose:
-        print('parts of speech', set_pos)
-        print('grammatical functions', set_gf)
+        print('parts of speech', {pos for pos, gf in pos_and_gf2annotations})
+        print('grammatical functions', {gf for pos, gf in pos_and_gf2annotations})
 
 
     return pos_and_gf2annotations
 
 
 
-def get_pt_and_pos2annotations(fn_instance, verbose=0):
+@profiled()
+def get_pt_and_pos2annotations(fn_instance,
+                               sample_size=1000,
+                               seed=None,
+                               num_workers=1,
+                               source='exemplar',
+                               verbose=0):
     """
+    sample references to exemplar annotations per (POS, PT).
+    Use resolve_annotation to load the annotation of a reference.
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param int sample_size: maximum number of references per (POS, PT),
+    sampled uniformly at random. None to keep all of them.
+    :param seed: seed for sampling, None for a random sample on each call
+    :param int num_workers: number of processes, 1 (default) to scan in this process, None for the number of CPUs
+    :param str source: 'exemplar' | 'fulltext' (see annotation_utils.scan_annotations)
+    :param int verbose: if >= 2, progress is printed
 
+    :rtype: dict
+    :return: mapping of (POS, PT) -> list of annotation_utils.AnnotationRef
+    """
+    layer2counts, layer2samples = scan_annotations(fn_instance,
+                                                   sources=(source,),
+                                                   layers=('PT',),
+                                                   sample_size=sample_size,
+                                                   seed=seed,
+                                                   num_workers=num_workers,
+                                                   verbose=verbose)[source]
+    pos_and_pt2annotations = layer2samples['PT']
+
+    if verbose:
+        print('parts of speech', {pos for pos, pt in pos_and_pt2annotations})
+        print('phrase types', {pt for pos, pt in pos_and_pt2annotations})
+
+
+    return pos_and_pt2annotations
+
+
+@profiled(count=None)
+def resolve_annotation(fn_instance, annotation_ref):
+    """
+    load the exemplar annotation that a reference points to,
+    e.g., from the output of get_gf_and_pos2annotations
 
     :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param annotation_utils.AnnotationRef annotation_ref: reference to an annotation
 
-    :rtype: collections.defaultdict
-    :return: mapping of (POS, PT) -> annotations
+    :return: the NLTK annotation set (with, e.g., .GF, .PT, and .FE)
     """
-    pos_and_pt2annotations = defaultdict(list)
-    set_pos = set()
-    set_pt = set()
-    for index, annotation in enumerate(fn_instance.annotations(full_text=False, exemplars=True)):
-        pos = annotation.LU.POS
+    return annotation_utils.resolve_annotation(fn_instance, annotation_ref)
 
-        if verbose >= 2:
-            if index % 10000 == 0:
-                print(index, datetime.now())
 
-        for start, end, pt in annotation.PT:
-            key = (pos, pt)
+@profiled()
+def count_gf_and_pos(fn_instance, num_workers=1, source='exemplar', verbose=0):
+    """
+    count (POS, GF) pairs in the exemplar or full-text annotations,
+    optionally scanning the LU files or documents in parallel (see annotation_utils.scan_annotations)
 
-            if len(pos_and_pt2annotations[key]) <= 1000:
-                pos_and_pt2annotations[key].append(annotation)
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param int num_workers: number of processes, 1 (default) to scan in this process, None for the number of CPUs
+    :param str source: 'exemplar' | 'fulltext'
+    :param int verbose: if >= 2, progress is printed
 
-            set_pos.add(pos)
-            set_pt.add(pt)
+    :rtype: collections.Counter
+    :return: mapping of (POS, GF) -> frequency
+    """
+    layer2counts, _ = scan_annotations(fn_instance,
+                                       sources=(source,),
+                                       layers=('GF',),
+                                       num_workers=num_workers,
+                                       verbose=verbose)[source]
+    return layer2counts['GF']
 
-    if verbose:
-        print('parts of speech', set_pos)
-        print('phrase types', set_pt)
 
+@profiled()
+def count_pt_and_pos(fn_instance, num_workers=1, source='exemplar', verbose=0):
+    """
+    count (POS, PT) pairs in the exemplar or full-text annotations,
+    optionally scanning the LU files or documents in parallel (see annotation_utils.scan_annotations)
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param int num_workers: number of processes, 1 (default) to scan in this process, None for the number of CPUs
+    :param str source: 'exemplar' | 'fulltext'
+    :param int verbose: if >= 2, progress is printed
+
+    :rtype: collections.Counter
+    :return: mapping of (POS, PT) -> frequency
+    """
+    layer2counts, _ = scan_annotations(fn_instance,
+                                       sources=(source,),
+                                       layers=('PT',),
+                                       num_workers=num_workers,
+                                       verbose=verbose)[source]
+    return layer2counts['PT']
+
+
+
+@profiled()
+def df_compare_sources(fn_instance, layers=('GF', 'PT'), num_workers=1, verbose=0):
+    """
+    count (POS, GF) and (POS, PT) pairs in the exemplar and the full-text annotations
+    in one scan (see annotation_utils.scan_annotations), to compare both sources
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param tuple layers: 'GF' and/or 'PT'
+    :param int num_workers: number of processes, 1 (default) to scan in this process, None for the number of CPUs
+    :param int verbose: if >= 2, progress is printed
+
+    :rtype: dict
+    :return: layer -> df with per (POS, label) the frequency and relative frequency (%) per source
+    """
+    source2results = scan_annotations(fn_instance,
+                                      sources=annotation_utils.SOURCES,
+                                      layers=layers,
+                                      num_workers=num_workers,
+                                      verbose=verbose)
+
+    layer2df = {}
+    for layer in layers:
+        columns = {source: pandas.Series(layer2counts[layer], dtype='int64')
+                   for source, (layer2counts, _) in source2results.items()}
+        df = pandas.DataFrame(columns).fillna(0).astype('int64')
+        df.index = df.index.set_names(['POS', layer])
+        for source in annotation_utils.SOURCES:
+            df[f'{source} (%)'] = 100 * df[source] / max(df[source].sum(), 1)
+        layer2df[layer] = df.sort_values('exemplar', ascending=False).reset_index()
 
-    return pos_and_pt2annotations
\ No newline at end of file
+    return layer2df
+
+_annotation_indices = dict()
+
+
+@profiled()
+def get_annotation_index_dir(version):
+    """
+    :param str version: supported: '1.5' | '1.7'
+
+    :rtype: str
+    :return: default folder of the annotation index of a version,
+    which changes whenever the NLTK corpus changes
+    """
+    from snapshot_utils import DEFAULT_SNAPSHOT_DIR, get_cache_key
+    cache_key = get_cache_key(registry.get_path(version))
+    return os.path.join(DEFAULT_SNAPSHOT_DIR, f'annotations-{version}-{cache_key[:16]}')
+
+
+@profiled()
+def load_annotation_index(fn_instance, index_dir=None, num_workers=None, verbose=0):
+    """
+    load the columnar annotation index of a FrameNet version,
+    building it first if it does not exist (see index_utils.build_annotation_index)
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param str index_dir: folder of the index, None for the default folder (see get_annotation_index_dir)
+    :param int num_workers: number of processes used to build the index, None for the number of CPUs
+    :param int verbose: if >= 2, progress is printed
+
+    :rtype: index_utils.AnnotationIndex
+    :return: index of all exemplar and full-text annotation layers
+    """
+    from index_utils import AnnotationIndex, build_annotation_index
+
+    if index_dir is None:
+        version = registry.version_of(fn_instance)
+        assert version is not None, 'fn_instance has to be loaded with load_framenet if no index_dir is provided'
+        index_dir = get_annotation_index_dir(version)
+
+    if index_dir not in _annotation_indices:
+        if AnnotationIndex.exists(index_dir):
+            index = AnnotationIndex.load(index_dir)
+        else:
+            index = build_annotation_index(fn_instance,
+                                           index_dir,
+                                           num_workers=num_workers,
+                                           verbose=verbose)
+        _annotation_indices[index_dir] = index
+
+    return _annotation_indices[index_dir]
+
+
+@profiled()
+def count_annotations(index, layer, by=('pos', 'label'), **filters):
+    """
+    count annotations in the index, e.g.,
+    (POS, GF): count_annotations(index, 'GF')
+    (POS, PT): count_annotations(index, 'PT')
+    (frame, FE): count_annotations(index, 'FE', by=('frame', 'label'))
+
+    :param index_utils.AnnotationIndex index: see load_annotation_index
+    :param str layer: 'FE' | 'GF' | 'PT' | 'Target'
+    :param tuple by: columns to group by
+    :param filters: column -> value(s), e.g., source='exemplar'
+
+    :rtype: pandas.core.series.Series
+    :return: frequency per group
+    """
+    return index.count(by=by, layer=layer, **filters)
+
+
+@profiled()
+def sample_annotations(index, layer, n=1, seed=None, **filters):
+    """
+    sample annotations from the index, e.g., random examples of (N, Quant):
+    sample_annotations(index, 'GF', pos='N', label='Quant')
+
+    :param index_utils.AnnotationIndex index: see load_annotation_index
+    :param str layer: 'FE' | 'GF' | 'PT' | 'Target'
+    :param int n: number of annotations
+    :param seed: seed for sampling
+    :param filters: column -> value(s), e.g., pos='N', label='Quant'
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: sampled rows (see index_utils.AnnotationIndex.to_refs to resolve exemplar rows)
+    """
+    return index.sample(n=n, seed=seed, layer=layer, **filters)
+
+
+_valence_indices = dict()
+
+
+@profiled()
+def get_valence_index_path(version):
+    """
+    :param str version: supported: '1.5' | '1.7'
+
+    :rtype: str
+    :return: default path of the valence index of a version,
+    which changes whenever the NLTK corpus changes
+    """
+    from snapshot_utils import DEFAULT_SNAPSHOT_DIR, get_cache_key
+    cache_key = get_cache_key(registry.get_path(version))
+    return os.path.join(DEFAULT_SNAPSHOT_DIR, f'valence-{version}-{cache_key[:16]}.pickle')
+
+
+@profiled()
+def load_valence_index(fn_instance, path=None, num_workers=None, verbose=0):
+    """
+    load the valence patterns (FE, GF, PT) per LU of a FrameNet version,
+    building and storing them first if they do not exist (see valence_utils.build_valence_index)
+
+    :param instance of nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instace of fn version
+    :param str path: path of the index, None for the default path (see get_valence_index_path)
+    :param int num_workers: number of processes used to build the index, None for the number of CPUs
+    :param int verbose: if >= 2, progress is printed
+
+    :rtype: valence_utils.ValenceIndex
+    :return: index that can be queried by LU, frame, or pattern
+    """
+    from valence_utils import ValenceIndex, build_valence_index
+
+    if path is None:
+        version = registry.version_of(fn_instance)
+        assert version is not None, 'fn_instance has to be loaded with load_framenet if no path is provided'
+        path = get_valence_index_path(version)
+
+    if path not in _valence_indices:
+        if os.path.exists(path):
+            index = ValenceIndex.load(path)
+        else:
+            index = build_valence_index(fn_instance,
+                                        num_workers=num_workers,
+                                        verbose=verbose)
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            index.save(path)
+        _valence_indices[path] = index
+
+    return _valence_indices[path]
@@ -0,0 +1,135 @@
+import random
+
+from snapshot_utils import SNAPSHOT_FORMAT, FrameNetSnapshot
+
+
+# approximate size of FrameNet 1.7, which is multiplied by the scale
+NUM_FRAMES = 1221
+MEAN_LUS_PER_FRAME = 11
+MEAN_FES_PER_FRAME = 9
+RELATIONS_PER_FRAME = {
+    'Inheritance': 0.5,
+    'Using': 1.2,
+    'Subframe': 0.1,
+    'Perspective_on': 0.1,
+    'Precedes': 0.07,
+    'See_also': 0.08,
+    'Causative_of': 0.04,
+    'Inchoative_of': 0.02,
+    'Metaphor': 0.05,
+    'ReFraming_Mapping': 0.05,
+}
+CORE_TYPES = [('Core', 0.35), ('Core-Unexpressed', 0.02), ('Peripheral', 0.45), ('Extra-Thematic', 0.18)]
+POS_TAGS = [('n', 0.45), ('v', 0.35), ('a', 0.15), ('adv', 0.03), ('prep', 0.02)]
+FE_NAMES = ['Agent', 'Theme', 'Time', 'Place', 'Manner', 'Means', 'Purpose', 'Degree', 'Duration',
+            'Explanation', 'Frequency', 'Goal', 'Source', 'Path', 'Instrument', 'Patient', 'Cause',
+            'Entity', 'Event', 'Descriptor', 'Depictive', 'Result', 'Topic', 'Speaker', 'Message']
+
+
+def _weighted_choice(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def make_synthetic_payload(scale=1.0, seed=0):
+    """
+    generate a random lexicon in the snapshot format (see snapshot_utils.snapshot_payload)
+    with roughly 'scale' times the number of frames, FEs, LUs, and frame relations of FrameNet 1.7.
+    No corpus is needed, so it can be used to benchmark offline at, e.g., 10x or 100x the size.
+
+    :param float scale: size relative to FrameNet 1.7
+    :param int seed: seed of the random generator
+
+    :rtype: dict
+    :return: payload of a snapshot (without precomputed relation index)
+    """
+    rng = random.Random(seed)
+    num_frames = max(2, int(NUM_FRAMES * scale))
+    num_lemmas = max(10, int(num_frames * MEAN_LUS_PER_FRAME / 1.3))
+
+    semtypes = [(1, 'Sentient', 'Sent', 'sentient being', None),
+                (2, 'Human', 'Hum', 'human being', 1),
+                (3, 'Physical_object', 'Phys', 'physical object', None)]
+
+    frames = []
+    fe_id = 0
+    lu_id = 0
+    for frame_id in range(1, num_frames + 1):
+        frame_name = f'Frame_{frame_id}'
+
+        num_fes = max(1, int(rng.expovariate(1 / MEAN_FES_PER_FRAME)))
+        fe_names = rng.sample(FE_NAMES, min(num_fes, len(FE_NAMES)))
+        fes = []
+        for index, fe_name in enumerate(fe_names):
+            fe_id += 1
+            requires = fe_names[0] if index == 1 and rng.random() < 0.1 else None
+            excludes = fe_names[0] if index == 2 and rng.random() < 0.1 else None
+            fes.append((fe_id,
+                        fe_name,
+                        fe_name[:3],
+                        f'definition of {fe_name} in {frame_name}',
+                        _weighted_choice(rng, CORE_TYPES),
+                        rng.choice([None, 1, 2, 3]),
+                        requires,
+                        excludes))
+
+        lus = []
+        lu_names = set()
+        num_lus = int(rng.expovariate(1 / MEAN_LUS_PER_FRAME)) if rng.random() > 0.1 else 0
+        for _ in range(num_lus):
+            lu_name = f'lemma{rng.randrange(num_lemmas)}.{_weighted_choice(rng, POS_TAGS)}'
+            if lu_name in lu_names:
+                continue
+            lu_names.add(lu_name)
+            lu_id += 1
+            lus.append((lu_id, lu_name, lu_name.rsplit('.', 1)[1].upper(), f'COD: {lu_name}', 'Created'))
+
+        coresets = []
+        if len(fe_names) >= 2 and rng.random() < 0.2:
+            coresets.append(tuple(fe_names[:2]))
+
+        frames.append((frame_id,
+                       frame_name,
+                       f'Definition of {frame_name}',
+                       tuple(rng.sample([1, 2, 3], rng.randint(0, 1))),
+                       tuple(fes),
+                       tuple(lus),
+                       tuple(coresets)))
+
+    frame_relations = []
+    relation_id = 0
+    for rel_type, per_frame in RELATIONS_PER_FRAME.items():
+        pairs = set()
+        for _ in range(int(num_frames * per_frame)):
+            sup_id, sub_id = rng.sample(range(1, num_frames + 1), 2)
+            if rel_type in {'Inheritance', 'Using', 'Subframe', 'Perspective_on'}:
+                # hierarchies are acyclic, as in FrameNet
+                sup_id, sub_id = min(sup_id, sub_id), max(sup_id, sub_id)
+            if (sup_id, sub_id) in pairs:
+                continue
+            pairs.add((sup_id, sub_id))
+            relation_id += 1
+            frame_relations.append((relation_id, rel_type, sup_id, f'Frame_{sup_id}', sub_id, f'Frame_{sub_id}'))
+
+    payload = {
+        'format': SNAPSHOT_FORMAT,
+        'version': f'synthetic-{scale}x',
+        'cache_key': f'synthetic-{scale}-{seed}',
+        'semtypes': semtypes,
+        'frames': frames,
+        'frame_relations': frame_relations,
+        'relation_index': None,
+    }
+
+    return payload
+
+
+def make_synthetic_lexicon(scale=1.0, seed=0):
+    """
+    :param float scale: size relative to FrameNet 1.7 (see make_synthetic_payload)
+    :param int seed: seed of the random generator
+
+    :rtype: snapshot_utils.FrameNetSnapshot
+    :return: random lexicon with the interface of a FrameNet snapshot
+    """
+    return FrameNetSnapshot(make_synthetic_payload(scale=scale, seed=seed))
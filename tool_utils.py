@@ -1,12 +1,19 @@
-from shutil import rmtree
 import os
+import hashlib
+import tempfile
+import multiprocessing
 from collections import defaultdict
 from collections import Counter
 import json
 
+from traversal_utils import LexiconAggregator, traverse_lexicon
+from profiling_utils import profiled, profiler
+from format_utils import OUTPUT_FORMATS, get_extension, get_open_mode, write_records
+
 
 def get_lu(lu, pos_in_lu=False, pos_mapping=dict()):
-    lemma, pos = lu.rsplit('.')
+    # lemmas can contain dots, e.g., 'e.g..adv'
+    lemma, pos = lu.rsplit('.', 1)
 
     if pos_mapping:
         pos = pos_mapping[pos]
@@ -20,6 +27,72 @@ def get_lu(lu, pos_in_lu=False, pos_mapping=dict()):
 
 
 
+class LUToFramesAggregator(LexiconAggregator):
+    """
+    lu -> candidate frame IDs (see load_lu_to_frames)
+    """
+
+    def __init__(self, pos_in_lu=False, pos_mapping=dict()):
+        self.pos_in_lu = pos_in_lu
+        self.pos_mapping = pos_mapping
+        self.lu_to_frames = defaultdict(set)
+
+    def visit_lu(self, frame, lu_name, lu):
+        lu_to_use = get_lu(lu_name, pos_in_lu=self.pos_in_lu, pos_mapping=self.pos_mapping)
+        self.lu_to_frames[lu_to_use].add(str(frame.ID))
+
+    def result(self):
+        lu_to_frames = self.lu_to_frames
+        for key, value in lu_to_frames.items():
+            lu_to_frames[key] = list(value)
+        return lu_to_frames
+
+
+def get_frame_info(frame):
+    """
+    :param frame: NLTK frame
+
+    :rtype: dict
+    :return: definition, label, and roles of the frame (see load_frame_to_info)
+    """
+    roles = []
+
+    for fe, role_info in frame.FE.items():
+
+        role_info = {
+            'role_id' : str(role_info.ID),
+            'role_label' : role_info.name,
+            'role_definition' : role_info.definition,
+            'role_type' : role_info.coreType
+        }
+
+        roles.append(role_info)
+
+    info = {
+        'definition' : frame.definition,
+        'frame_label' : frame.name,
+        'roles' : roles,
+    }
+
+    return info
+
+
+class FrameToInfoAggregator(LexiconAggregator):
+    """
+    frame ID -> definition and roles (see load_frame_to_info)
+    """
+
+    def __init__(self):
+        self.frame_to_info = {}
+
+    def visit_frame(self, frame):
+        self.frame_to_info[frame.ID] = get_frame_info(frame)
+
+    def result(self):
+        return self.frame_to_info
+
+
+@profiled()
 def load_lu_to_frames(fn_instance,
                       pos_in_lu=False,
                       pos_mapping=dict(),
@@ -32,19 +105,8 @@ def load_lu_to_frames(fn_instance,
     :rtype: dict
     :return: mapping of lu -> candidate frames
     """
-    lu_to_frames = defaultdict(set)
-
-    for frame in fn_instance.frames():
-        frame_ID = str(frame.ID)
-
-        for lu, info in frame.lexUnit.items():
-
-            lu_to_use = get_lu(lu, pos_in_lu=pos_in_lu, pos_mapping=pos_mapping)
-
-            lu_to_frames[lu_to_use].add(frame_ID)
-
-    for key, value in lu_to_frames.items():
-        lu_to_frames[key] = list(value)
+    aggregator = LUToFramesAggregator(pos_in_lu=pos_in_lu, pos_mapping=pos_mapping)
+    lu_to_frames = traverse_lexicon(fn_instance, {'lu_to_frames': aggregator})['lu_to_frames']
 
     if verbose:
         print()
@@ -55,6 +117,7 @@ def load_lu_to_frames(fn_instance,
     return lu_to_frames
 
 
+@profiled()
 def load_frame_to_info(fn_instance, verbose=0):
     """
     load information per frames:
@@ -65,43 +128,159 @@ def load_frame_to_info(fn_instance, verbose=0):
     :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: loaded instance of FrameNet in nltk
     :return:
     """
-    frame_to_info = {}
+    frame_to_info = traverse_lexicon(fn_instance, {'frame_to_info': FrameToInfoAggregator()})['frame_to_info']
 
+    if verbose:
+        print()
+        print(f'found {len(frame_to_info)} frames')
+
+    return frame_to_info
+
+
+def iter_frame_to_info(fn_instance):
+    """
+    streaming version of load_frame_to_info
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: loaded instance of FrameNet in nltk
+
+    :rtype: generator
+    :return: (frame ID, info)
+    """
     for frame in fn_instance.frames():
+        yield frame.ID, get_frame_info(frame)
 
-        definition = frame.definition
-        frame_label = frame.name
-        roles = []
 
-        for fe, role_info in frame.FE.items():
+FRAME_LABEL_KEYS = [('main_frame_labels', 'main_frame_ids'),
+                    ('subframe_labels', 'subframe_ids')]
 
-            role_id = str(role_info.ID)
-            role_definition = role_info.definition
-            role_label = role_info.name
-            role_type = role_info.coreType
 
-            role_info = {
-                'role_id' : role_id,
-                'role_label' : role_label,
-                'role_definition' : role_definition,
-                'role_type' : role_type
-            }
+def get_frame_label_table(fn_instance,
+                          frame_labels,
+                          pos_in_lu=False,
+                          pos_mapping=dict()):
+    """
+    look up each distinct frame label once
 
-            roles.append(role_info)
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: loaded instance of FrameNet in nltk
+    :param iterable frame_labels: frame labels, possibly with duplicates
 
-        info = {
-            'definition' : definition,
-            'frame_label' : frame_label,
-            'roles' : roles,
-        }
+    :rtype: dict
+    :return: frame label -> (frame ID, tuple of lus (see get_lu) that evoke the frame)
+    """
+    label2frame = {}
 
-        frame_to_info[frame.ID] = info
+    for frame_label in frame_labels:
+        if frame_label in label2frame:
+            continue
 
-    if verbose:
-        print()
-        print(f'found {len(frame_to_info)} frames')
+        frame = fn_instance.frame_by_name(frame_label)
+        lus = {get_lu(lu, pos_in_lu=pos_in_lu, pos_mapping=pos_mapping)
+               for lu in frame.lexUnit}
+        label2frame[frame_label] = (frame.ID, tuple(lus))
 
-    return frame_to_info
+    return label2frame
+
+
+def compute_dominant_frames(info, label2frame, languages={'en', 'it', 'nl'}):
+    """
+    compute the frame IDs and the lu -> dominant frame mapping of one event type.
+    A frame is dominant for a lu if it is the only frame of the event type that the lu evokes.
+    Only the 'en' slot is filled, since the lus are those of English FrameNet.
+
+    :param dict info: dominant frame information of an event type
+    (see fn_tool_input/event_type_to_dominant_frame.json for example)
+    :param dict label2frame: see get_frame_label_table
+
+    :rtype: dict
+    :return: info with 'main_frame_ids', 'subframe_ids', and 'lu_to_dominant_frame'
+    """
+    lu_to_frames = defaultdict(set)
+
+    for label_key, id_key in FRAME_LABEL_KEYS:
+        info[id_key] = []
+        for frame_label in info[label_key]:
+            frame_id, lus = label2frame[frame_label]
+            info[id_key].append(frame_id)
+            for lu in lus:
+                lu_to_frames[lu].add(frame_id)
+
+    info['lu_to_dominant_frame'] = {
+        lang : dict()
+        for lang in languages
+    }
+    info['lu_to_dominant_frame']['en'] = {
+        lu : next(iter(frames))
+        for lu, frames in lu_to_frames.items()
+        if len(frames) == 1
+    }
+
+    return info
+
+
+_worker_label2frame = None
+
+
+def _init_dominant_frame_worker(label2frame):
+    global _worker_label2frame
+    _worker_label2frame = label2frame
+
+
+def _compute_dominant_frames_chunk(args):
+    items, languages = args
+    return [(event_type, compute_dominant_frames(info, _worker_label2frame, languages=languages))
+            for event_type, info in items]
+
+
+@profiled()
+def resolve_dominant_frames(fn_instance,
+                            event_type_to_dominant_frame,
+                            pos_in_lu=False,
+                            pos_mapping=dict(),
+                            languages={'en', 'it', 'nl'},
+                            num_workers=1,
+                            chunk_size=1000):
+    """
+    batch version of get_dominant_frame_info for many event types:
+    1. all distinct frame labels are resolved once (see get_frame_label_table)
+    2. the dominant frames are computed per event type, optionally in parallel processes
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: loaded instance of FrameNet in nltk
+    :param dict event_type_to_dominant_frame: mapping of event_type -> dominant_frame information
+    (see fn_tool_input/event_type_to_dominant_frame.json for example)
+    :param int num_workers: number of processes, None for the number of CPUs
+    :param int chunk_size: number of event types per task
+
+    :rtype: dict
+    :return: event_type_to_dominant_frame, updated with the frame IDs and dominant frames
+    """
+    all_labels = (frame_label
+                  for info in event_type_to_dominant_frame.values()
+                  for label_key, id_key in FRAME_LABEL_KEYS
+                  for frame_label in info[label_key])
+    label2frame = get_frame_label_table(fn_instance,
+                                        all_labels,
+                                        pos_in_lu=pos_in_lu,
+                                        pos_mapping=pos_mapping)
+
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    if num_workers == 1:
+        for event_type, info in event_type_to_dominant_frame.items():
+            compute_dominant_frames(info, label2frame, languages=languages)
+        return event_type_to_dominant_frame
+
+    items = list(event_type_to_dominant_frame.items())
+    tasks = [(items[index:index + chunk_size], languages)
+             for index in range(0, len(items), chunk_size)]
+    with multiprocessing.Pool(processes=num_workers,
+                              initializer=_init_dominant_frame_worker,
+                              initargs=(label2frame,)) as pool:
+        for results in pool.imap(_compute_dominant_frames_chunk, tasks):
+            for event_type, info in results:
+                event_type_to_dominant_frame[event_type] = info
+
+    return event_type_to_dominant_frame
 
 
 def get_dominant_frame_info(fn_instance,
@@ -113,6 +292,7 @@ def get_dominant_frame_info(fn_instance,
     """
     load event_type_to_dominant_frame and add for each event_type:
     'lu_to_dominant_frame' -> mapping from lu to dominant frame
+    (see resolve_dominant_frames for many event types)
 
 
     :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: loaded instance of FrameNet in nltk
@@ -120,104 +300,254 @@ def get_dominant_frame_info(fn_instance,
     (see fn_tool_input/event_type_to_dominant_frame.json for example)
     :return:
     """
+    return resolve_dominant_frames(fn_instance,
+                                   event_type_to_dominant_frame,
+                                   pos_in_lu=pos_in_lu,
+                                   pos_mapping=pos_mapping,
+                                   languages=languages,
+                                   num_workers=1)
 
 
-    for event_type, info in event_type_to_dominant_frame.items():
+BUILD_MANIFEST = '.build_manifest.json'
 
-        event_type_to_dominant_frame[event_type]['lu_to_dominant_frame'] = {
-            lang : dict()
-            for lang in languages
-        }
-        lu_to_frames = defaultdict(set)
 
-        for label_key, id_key in [('main_frame_labels', 'main_frame_ids'),
-                                  ('subframe_labels', 'subframe_ids')]:
+def get_file_hash(path):
+    """
+    :param str path: path to a file
 
-            frame_labels = info[label_key]
-            info[id_key] = []
-            for frame_label in frame_labels:
+    :rtype: str
+    :return: sha1 hex digest of the content of the file
+    """
+    hasher = hashlib.sha1()
+    with open(path, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(1 << 20), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
 
-                frame = fn_instance.frame_by_name(frame_label)
-                frame_id = frame.ID
 
-                info[id_key].append(frame_id)
+def get_framenet_fingerprint(fn_instance):
+    """
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: loaded instance of FrameNet in nltk
+    (or a snapshot_utils.FrameNetSnapshot)
 
-                for lu, lu_info in frame.lexUnit.items():
-                    lu_to_use = get_lu(lu, pos_in_lu=pos_in_lu, pos_mapping=pos_mapping)
-                    lu_to_frames[lu_to_use].add(frame_id)
+    :rtype: str
+    :return: key that changes whenever the underlying FrameNet corpus changes
+    """
+    from snapshot_utils import get_cache_key
 
-                for lu, frames in lu_to_frames.items():
-                    if len(frames) == 1:
-                        event_type_to_dominant_frame[event_type]['lu_to_dominant_frame']['en'][lu] = frames.pop()
+    if hasattr(fn_instance, 'cache_key'):
+        return fn_instance.cache_key
+    return get_cache_key(fn_instance.root.path)
 
-    return event_type_to_dominant_frame
 
+def get_fingerprint(inputs):
+    """
+    :param dict inputs: description of everything an artifact depends on
 
-def create_tool_input(output_folder,
-                      fn_instance,
-                      readme_path,
-                      event_type_to_dominant_frame_path,
-                      pos_in_lu=False,
-                      pos_mapping=dict(),
-                      verbose=0):
+    :rtype: str
+    :return: sha1 hex digest of the inputs
     """
+    serialized = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
 
-    :param str output_folder: where output is stored.
-    if folder exists, it will be removed
-    :return:
+
+def get_umask():
+    """
+    :rtype: int
+    :return: the file mode creation mask of this process
     """
-    if os.path.exists(output_folder):
-        rmtree(output_folder)
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
 
-    os.mkdir(output_folder)
 
-    lu_to_frames = load_lu_to_frames(fn_instance,
-                                     pos_in_lu=pos_in_lu,
-                                     pos_mapping=pos_mapping,
-                                     verbose=verbose)
+def write_atomically(path, write_function, mode='w'):
+    """
+    write a file via a temporary file in the same folder, so that readers
+    never see a partially written file.
+    The file gets the permissions of a file created with open (0666 minus the umask),
+    not the 0600 of the temporary file.
+
+    :param str path: path of the output file
+    :param write_function: function that writes to the open file it receives
+    :param str mode: 'w' for text, 'wb' for binary files
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        os.fchmod(fd, 0o666 & ~get_umask())
+        with os.fdopen(fd, mode) as outfile:
+            write_function(outfile)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
 
-    lu_path = os.path.join(output_folder, 'lu_to_frames.json')
-    with open(lu_path, 'w') as outfile:
-        json.dump(lu_to_frames, outfile, indent=4, sort_keys=True)
 
-        if verbose >= 1:
-            print()
-            print(f'written lu to frame mapping to {lu_path}')
+def write_json(path, a_dict):
+    write_atomically(path, lambda outfile: json.dump(a_dict, outfile, indent=4, sort_keys=True))
 
-    readme_output_path = os.path.join(output_folder, 'README.md')
-    with open(readme_path) as infile:
-        with open(readme_output_path, 'w') as outfile:
-            outfile.write(infile.read())
 
-        if verbose >= 1:
-            print()
-            print(f'written README to {readme_output_path}')
+def write_records_atomically(path, records, output_format='json'):
+    """
+    :param str path: path of the output file
+    :param records: iterable of (key, value), e.g., a generator
+    :param str output_format: see format_utils.OUTPUT_FORMATS
+    """
+    write_atomically(path,
+                     lambda outfile: write_records(outfile, records, output_format=output_format),
+                     mode=get_open_mode(output_format, mode='w'))
 
-    frame_to_info = load_frame_to_info(fn_instance, verbose=verbose)
 
-    frame_path = os.path.join(output_folder, 'frame_to_info.json')
-    with open(frame_path, 'w') as outfile:
-        json.dump(frame_to_info, outfile, indent=4, sort_keys=True)
+def load_build_manifest(output_folder):
+    """
+    :rtype: dict
+    :return: artifact filename -> fingerprint of the inputs it was built from
+    """
+    manifest_path = os.path.join(output_folder, BUILD_MANIFEST)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as infile:
+        return json.load(infile)
+
+
+@profiled()
+def create_tool_input(output_folder,
+                      fn_instance,
+                      readme_path,
+                      event_type_to_dominant_frame_path,
+                      pos_in_lu=False,
+                      pos_mapping=dict(),
+                      output_format='json',
+                      force=False,
+                      verbose=0):
+    """
+    (re)build the tool input artifacts (with the extension of the output format):
+    - lu_to_frames.json
+    - frame_to_info.json
+    - README.md
+    - event_type_to_dominant_frame.json
+    - lu_candidates.json (see lookup_utils.CandidateIndex)
+
+    Each artifact declares its inputs (FrameNet corpus, pos_in_lu, pos_mapping, input files).
+    An artifact is only rebuilt if its inputs changed since the previous build,
+    which is recorded in a manifest in the output folder. Files are written atomically.
+    Artifacts that the current settings do not produce (e.g., lu_to_frames.json after
+    a build with output_format='jsonl') are removed, so no stale data is left behind.
+
+    :param str output_folder: where output is stored (created if it does not exist)
+    :param str output_format: 'json' (indented), 'compact_json', 'jsonl' (one frame/lu per line),
+    or 'msgpack', which determines the extension of the data artifacts
+    (see format_utils; read them with format_utils.iter_records or format_utils.read_records)
+    :param bool force: if True, all artifacts are rebuilt
+
+    :rtype: dict
+    :return: artifact filename -> 'built' | 'skipped' | 'removed'
+    """
+    os.makedirs(output_folder, exist_ok=True)
+
+    framenet_fingerprint = get_framenet_fingerprint(fn_instance)
+    lu_settings = {'pos_in_lu': pos_in_lu, 'pos_mapping': pos_mapping}
+    format_settings = {'output_format': output_format}
+    extension = get_extension(output_format)
+
+    def build_lu_to_frames(path):
+        lu_to_frames = load_lu_to_frames(fn_instance,
+                                         pos_in_lu=pos_in_lu,
+                                         pos_mapping=pos_mapping,
+                                         verbose=verbose)
+        write_records_atomically(path, lu_to_frames.items(), output_format=output_format)
+
+    def build_readme(path):
+        with open(readme_path) as infile:
+            content = infile.read()
+        write_atomically(path, lambda outfile: outfile.write(content))
+
+    def build_frame_to_info(path):
+        write_records_atomically(path, iter_frame_to_info(fn_instance), output_format=output_format)
+
+    def build_lu_candidates(path):
+        from lookup_utils import CandidateIndex
+
+        candidate_index = CandidateIndex.from_fn_instance(fn_instance)
+        write_records_atomically(path, candidate_index.records(), output_format=output_format)
+
+    def build_dominant_frame_info(path):
+        with open(event_type_to_dominant_frame_path) as infile:
+            event_type_to_dominant_frame = json.load(infile)
+
+        dominant_frame_info = get_dominant_frame_info(fn_instance=fn_instance,
+                                                      event_type_to_dominant_frame=event_type_to_dominant_frame,
+                                                      pos_in_lu=pos_in_lu,
+                                                      pos_mapping=pos_mapping)
+        write_records_atomically(path, dominant_frame_info.items(), output_format=output_format)
+
+    artifacts = [
+        ('lu_to_frames' + extension,
+         {'framenet': framenet_fingerprint, **lu_settings, **format_settings},
+         build_lu_to_frames),
+        ('README.md',
+         {'readme': get_file_hash(readme_path)},
+         build_readme),
+        ('frame_to_info' + extension,
+         {'framenet': framenet_fingerprint, **format_settings},
+         build_frame_to_info),
+        ('event_type_to_dominant_frame' + extension,
+         {'framenet': framenet_fingerprint,
+          'event_types': get_file_hash(event_type_to_dominant_frame_path),
+          **lu_settings, **format_settings},
+         build_dominant_frame_info),
+        ('lu_candidates' + extension,
+         {'framenet': framenet_fingerprint, **format_settings},
+         build_lu_candidates),
+    ]
+
+    manifest_path = os.path.join(output_folder, BUILD_MANIFEST)
+    manifest = load_build_manifest(output_folder)
+    filename2status = {}
+
+    for filename, inputs, build_function in artifacts:
+        path = os.path.join(output_folder, filename)
+        fingerprint = get_fingerprint(inputs)
+
+        if not force and os.path.exists(path) and manifest.get(filename) == fingerprint:
+            filename2status[filename] = 'skipped'
+            if verbose >= 1:
+                print()
+                print(f'{path} is up to date')
+            continue
+
+        with profiler.stage(f'create_tool_input.{filename}'):
+            build_function(path)
+        manifest[filename] = fingerprint
+        # written after every artifact, so a build that crashes halfway resumes from the built artifacts
+        write_json(manifest_path, manifest)
+        filename2status[filename] = 'built'
 
         if verbose >= 1:
             print()
-            print(f'written frame info to {frame_path}')
+            print(f'written {path}')
 
-    event_type_to_dominant_frame = json.load(open(event_type_to_dominant_frame_path))
+    # remove the artifacts of earlier builds that the current settings do not produce,
+    # including data artifacts with the extension of another output format
+    current_filenames = {filename for filename, _, _ in artifacts}
+    known_filenames = {filename[:-len(extension)] + other_extension
+                       for filename in current_filenames if filename.endswith(extension)
+                       for other_extension in set(OUTPUT_FORMATS.values())}
+    for filename in sorted((set(manifest) | known_filenames) - current_filenames):
+        path = os.path.join(output_folder, filename)
+        if os.path.exists(path):
+            os.remove(path)
+            filename2status[filename] = 'removed'
 
-    dominant_frame_info = get_dominant_frame_info(fn_instance=fn,
-                                                  event_type_to_dominant_frame=event_type_to_dominant_frame,
-                                                  pos_in_lu=pos_in_lu,
-                                                  pos_mapping=pos_mapping)
+            if verbose >= 1:
+                print()
+                print(f'removed {path}')
 
-    dominant_frame_info_path = os.path.join(output_folder, 'event_type_to_dominant_frame.json')
+        manifest.pop(filename, None)
 
-    with open(dominant_frame_info_path, 'w') as outfile:
-        json.dump(dominant_frame_info, outfile, indent=4, sort_keys=True)
+    write_json(manifest_path, manifest)
 
-        if verbose >= 1:
-            print()
-            print(f'written dominant frame info to {dominant_frame_info_path}')
+    return filename2status
 
 
 if __name__ == '__main__':
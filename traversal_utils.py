@@ -0,0 +1,116 @@
+from time import perf_counter
+
+from profiling_utils import profiler
+
+
+class LexiconAggregator(object):
+    """
+    base class of aggregations over the FrameNet lexicon
+
+    subclasses override the visit methods they need and return their table(s) in 'result'.
+    Pass instances to 'traverse_lexicon' to compute several aggregations in one pass.
+    """
+
+    def visit_frame(self, frame):
+        """
+        called once per frame, before its FEs and LUs are visited
+        """
+        pass
+
+    def visit_fe(self, frame, fe_name, fe):
+        """
+        called once per frame element of a frame
+        """
+        pass
+
+    def visit_lu(self, frame, lu_name, lu):
+        """
+        called once per lexical unit of a frame
+        """
+        pass
+
+    def result(self):
+        """
+        :return: the aggregation after the traversal has finished
+        """
+        raise NotImplementedError
+
+
+def _overrides(aggregator, method_name):
+    """
+    :rtype: bool
+    :return: True if the aggregator implements the visit method itself
+    """
+    return getattr(type(aggregator), method_name) is not getattr(LexiconAggregator, method_name)
+
+
+def _visit(frame, frame_visitors, fe_visitors, lu_visitors):
+    for aggregator in frame_visitors:
+        aggregator.visit_frame(frame)
+
+    if fe_visitors:
+        for fe_name, fe in frame.FE.items():
+            for aggregator in fe_visitors:
+                aggregator.visit_fe(frame, fe_name, fe)
+
+    if lu_visitors:
+        for lu_name, lu in frame.lexUnit.items():
+            for aggregator in lu_visitors:
+                aggregator.visit_lu(frame, lu_name, lu)
+
+
+def _traverse_profiled(fn_instance, frame_visitors, fe_visitors, lu_visitors):
+    """
+    traverse the lexicon while timing the loading of frames (NLTK XML parsing)
+    and the aggregators separately (see profiling_utils)
+    """
+    load_time = 0.0
+    aggregate_time = 0.0
+    num_frames = 0
+
+    frames = iter(fn_instance.frames())
+    while True:
+        start = perf_counter()
+        frame = next(frames, None)
+        load_time += perf_counter() - start
+        if frame is None:
+            break
+
+        start = perf_counter()
+        _visit(frame, frame_visitors, fe_visitors, lu_visitors)
+        aggregate_time += perf_counter() - start
+        num_frames += 1
+
+    profiler.add('traverse_lexicon.load_frames', load_time, num_items=num_frames)
+    profiler.add('traverse_lexicon.aggregate', aggregate_time, num_items=num_frames)
+
+
+def traverse_lexicon(fn_instance, aggregators):
+    """
+    traverse all frames, FEs and LUs exactly once and feed them to the aggregators
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    (a snapshot_utils.FrameNetSnapshot can be used as well)
+    :param dict aggregators: name -> instance of LexiconAggregator
+
+    :rtype: dict
+    :return: name -> result of the aggregator
+    """
+    frame_visitors = [aggregator for aggregator in aggregators.values()
+                      if _overrides(aggregator, 'visit_frame')]
+    fe_visitors = [aggregator for aggregator in aggregators.values()
+                   if _overrides(aggregator, 'visit_fe')]
+    lu_visitors = [aggregator for aggregator in aggregators.values()
+                   if _overrides(aggregator, 'visit_lu')]
+
+    if profiler.enabled:
+        _traverse_profiled(fn_instance, frame_visitors, fe_visitors, lu_visitors)
+    else:
+        for frame in fn_instance.frames():
+            _visit(frame, frame_visitors, fe_visitors, lu_visitors)
+
+    with profiler.stage('traverse_lexicon.results', num_items=len(aggregators)):
+        results = {name: aggregator.result()
+                   for name, aggregator in aggregators.items()}
+
+    return results
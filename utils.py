@@ -1,64 +1,341 @@
 import os
+import re
 import json
+import html
 from pathlib import Path
 import pandas
 
 
-def load_paths(category):
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# categories used in the notebooks, other category files in the terminology folder are discovered as well
+CATEGORIES = ['frame-to-frame-relations',
+              'frame-to-fe-relations',
+              'fe-to-fe-relations',
+              'grammatical-functions',
+              'phrase-types']
+BIBTEX_FILENAME = 'main.bib'
+
+
+def get_terminology_dirs():
     """
-    load relevant paths for category
-    
-    :param str category: supported: 'frame-to-frame'
-    
+    :rtype: list
+    :return: candidate 'terminology' folders, in order of preference:
+    next to this package, then in the current working directory
+    """
+    candidates = [os.path.join(PACKAGE_DIR, 'terminology'),
+                  os.path.join(Path().resolve(), 'terminology')]
+    return list(dict.fromkeys(candidates))
+
+
+def parse_bibtex(text):
+    """
+    minimal BibTeX parser for the fields used to render references
+
+    :param str text: content of a .bib file
+
     :rtype: dict
-    :return: {
-        'category' : 'frame-to-frame-relations' |
-        'definitions_path' : json path where possible values of category with definitions are stored,
-        'bibtex_path' : path to bibtex with relevant references
-    }
+    :return: bibtex key -> field name (lowercased) -> value, e.g., 'author', 'year', 'title'
     """
-    accepted_categories = {'frame-to-frame-relations'}
-    cur_dir = Path().resolve()
+    key2fields = {}
+    for match in re.finditer(r'@\w+\s*\{\s*([^,\s]+)\s*,', text):
+        key = match.group(1)
+        fields = {}
 
-    possible_values_path = os.path.join(cur_dir, 'terminology', f'{category}.json')
-    assert os.path.exists(possible_values_path), f'{category} not among accepted categories: {accepted_categories}'
+        # the entry ends at the brace that closes the opening brace
+        depth = 1
+        index = match.end()
+        start = index
+        while index < len(text) and depth:
+            if text[index] == '{':
+                depth += 1
+            elif text[index] == '}':
+                depth -= 1
+            index += 1
+        body = text[start:index - 1]
 
-    bibtex_path = os.path.join(cur_dir, 'terminology', 'main.bib')
-    assert os.path.exists(bibtex_path), f'cannot find {bibtex_path}'
+        for field_match in re.finditer(r'(\w+)\s*=\s*(\{(?:[^{}]|\{[^{}]*\})*\}|"[^"]*"|\d+)', body):
+            value = field_match.group(2).strip('{}"')
+            fields[field_match.group(1).lower()] = ' '.join(value.replace('{', '').replace('}', '').split())
 
-    paths = {
-        'category' : category,
-        'definitions_path': possible_values_path,
-        'bibtex_path' : bibtex_path
-    }
+        key2fields[key] = fields
 
-    return paths
+    return key2fields
 
 
-def load_definitions_in_df(settings):
+def escape_latex(value):
     """
-    load definitions into dataframe
+    :rtype: str
+    :return: value with the LaTeX special characters escaped, e.g., 'NP & PP' -> 'NP \\& PP'
+    """
+    return re.sub(r'([&%$#_{}])', r'\\\1', str(value))
 
-    :param dict settings: see output from 'load_paths' in this same python file
 
-    :rtype: pandas.core.frame.DataFrame
-    :return: df with information about the definition of each category value
+def format_citation(fields, bibtex_key, page=None):
     """
-    definitions = json.load(open(settings['definitions_path']))
+    :param dict fields: output of parse_bibtex for one entry (can be empty)
+    :param str bibtex_key: used if the entry has no authors or year
+    :param page: page number(s)
+
+    :rtype: str
+    :return: e.g., 'Ruppenhofer et al. (2016, p. 80)'
+    """
+    authors = [author.strip() for author in fields.get('author', '').split(' and ') if author.strip()]
+    surnames = [author.split(',')[0] if ',' in author else author.split()[-1]
+                for author in authors]
+
+    if not surnames or 'year' not in fields:
+        citation = bibtex_key
+        return f'{citation}, p. {page}' if page else citation
+
+    if len(surnames) == 1:
+        names = surnames[0]
+    elif len(surnames) == 2:
+        names = f'{surnames[0]} and {surnames[1]}'
+    else:
+        names = f'{surnames[0]} et al.'
+
+    year = fields['year']
+    if page:
+        return f'{names} ({year}, p. {page})'
+    return f'{names} ({year})'
+
+
+class TerminologyRegistry(object):
+    """
+    definitions of the values of terminology categories (e.g., the frame-to-frame relations)
+    and the BibTeX file with their references.
+
+    The JSON files and main.bib are discovered in the 'terminology' folder (see get_terminology_dirs),
+    parsed on first use, and kept in memory. A file is only parsed again when its modification time
+    or size changes, so notebooks can re-run cells without re-reading the files.
+    """
+
+    def __init__(self, terminology_dir=None):
+        """
+        :param str terminology_dir: folder with the category JSON files and main.bib,
+        None to discover it (see get_terminology_dirs)
+        """
+        self._terminology_dir = terminology_dir
+        self._cache = dict()
+
+    @property
+    def terminology_dir(self):
+        """
+        :rtype: str
+        :return: the configured folder, else the first existing candidate folder
+        (the package folder if none exists)
+        """
+        if self._terminology_dir is not None:
+            return self._terminology_dir
+
+        candidates = get_terminology_dirs()
+        for candidate in candidates:
+            if os.path.isdir(candidate):
+                return candidate
+        return candidates[0]
+
+    def categories(self):
+        """
+        :rtype: list
+        :return: sorted categories, i.e., the names of the JSON files in the terminology folder
+        """
+        if not os.path.isdir(self.terminology_dir):
+            return []
+        return sorted(filename[:-len('.json')]
+                      for filename in os.listdir(self.terminology_dir)
+                      if filename.endswith('.json'))
+
+    def get_paths(self, category):
+        """
+        :param str category: e.g., 'frame-to-frame-relations' (see categories)
+
+        :rtype: dict
+        :return: see load_paths
+        """
+        definitions_path = os.path.join(self.terminology_dir, f'{category}.json')
+        assert os.path.exists(definitions_path), \
+            f'{category} not among accepted categories: {self.categories() or CATEGORIES} (in {self.terminology_dir})'
+
+        bibtex_path = os.path.join(self.terminology_dir, BIBTEX_FILENAME)
+        assert os.path.exists(bibtex_path), f'cannot find {bibtex_path}'
+
+        return {
+            'category': category,
+            'definitions_path': definitions_path,
+            'bibtex_path': bibtex_path
+        }
+
+    def _load(self, path, kind, parse):
+        """
+        :param str path: path of a file
+        :param str kind: name of the parsed representation, e.g., 'definitions'
+        :param parse: function from the path to its parsed representation
+
+        :return: the cached representation, parsed again if the file changed since it was cached
+        """
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        key = (os.path.abspath(path), kind)
+        cached = self._cache.get(key)
+        if cached is None or cached[0] != signature:
+            cached = (signature, parse(path))
+            self._cache[key] = cached
+
+        return cached[1]
 
-    list_of_lists = []
-    headers = [settings['category'], 'Definition', 'Reference']
+    def clear(self):
+        """
+        forget all parsed files
+        """
+        self._cache.clear()
 
-    for category_value, info in definitions.items():
+    @staticmethod
+    def _read_json(path):
+        with open(path) as infile:
+            return json.load(infile)
 
-        reference = '\\citep{%s}' % info['bibtex_key']
-        if info['page']:
-            reference = '\\citep[p. %s]{%s}' % (info['page'], info['bibtex_key'])
+    @staticmethod
+    def _read_bibtex(path):
+        with open(path) as infile:
+            return parse_bibtex(infile.read())
 
-        one_row = [category_value, info['definition'], reference]
-        list_of_lists.append(one_row)
+    def definitions(self, category=None, definitions_path=None):
+        """
+        :param str category: e.g., 'phrase-types'
+        :param str definitions_path: path of the JSON file, None for the file of the category
 
-    df = pandas.DataFrame(list_of_lists, columns=headers)
+        :rtype: dict
+        :return: category value -> {'definition', 'bibtex_key', 'page'}
+        """
+        if definitions_path is None:
+            definitions_path = self.get_paths(category)['definitions_path']
+        return self._load(definitions_path, 'definitions', self._read_json)
 
-    return df
+    def bibtex(self, bibtex_path=None):
+        """
+        :param str bibtex_path: path of the .bib file, None for main.bib in the terminology folder
 
+        :rtype: dict
+        :return: see parse_bibtex
+        """
+        if bibtex_path is None:
+            bibtex_path = os.path.join(self.terminology_dir, BIBTEX_FILENAME)
+        return self._load(bibtex_path, 'bibtex', self._read_bibtex)
+
+    def _table(self, settings):
+        """
+        :return: df with the category value, definition, bibtex key, and page per row (cached)
+        """
+        def parse(path):
+            columns = {settings['category']: [], 'Definition': [], 'bibtex_key': [], 'page': []}
+            for category_value, info in self.definitions(definitions_path=path).items():
+                for column, value in [(settings['category'], category_value),
+                                      ('Definition', info['definition']),
+                                      ('bibtex_key', info['bibtex_key']),
+                                      ('page', info['page'])]:
+                    columns[column].append(value)
+            return pandas.DataFrame(columns)
+
+        return self._load(settings['definitions_path'], f'table-{settings["category"]}', parse)
+
+    def definitions_df(self, category=None, settings=None):
+        """
+        :param str category: e.g., 'grammatical-functions'
+        :param dict settings: output of load_paths (instead of the category)
+
+        :rtype: pandas.core.frame.DataFrame
+        :return: df with the category value, definition, and LaTeX citation (\\citep) per row
+        (a copy, so the cached table can not be modified)
+        """
+        if settings is None:
+            settings = self.get_paths(category)
+
+        table = self._table(settings)
+
+        references = []
+        for bibtex_key, page in zip(table['bibtex_key'], table['page']):
+            reference = '\\citep{%s}' % bibtex_key
+            if page:
+                reference = '\\citep[p. %s]{%s}' % (page, bibtex_key)
+            references.append(reference)
+
+        df = table[[settings['category'], 'Definition']].copy()
+        df['Reference'] = references
+        return df
+
+    def to_latex(self, category=None, settings=None):
+        """
+        :rtype: str
+        :return: LaTeX table of the definitions with \\citep references (see definitions_df)
+        """
+        from tabulate import tabulate
+
+        df = self.definitions_df(category=category, settings=settings)
+        for column in df.columns[:2]:
+            df[column] = df[column].map(escape_latex)
+        return tabulate(df, headers='keys', tablefmt='latex_raw', showindex=False)
+
+    def to_html(self, category=None, settings=None):
+        """
+        :rtype: str
+        :return: HTML table of the definitions, with author-year references from main.bib
+        (the bibtex key if the reference is not in main.bib)
+        """
+        from tabulate import tabulate
+
+        if settings is None:
+            settings = self.get_paths(category)
+
+        table = self._table(settings)
+        key2fields = self.bibtex(settings['bibtex_path']) if os.path.exists(settings['bibtex_path']) else {}
+
+        df = table[[settings['category'], 'Definition']].copy()
+        df['Reference'] = [format_citation(key2fields.get(bibtex_key, {}), bibtex_key, page)
+                           for bibtex_key, page in zip(table['bibtex_key'], table['page'])]
+
+        for column in df.columns:
+            df[column] = df[column].map(lambda value: html.escape(str(value)))
+        return tabulate(df, headers='keys', tablefmt='unsafehtml', showindex=False)
+
+    def missing_references(self, category=None, settings=None):
+        """
+        :rtype: set
+        :return: bibtex keys used in the definitions that are not in main.bib
+        """
+        if settings is None:
+            settings = self.get_paths(category)
+
+        bibtex_keys = set(self._table(settings)['bibtex_key'])
+        return bibtex_keys - set(self.bibtex(settings['bibtex_path']))
+
+
+terminology = TerminologyRegistry()
+
+
+def load_paths(category):
+    """
+    load relevant paths for category
+
+    :param str category: supported: see CATEGORIES (and any other JSON file in the terminology folder)
+
+    :rtype: dict
+    :return: {
+        'category' : 'frame-to-frame-relations' |
+        'definitions_path' : json path where possible values of category with definitions are stored,
+        'bibtex_path' : path to bibtex with relevant references
+    }
+    """
+    return terminology.get_paths(category)
+
+
+def load_definitions_in_df(settings):
+    """
+    load definitions into dataframe (parsed once and cached, see TerminologyRegistry)
+
+    :param dict settings: see output from 'load_paths' in this same python file
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: df with information about the definition of each category value
+    """
+    return terminology.definitions_df(settings=settings)
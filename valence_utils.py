@@ -0,0 +1,430 @@
+import os
+import pickle
+import multiprocessing
+from collections import Counter, defaultdict, namedtuple
+
+from annotation_utils import (ProgressReporter,
+                              get_lu_ids,
+                              make_shards,
+                              init_worker,
+                              get_worker_fn_instance)
+
+
+VALENCE_FORMAT = 1
+MISSING = '--'
+
+ValenceUnit = namedtuple('ValenceUnit', ['FE', 'GF', 'PT'])
+ValenceUnit.__doc__ = """
+realization of one frame element in an annotation,
+e.g., ('Agent', 'Ext', 'NP') or, for a null instantiation, ('Agent', '--', 'CNI')
+"""
+
+LUEntry = namedtuple('LUEntry', ['lu_id', 'name', 'frame', 'pattern_ids', 'counts'])
+
+
+class SymbolTable(object):
+    """
+    interned FE, GF, and PT labels: every label is stored once and referred to by an int
+    """
+    __slots__ = ('symbol2id', 'symbols')
+
+    def __init__(self, symbols=()):
+        self.symbols = []
+        self.symbol2id = {}
+        for symbol in symbols:
+            self.intern(symbol)
+
+    def intern(self, symbol):
+        """
+        :param str symbol: e.g., 'Agent', 'Ext', or 'NP'
+
+        :rtype: int
+        :return: ID of the symbol (added if it is new)
+        """
+        symbol_id = self.symbol2id.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            self.symbols.append(symbol)
+            self.symbol2id[symbol] = symbol_id
+        return symbol_id
+
+    def get(self, symbol):
+        """
+        :rtype: int
+        :return: ID of the symbol, None if it is unknown
+        """
+        return self.symbol2id.get(symbol)
+
+    def __getitem__(self, symbol_id):
+        return self.symbols[symbol_id]
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+def get_valence_pattern(annotation):
+    """
+    the valence pattern of an annotation: one ValenceUnit per overt or null-instantiated FE,
+    with the GF and PT of the same span (MISSING if the span has no GF or PT label).
+    The units are sorted, so that the same pattern in a different word order is the same pattern.
+
+    :param annotation: NLTK exemplar sentence or full-text annotation set
+
+    :rtype: tuple
+    :return: tuple of ValenceUnit
+    """
+    if 'FE' not in annotation:
+        return ()
+
+    overt, null_instantiations = annotation['FE']
+    span2gf = {(start, end): label for start, end, label in annotation.get('GF', [])}
+    span2pt = {(start, end): label for start, end, label in annotation.get('PT', [])}
+
+    units = [ValenceUnit(fe, span2gf.get((start, end), MISSING), span2pt.get((start, end), MISSING))
+             for start, end, fe in overt]
+    units.extend(ValenceUnit(fe, MISSING, ni_type)
+                 for fe, ni_type in null_instantiations.items())
+
+    return tuple(sorted(units))
+
+
+def scan_valence_shard(fn_instance, lu_ids):
+    """
+    count the valence patterns of the exemplars of the LUs,
+    one LU at a time (only the counts are kept, not the sentences)
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param list lu_ids: LU IDs whose exemplars are read
+
+    :rtype: list
+    :return: (LU ID, LU name, frame label, Counter of valence pattern -> frequency) per LU
+    """
+    lu_counts = []
+
+    for lu_id in lu_ids:
+        lu = fn_instance.lu(lu_id)
+        pattern2freq = Counter()
+        for sentence in lu.exemplars:
+            if 'frameAnnotation' not in sentence:
+                continue
+            pattern = get_valence_pattern(sentence)
+            if pattern:
+                pattern2freq[pattern] += 1
+
+        lu_counts.append((lu_id, lu.name, lu.frame.name, pattern2freq))
+
+    return lu_counts
+
+
+def _valence_shard(lu_ids):
+    return len(lu_ids), scan_valence_shard(get_worker_fn_instance(), lu_ids)
+
+
+class ValenceIndex(object):
+    """
+    valence patterns per LU with their frequencies in the exemplar annotations.
+
+    labels are interned in a SymbolTable and every distinct pattern is stored once,
+    as a flat tuple of symbol IDs (FE, GF, PT, FE, GF, PT, ...).
+    LUs refer to patterns by ID. Inverted indices from frames, pattern IDs, and symbols
+    are built when the index is created, so that queries do not scan the LUs.
+
+    usage:
+        index = stats_utils.load_valence_index(fn)
+        index.lu_patterns(lu_id)
+        index.frame_patterns('Commerce_buy')
+        index.find_lus(fe='Buyer', gf='Ext', pt='NP')
+    """
+
+    def __init__(self, symbols, patterns, lu_entries):
+        """
+        :param SymbolTable symbols: interned labels
+        :param list patterns: pattern ID -> flat tuple of symbol IDs
+        :param list lu_entries: list of LUEntry
+        """
+        self.symbols = symbols
+        self.patterns = patterns
+        self.lu_id2entry = {entry.lu_id: entry for entry in lu_entries}
+
+        self.frame2lu_ids = defaultdict(list)
+        self.name2lu_ids = defaultdict(list)
+        self.pattern_id2lu_ids = defaultdict(list)
+        for entry in lu_entries:
+            self.frame2lu_ids[entry.frame].append(entry.lu_id)
+            self.name2lu_ids[entry.name].append(entry.lu_id)
+            for pattern_id in entry.pattern_ids:
+                self.pattern_id2lu_ids[pattern_id].append(entry.lu_id)
+
+        self.symbol_id2pattern_ids = defaultdict(set)
+        for pattern_id, pattern in enumerate(patterns):
+            for symbol_id in pattern:
+                self.symbol_id2pattern_ids[symbol_id].add(pattern_id)
+
+    @classmethod
+    def from_lu_counts(cls, lu_counts):
+        """
+        :param lu_counts: iterable of (LU ID, LU name, frame label, Counter of valence pattern -> frequency),
+        e.g., the output of scan_valence_shard
+
+        :rtype: ValenceIndex
+        """
+        symbols = SymbolTable()
+        patterns = []
+        pattern2id = {}
+        lu_entries = []
+
+        for lu_id, lu_name, frame_label, pattern2freq in lu_counts:
+            pattern_ids = []
+            counts = []
+            for pattern, freq in pattern2freq.most_common():
+                encoded = tuple(symbols.intern(label)
+                                for unit in pattern
+                                for label in unit)
+                pattern_id = pattern2id.get(encoded)
+                if pattern_id is None:
+                    pattern_id = len(patterns)
+                    patterns.append(encoded)
+                    pattern2id[encoded] = pattern_id
+                pattern_ids.append(pattern_id)
+                counts.append(freq)
+
+            lu_entries.append(LUEntry(lu_id, lu_name, frame_label, tuple(pattern_ids), tuple(counts)))
+
+        return cls(symbols, patterns, lu_entries)
+
+    def __len__(self):
+        return len(self.lu_id2entry)
+
+    def decode(self, pattern_id):
+        """
+        :param int pattern_id: ID of a pattern
+
+        :rtype: tuple
+        :return: tuple of ValenceUnit
+        """
+        pattern = self.patterns[pattern_id]
+        return tuple(ValenceUnit(self.symbols[pattern[index]],
+                                 self.symbols[pattern[index + 1]],
+                                 self.symbols[pattern[index + 2]])
+                     for index in range(0, len(pattern), 3))
+
+    def encode(self, pattern):
+        """
+        :param pattern: iterable of (FE, GF, PT), in any order
+
+        :rtype: int
+        :return: ID of the pattern, None if it does not occur
+        """
+        encoded = []
+        for unit in sorted(ValenceUnit(*unit) for unit in pattern):
+            for label in unit:
+                symbol_id = self.symbols.get(label)
+                if symbol_id is None:
+                    return None
+                encoded.append(symbol_id)
+
+        candidates = self.symbol_id2pattern_ids.get(encoded[0], set()) if encoded else range(len(self.patterns))
+        encoded = tuple(encoded)
+        for pattern_id in candidates:
+            if self.patterns[pattern_id] == encoded:
+                return pattern_id
+        return None
+
+    def get_lu_ids(self, lu):
+        """
+        :param lu: LU ID or LU name (e.g., 'buy.v', which can be the name of LUs in several frames)
+
+        :rtype: list
+        """
+        if isinstance(lu, int):
+            return [lu] if lu in self.lu_id2entry else []
+        return list(self.name2lu_ids.get(lu, []))
+
+    def _count_patterns(self, lu_ids):
+        pattern_id2freq = Counter()
+        for lu_id in lu_ids:
+            entry = self.lu_id2entry[lu_id]
+            for pattern_id, freq in zip(entry.pattern_ids, entry.counts):
+                pattern_id2freq[pattern_id] += freq
+        return [(self.decode(pattern_id), freq)
+                for pattern_id, freq in pattern_id2freq.most_common()]
+
+    def lu_patterns(self, lu):
+        """
+        :param lu: LU ID or LU name (see get_lu_ids)
+
+        :rtype: list
+        :return: (tuple of ValenceUnit, frequency), from most to least frequent
+        """
+        return self._count_patterns(self.get_lu_ids(lu))
+
+    def frame_patterns(self, frame_label):
+        """
+        :param str frame_label: e.g., 'Commerce_buy'
+
+        :rtype: list
+        :return: (tuple of ValenceUnit, frequency) summed over the LUs of the frame,
+        from most to least frequent
+        """
+        return self._count_patterns(self.frame2lu_ids.get(frame_label, []))
+
+    def find_patterns(self, pattern=None, fe=None, gf=None, pt=None):
+        """
+        pattern IDs that are equal to a pattern or that contain a unit with the FE, GF, and/or PT, e.g.,
+        find_patterns(pattern=[('Buyer', 'Ext', 'NP'), ('Goods', 'Obj', 'NP')])
+        find_patterns(fe='Goods', pt='PP[from]')
+
+        :param pattern: iterable of (FE, GF, PT)
+        :param str fe: frame element
+        :param str gf: grammatical function
+        :param str pt: phrase type
+
+        :rtype: set
+        """
+        if pattern is not None:
+            pattern_id = self.encode(pattern)
+            return set() if pattern_id is None else {pattern_id}
+
+        constraints = [(position, label)
+                       for position, label in enumerate([fe, gf, pt])
+                       if label is not None]
+        assert constraints, 'provide a pattern or at least one of fe, gf, and pt'
+
+        symbol_ids = [self.symbols.get(label) for _, label in constraints]
+        if None in symbol_ids:
+            return set()
+
+        candidates = set.intersection(*[self.symbol_id2pattern_ids.get(symbol_id, set())
+                                        for symbol_id in symbol_ids])
+
+        pattern_ids = set()
+        for pattern_id in candidates:
+            pattern = self.patterns[pattern_id]
+            for index in range(0, len(pattern), 3):
+                if all(pattern[index + position] == symbol_id
+                       for (position, _), symbol_id in zip(constraints, symbol_ids)):
+                    pattern_ids.add(pattern_id)
+                    break
+
+        return pattern_ids
+
+    def find_lus(self, pattern=None, fe=None, gf=None, pt=None):
+        """
+        LUs with a pattern, or with any pattern with a unit with the FE, GF, and/or PT (see find_patterns)
+
+        :rtype: list
+        :return: (LU ID, LU name, frame label, frequency), from most to least frequent
+        """
+        lu_id2freq = Counter()
+        for pattern_id in self.find_patterns(pattern=pattern, fe=fe, gf=gf, pt=pt):
+            for lu_id in self.pattern_id2lu_ids[pattern_id]:
+                entry = self.lu_id2entry[lu_id]
+                lu_id2freq[lu_id] += entry.counts[entry.pattern_ids.index(pattern_id)]
+
+        return [(lu_id, self.lu_id2entry[lu_id].name, self.lu_id2entry[lu_id].frame, freq)
+                for lu_id, freq in lu_id2freq.most_common()]
+
+    def to_df(self, lu_ids=None):
+        """
+        :param lu_ids: LU IDs, None for all LUs
+
+        :rtype: pandas.core.frame.DataFrame
+        :return: one row per (LU, pattern) with the frequency and the pattern as string,
+        e.g., 'Buyer.Ext.NP + Goods.Obj.NP'
+        """
+        import pandas
+
+        if lu_ids is None:
+            lu_ids = sorted(self.lu_id2entry)
+
+        pattern_id2string = {}
+        list_of_lists = []
+        for lu_id in lu_ids:
+            entry = self.lu_id2entry[lu_id]
+            for pattern_id, freq in zip(entry.pattern_ids, entry.counts):
+                if pattern_id not in pattern_id2string:
+                    pattern_id2string[pattern_id] = ' + '.join('.'.join(unit) for unit in self.decode(pattern_id))
+                list_of_lists.append([lu_id, entry.name, entry.frame, pattern_id2string[pattern_id], freq])
+
+        df = pandas.DataFrame(list_of_lists, columns=['LU ID', 'LU', 'Frame', 'Pattern', 'Frequency'])
+        for column in ['LU', 'Frame', 'Pattern']:
+            df[column] = df[column].astype('category')
+
+        return df
+
+    def save(self, path):
+        """
+        :param str path: output path (pickle of the symbols, patterns, and LU entries)
+        """
+        from tool_utils import write_atomically
+
+        payload = {
+            'format': VALENCE_FORMAT,
+            'symbols': self.symbols.symbols,
+            'patterns': self.patterns,
+            'lus': [tuple(entry) for entry in self.lu_id2entry.values()],
+        }
+        write_atomically(path,
+                         lambda outfile: pickle.dump(payload, outfile, protocol=pickle.HIGHEST_PROTOCOL),
+                         mode='wb')
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param str path: path of an index written with save
+
+        :rtype: ValenceIndex
+        """
+        with open(path, 'rb') as infile:
+            payload = pickle.load(infile)
+        assert payload['format'] == VALENCE_FORMAT, f'{path} has format {payload["format"]}, expected {VALENCE_FORMAT}'
+
+        return cls(SymbolTable(payload['symbols']),
+                   payload['patterns'],
+                   [LUEntry(*entry) for entry in payload['lus']])
+
+
+def build_valence_index(fn_instance, num_workers=None, shard_size=50, verbose=0):
+    """
+    count the valence patterns of all LUs in one streaming pass over the exemplar annotations
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    (has to be loaded with stats_utils.load_framenet if num_workers > 1)
+    :param int num_workers: number of processes, None for the number of CPUs
+    :param int shard_size: number of LUs per task
+    :param int verbose: if >= 2, progress is printed
+
+    :rtype: ValenceIndex
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    lu_ids = get_lu_ids(fn_instance)
+    shards = make_shards(lu_ids, shard_size)
+    progress = ProgressReporter(total=len(lu_ids), description='scanned LUs', verbose=verbose)
+
+    def iter_lu_counts():
+        if num_workers == 1:
+            for shard in shards:
+                yield from scan_valence_shard(fn_instance, shard)
+                progress.update(len(shard))
+        else:
+            from stats_utils import registry
+            version = registry.version_of(fn_instance)
+            assert version is not None, 'fn_instance has to be loaded with stats_utils.load_framenet'
+
+            with multiprocessing.Pool(processes=num_workers,
+                                      initializer=init_worker,
+                                      initargs=(version,),
+                                      maxtasksperchild=20) as pool:
+                for num_lus, lu_counts in pool.imap(_valence_shard, shards):
+                    yield from lu_counts
+                    progress.update(num_lus)
+
+    index = ValenceIndex.from_lu_counts(iter_lu_counts())
+    progress.finish()
+
+    if verbose:
+        print(f'valence index: {len(index)} LUs, {len(index.patterns)} patterns, {len(index.symbols)} symbols')
+
+    return index
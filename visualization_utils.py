@@ -1,9 +1,19 @@
+import os
+import glob
+import hashlib
+import multiprocessing
 import pandas
 import seaborn as sns
 import matplotlib.pyplot as plt
-from graphviz import Graph
+from graphviz import Graph, Digraph, Source
 import itertools
 
+from profiling_utils import profiled
+
+GRAPH_KINDS = ['fe_relations', 'frame_neighbourhood']
+
+
+@profiled()
 def plot_num_lu_class2freq(num_lu_class2freq):
     """
     plot num_lu_class2freq
@@ -26,10 +36,17 @@ def plot_num_lu_class2freq(num_lu_class2freq):
     return plot
 
 
-def plot_fe_relations_of_frame(frame):
+@profiled()
+def plot_fe_relations_of_frame(frame, filename='dotgraphs/frame.gv'):
     """
+    graph of the FEs of a frame with their excludes and requires relations and coresets
+
+    :param frame: NLTK frame
+    :param str filename: path of the dot source when the graph is rendered
+
+    :rtype: graphviz.Graph
     """
-    g = Graph('frame', filename='dotgraphs/frame.gv')
+    g = Graph('frame', filename=filename)
 
     for fe, info in frame.FE.items():
 
@@ -58,4 +75,142 @@ def plot_fe_relations_of_frame(frame):
 
                 c.attr(label=label)
                 
-    return g
\ No newline at end of file
+    return g
+
+
+@profiled()
+def plot_frame_neighbourhood(fn_instance, frame, radius=1, relations=None, filename='dotgraphs/neighbourhood.gv'):
+    """
+    graph of the frames that are at most 'radius' frame-to-frame relations away from a frame
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param frame: NLTK frame
+    :param int radius: maximum number of relations between the frame and the other frames
+    :param relations: relation type(s), None for all types
+    :param str filename: path of the dot source when the graph is rendered
+
+    :rtype: graphviz.Digraph
+    """
+    from stats_utils import get_frame_relation_graph
+
+    graph = get_frame_relation_graph(fn_instance)
+    depth2frames = graph.neighbourhood(frame.name, radius=radius, relations=relations, direction='both')
+
+    g = Digraph('neighbourhood', filename=filename)
+    g.node(frame.name, style='filled')
+    frames = {frame.name}
+    for depth, frames_at_depth in depth2frames.items():
+        for other_frame in sorted(frames_at_depth):
+            if other_frame not in frames:
+                g.node(other_frame)
+                frames.add(other_frame)
+
+    for super_frame, sub_frame, relation in graph.edges_between(frames, relations=relations):
+        g.edge(super_frame, sub_frame, label=relation)
+
+    return g
+
+
+def get_graph_of_frame(fn_instance, frame, kind='fe_relations', **kwargs):
+    """
+    :param str kind: 'fe_relations' (see plot_fe_relations_of_frame, only 'filename' is accepted as kwarg)
+    or 'frame_neighbourhood' (see plot_frame_neighbourhood)
+    :param kwargs: passed to the plot function of the kind
+
+    :rtype: graphviz.Graph | graphviz.Digraph
+    """
+    assert kind in GRAPH_KINDS, f'{kind} not in {GRAPH_KINDS}'
+    if kind == 'fe_relations':
+        unexpected = set(kwargs) - {'filename'}
+        assert not unexpected, f'{sorted(unexpected)} are not accepted for kind fe_relations'
+        return plot_fe_relations_of_frame(frame, **kwargs)
+    return plot_frame_neighbourhood(fn_instance, frame, **kwargs)
+
+
+def get_graph_path(output_dir, frame_id, source, format):
+    """
+    :rtype: str
+    :return: path of the dot source, keyed by frame ID and a hash of its content,
+    e.g., 'dotgraphs/fe_relations/256_1a2b3c4d5e6f.gv'
+    """
+    content_hash = hashlib.sha1(f'{format}\n{source}'.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(output_dir, f'{frame_id}_{content_hash}.gv')
+
+
+def _render(args):
+    source, path, format = args
+    rendered_path = Source(source).render(filename=path, format=format, cleanup=False)
+    return path, rendered_path
+
+
+@profiled()
+def render_frame_graphs(fn_instance,
+                        frames=None,
+                        kind='fe_relations',
+                        output_dir='dotgraphs',
+                        format='svg',
+                        num_workers=None,
+                        force=False,
+                        verbose=0,
+                        **kwargs):
+    """
+    render a graph per frame into output_dir/kind, in parallel processes.
+    Files are named by frame ID and a hash of the dot source (see get_graph_path),
+    so a frame is only rendered again if its graph changed.
+    Outdated files of a frame are removed.
+
+    :param nltk.corpus.reader.framenet.FramenetCorpusReader fn_instance: instance of fn version
+    :param frames: frame names or frame IDs, None for all frames
+    :param str kind: see get_graph_of_frame
+    :param str output_dir: folder in which a folder per kind is created
+    :param str format: graphviz output format, e.g., 'svg', 'png', or 'pdf'
+    :param int num_workers: number of processes, None for the number of CPUs
+    :param bool force: if True, all graphs are rendered
+    :param int verbose: if >= 1, the number of rendered and skipped graphs is printed
+
+    :rtype: dict
+    :return: frame ID -> (path of the rendered file, 'rendered' | 'skipped')
+    """
+    if frames is None:
+        frames = fn_instance.frames()
+    else:
+        frames = [fn_instance.frame(frame) for frame in frames]
+
+    kind_dir = os.path.join(output_dir, kind)
+    os.makedirs(kind_dir, exist_ok=True)
+
+    frame_id2status = {}
+    tasks = []
+    for frame in frames:
+        source = get_graph_of_frame(fn_instance, frame, kind=kind, **kwargs).source
+        path = get_graph_path(kind_dir, frame.ID, source, format)
+        rendered_path = f'{path}.{format}'
+
+        if not force and os.path.exists(rendered_path):
+            frame_id2status[frame.ID] = (rendered_path, 'skipped')
+            continue
+
+        for outdated_path in glob.glob(os.path.join(kind_dir, f'{frame.ID}_*')):
+            if not outdated_path.startswith(path):
+                os.remove(outdated_path)
+
+        tasks.append((frame.ID, (source, path, format)))
+
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    path2frame_id = {path: frame_id for frame_id, (source, path, format) in tasks}
+    if num_workers == 1 or len(tasks) <= 1:
+        results = map(_render, [task for frame_id, task in tasks])
+        for path, rendered_path in results:
+            frame_id2status[path2frame_id[path]] = (rendered_path, 'rendered')
+    else:
+        with multiprocessing.Pool(processes=num_workers) as pool:
+            for path, rendered_path in pool.imap_unordered(_render, [task for frame_id, task in tasks]):
+                frame_id2status[path2frame_id[path]] = (rendered_path, 'rendered')
+
+    if verbose:
+        num_rendered = sum(status == 'rendered' for path, status in frame_id2status.values())
+        print(f'rendered {num_rendered} and skipped {len(frame_id2status) - num_rendered} graphs in {kind_dir}')
+
+    return frame_id2status